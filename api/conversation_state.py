@@ -0,0 +1,143 @@
+"""Server-side merging of conversation variables into one compact state.
+
+/api/extract-conversation-vars extracts from a single exchange; merging the
+result into what earlier turns learned happens here, so every client gets the
+same dedupe rules and the LEARNED FROM CONVERSATION prompt section stays
+bounded however long the session runs.
+
+    state = merge_variables(current.model_dump(), extracted.model_dump(), place_key)
+
+Items are compared case-, accent- and article-insensitively ("The Old Quarter"
+== "old quarter"); place lists can pass a key function that maps aliases to
+one name ("Saigon" == "Ho Chi Minh City"). A repeated item moves to the end
+with its newest wording, and each list keeps only its most recent entries.
+
+skip_extraction_reason() screens out exchanges with nothing to remember - a
+"thanks!" answered without naming any place - so they skip the LLM.
+"""
+import re
+from typing import Callable, Optional
+
+from gazetteer import normalize_place_name
+
+# Most recent entries kept per list; avoid/must-do lists are constraints, so they keep more
+LIST_CAPS = {
+    "places_discussed": 12,
+    "places_to_avoid": 15,
+    "activity_preferences": 10,
+    "food_preferences": 8,
+    "accommodation_notes": 6,
+    "must_do_activities": 15,
+    "concerns": 8,
+    "budget_notes": 6,
+}
+PLACE_FIELDS = ("places_discussed", "places_to_avoid")
+SCALAR_FIELDS = ("travel_companions", "pace_preference")
+MAX_CUSTOM_NOTES = 8
+MAX_ITEM_CHARS = 120
+
+_LEADING_ARTICLES = ("the ", "a ", "an ", "some ")
+
+
+def item_key(text: str) -> str:
+    key = normalize_place_name(text)
+    for article in _LEADING_ARTICLES:
+        if key.startswith(article):
+            return key[len(article):]
+    return key
+
+
+def _clip(text: str) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= MAX_ITEM_CHARS else text[:MAX_ITEM_CHARS - 1].rstrip() + "…"
+
+
+def _merge_list(current: list[str], update: list[str], cap: int, key: Callable[[str], str]) -> list[str]:
+    merged: dict[str, str] = {}
+    for item in [*current, *update]:
+        item = _clip(item)
+        k = key(item)
+        if not k:
+            continue
+        merged.pop(k, None)  # re-mentions move to the end, with the newest wording
+        merged[k] = item
+    return list(merged.values())[-cap:]
+
+
+def merge_variables(current: Optional[dict], update: Optional[dict],
+                    place_key: Optional[Callable[[str], Optional[str]]] = None) -> dict:
+    """Merge `update` into `current` (both ConversationVariables-shaped dicts) as a new canonical dict.
+
+    `place_key` maps a place name to a canonical key (or None if unknown) for the place lists.
+    """
+    current, update = current or {}, update or {}
+
+    def places(name: str) -> str:
+        return (place_key(name) if place_key else None) or item_key(name)
+
+    state = {}
+    for field, cap in LIST_CAPS.items():
+        key = places if field in PLACE_FIELDS else item_key
+        state[field] = _merge_list(current.get(field) or [], update.get(field) or [], cap, key)
+    for field in SCALAR_FIELDS:
+        state[field] = _clip(update.get(field) or current.get(field) or "")
+
+    notes = {}
+    for k, v in [*(current.get("custom_notes") or {}).items(), *(update.get("custom_notes") or {}).items()]:
+        if v:
+            notes.pop(k, None)
+            notes[k] = _clip(v)
+    state["custom_notes"] = dict(list(notes.items())[-MAX_CUSTOM_NOTES:])
+    return state
+
+
+# Messages made only of these carry nothing to remember
+ACKNOWLEDGEMENTS = {
+    "thanks", "thank", "you", "thx", "ty", "cheers", "ok", "okay", "k", "cool", "great", "nice", "awesome", "perfect",
+    "amazing", "wow", "got", "it", "sounds", "good", "yes", "yeah", "yep", "no", "nope", "sure", "lol", "haha",
+    "hahaha", "hi", "hello", "hey", "bye", "so", "much", "a", "lot", "that", "s", "helpful", "this", "makes",
+    "sense", "alright", "right", "gotcha", "interesting", "oh", "ah", "hmm",
+}
+# First-person and preference language; any of these means the message may say something about the
+# traveler. Object pronouns are left out: "tell me more" says nothing about them.
+PREFERENCE_SIGNALS = re.compile(
+    r"\b(?:i|i'm|im|i've|i'd|i'll|my|we|we're|we've|we'd|our|"
+    r"like|love|hate|prefer|want|wanna|need|must|dream|bucket list|can't|cannot|don't|won't|avoid|skip|not into|"
+    r"vegetarian|vegan|halal|kosher|gluten|allerg\w*|spicy|"
+    r"budget|cheap\w*|afford\w*|splurge|expensive|broke|"
+    r"solo|alone|partner|girlfriend|boyfriend|wife|husband|friends?|family|kids?|"
+    r"slow|fast|relax\w*|chill|rush\w*|"
+    r"scared|afraid|worried|nervous|safe|safety|sick|injur\w*|"
+    r"fan|touristy|crowded|busy|boring|overrated|too|rather|instead|please|"
+    r"hostel|hotel|dorm|private room|airbnb|camping|quiet|party|social)\b",
+    re.IGNORECASE,
+)
+_NUMBER_OR_PRICE = re.compile(r"\d|[$€£¥฿₫₹]")
+# A capitalized word after the first ("what about Quilotoa?") is probably a named place or thing
+_MID_SENTENCE_NAME = re.compile(r"(?<![.!?]\s)(?<!^)\b[A-Z][a-z]{2,}\b")
+
+
+def _names_something(text: str, mentions_place: Optional[Callable[[str], bool]]) -> bool:
+    if any(name.casefold() not in ACKNOWLEDGEMENTS for name in _MID_SENTENCE_NAME.findall(text)):
+        return True
+    return bool(mentions_place and mentions_place(text))
+
+
+def skip_extraction_reason(user_message: str, mentions_place: Optional[Callable[[str], bool]] = None,
+                           ai_response: str = "") -> Optional[str]:
+    """Why an exchange can be skipped without extraction, or None if it might carry new info.
+
+    Only bare acknowledgements are skipped, and only when `ai_response` names
+    no place either: places discussed are extracted from the reply too, so
+    "tell me more" is always worth extracting. `mentions_place` spots known
+    places written in lowercase ("is bangkok safe").
+    """
+    text = user_message.strip()
+    words = re.findall(r"\w+", text.casefold())
+    if PREFERENCE_SIGNALS.search(text) or _NUMBER_OR_PRICE.search(text) or _names_something(text, mentions_place):
+        return None
+    if words and not all(w in ACKNOWLEDGEMENTS for w in words):
+        return None
+    if ai_response and _names_something(ai_response, mentions_place):
+        return None
+    return "acknowledgement" if words else "no words"
@@ -0,0 +1,214 @@
+"""Per-place backpacker cost table for instant, LLM-free cost estimates.
+
+Rates live in data/cost_table.csv (USD; a dorm bed per night, food / local
+transport / moped rental per day, a SIM card, one internal flight):
+
+    level,code,name,region,aliases,accommodation,food,transport_local,sim_connectivity,moped_rental,transport_flights
+    region,,southeast_asia,southeast_asia,,12,15,5,10,8,80
+    country,TH,Thailand,southeast_asia,,10,12,5,8,7,50
+    city,TH,Bangkok,,,11,12,5,,,
+
+Blank cells inherit from the row's country (cities) or region (countries).
+Regions also match their name with spaces ("South America") and any aliases.
+Rows load into one (places x categories) array, so a whole itinerary is
+estimated with a couple of vectorized operations.
+"""
+import csv
+import logging
+import re
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+from gazetteer import normalize_place_name
+
+CATEGORIES = ("accommodation", "food", "transport_local", "sim_connectivity", "moped_rental", "transport_flights")
+ACCOMMODATION, FOOD, TRANSPORT_LOCAL, SIM, MOPED, FLIGHTS = range(len(CATEGORIES))
+# Categories billed per day of the stop; the rest are counted separately
+PER_DAY = np.array([True, True, True, False, True, False])
+
+DEFAULT_REGION = "default"
+# Free-text locations naming several places resolve to the most specific one
+LEVEL_RANK = {"region": 0, "country": 1, "city": 2}
+# Used when the data file is missing, so estimates still work (matches its "default" row)
+DEFAULT_REGION_RATES = (20, 25, 10, 15, 15, 150)
+
+
+class TripEstimate(NamedTuple):
+    rows: np.ndarray  # table row per stop
+    rates: np.ndarray  # (stops, categories) unit rates after multipliers
+    quantities: np.ndarray  # (stops, categories) days, SIM cards, flights
+
+    @property
+    def totals(self) -> np.ndarray:
+        return self.rates * self.quantities
+
+    def by_category(self, stop: Optional[int] = None) -> dict[str, tuple[float, float]]:
+        """Category -> (average unit rate weighted by quantity, total quantity), for one stop or the whole trip."""
+        selected = slice(None) if stop is None else slice(stop, stop + 1)
+        totals = self.totals[selected].sum(axis=0)
+        quantities = self.quantities[selected].sum(axis=0)
+        amounts = np.divide(totals, quantities, out=np.zeros_like(totals), where=quantities > 0)
+        return {c: (float(amounts[i]), float(quantities[i])) for i, c in enumerate(CATEGORIES)}
+
+
+class CostTable:
+    def __init__(self):
+        self.names: list[str] = []
+        self.levels: list[str] = []
+        self.regions: list[str] = []
+        self.country_codes: list[str] = []
+        self._rates: list[tuple] = []
+        self._index: dict[str, int] = {}  # normalized name/alias -> row
+        self._country_rows: dict[str, int] = {}
+        self._region_rows: dict[str, int] = {}
+        self.values = np.zeros((0, len(CATEGORIES)))
+        self.country_ids = np.zeros(0, dtype=np.int64)
+        self._name_re = None
+
+    def _add(self, level: str, name: str, region: str, country_code: str, rates, aliases=()):
+        row = len(self.names)
+        self.names.append(name)
+        self.levels.append(level)
+        self.regions.append(region)
+        self.country_codes.append(country_code)
+        self._rates.append(tuple(float(r) for r in rates))
+        if level == "region":
+            self._region_rows[name] = row
+            # Region slugs read as travelers write them: "south_america" -> "south america"
+            keys = (name.replace("_", " "), *aliases) if name != DEFAULT_REGION else ()
+        else:
+            keys = (name, *aliases)
+            if level == "country":
+                self._country_rows[country_code] = row
+        for key in keys:
+            self._index.setdefault(normalize_place_name(key), row)
+        return row
+
+    def _finalize(self):
+        self.values = np.array(self._rates, dtype=np.float64).reshape(-1, len(CATEGORIES))
+        # SIMs are bought once per country: stops share an id when they're in the same one
+        ids = {}
+        self.country_ids = np.array([ids.setdefault(code or f"row:{i}", len(ids)) for i, code in enumerate(self.country_codes)],
+                                    dtype=np.int64)
+        # One alternation over every known name, longest first, for free-text locations
+        names = sorted(self._index, key=len, reverse=True)
+        self._name_re = re.compile(r"\b(?:" + "|".join(re.escape(n) for n in names) + r")\b") if names else None
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def default_row(self) -> int:
+        return self._region_rows[DEFAULT_REGION]
+
+    def country_row(self, country_code: str) -> Optional[int]:
+        return self._country_rows.get(country_code.upper())
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Row for an exact place name or alias, or None."""
+        return self._index.get(normalize_place_name(name))
+
+    def resolve(self, location: str, town_countries: Optional[Callable[[str], list[str]]] = None) -> Optional[int]:
+        """Row for a free-text location ("Chiang Mai", "Hoi An, Vietnam", "northern Thailand"), or None.
+
+        In "place, qualifier" text the first part is the place and the rest
+        says where it is. A known place is used when the qualifier agrees with
+        it; otherwise, when `town_countries` is given (country codes of towns
+        with a name, most prominent first), the town is looked up there and its
+        country used, preferring countries the qualifier names: "Atlanta,
+        Georgia" and "Paris, Texas" are in the US. Failing that the qualifier
+        itself is used. Without commas the most specific known place anywhere
+        in the text wins (a city over its country over a region, then the
+        longest name).
+        """
+        place, _, rest = location.partition(",")
+        row = self.lookup(place)
+        qualifier = self._match(rest) if rest.strip() else None
+        if row is not None and (qualifier is None or self._agrees(row, qualifier)):
+            return row
+        if town_countries is not None and (row is None or self.levels[row] == "city"):
+            # A town the table doesn't know, or a same-named one elsewhere ("Paris, Texas")
+            codes = [c for c in town_countries(place) if row is None or c != self.country_codes[row]]
+            candidates = [r for r in (self.country_row(c) for c in codes) if r is not None]
+            if qualifier is not None:
+                candidates = [r for r in candidates if self._agrees(r, qualifier)] or candidates[:1]
+            if candidates:
+                return candidates[0]
+        if qualifier is not None:
+            return qualifier
+        return row if row is not None else self._match(location)
+
+    def _match(self, text: str) -> Optional[int]:
+        """Most specific known place named anywhere in `text`."""
+        if self._name_re is None:
+            return None
+        matches = self._name_re.findall(normalize_place_name(text))
+        if not matches:
+            return None
+        return self._index[max(matches, key=lambda m: (LEVEL_RANK[self.levels[self._index[m]]], len(m)))]
+
+    def _agrees(self, row: int, other: int) -> bool:
+        """Whether two rows can describe the same place: same country, or same region when either has none."""
+        if self.country_codes[row] and self.country_codes[other]:
+            return self.country_codes[row] == self.country_codes[other]
+        return self.regions[row] == self.regions[other]
+
+    def estimate_trip(self, rows, days, multipliers: Optional[dict[str, float]] = None, flights: float = 0) -> TripEstimate:
+        """Unit rates and quantities per stop and category for an itinerary.
+
+        `multipliers` scales each category's rate (e.g. private rooms cost more
+        than dorms). One SIM card is counted per country visited, at the first
+        stop there; `flights` internal flights are spread evenly across stops.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        days = np.asarray(days, dtype=np.float64)
+        scale = np.array([(multipliers or {}).get(c, 1.0) for c in CATEGORIES])
+        rates = self.values[rows] * scale
+        quantities = np.where(PER_DAY, days[:, None], 0.0)
+        _, first_in_country = np.unique(self.country_ids[rows], return_index=True)
+        quantities[first_in_country, SIM] = 1.0
+        if len(rows):
+            quantities[:, FLIGHTS] = flights / len(rows)
+        return TripEstimate(rows, rates, quantities)
+
+
+def load_cost_table(path: str) -> CostTable:
+    """Load the cost table; a missing or broken file leaves only the default region rates."""
+    table = CostTable()
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    except OSError as e:
+        logging.error(f"[Costs] Cost table unavailable ({e}), estimating with default rates only")
+        rows = []
+
+    region_rates, country_rates = {}, {}
+    for level in ("region", "country", "city"):  # parents first, so blanks can inherit
+        for r in (r for r in rows if r["level"] == level):
+            try:
+                if level == "region":
+                    parent, region = None, r["name"]
+                elif level == "country":
+                    region = r["region"] or DEFAULT_REGION
+                    parent = region_rates.get(region, DEFAULT_REGION_RATES)
+                else:
+                    country = table.country_row(r["code"])
+                    region = table.regions[country] if country is not None else DEFAULT_REGION
+                    parent = country_rates.get(r["code"].upper(), region_rates.get(region, DEFAULT_REGION_RATES))
+                rates = [float(r[c]) if r[c] else parent[i] for i, c in enumerate(CATEGORIES)]
+            except (KeyError, TypeError, ValueError) as e:
+                logging.warning(f"[Costs] Skipping bad cost table row {r.get('name')!r}: {e}")
+                continue
+            aliases = [a for a in (r.get("aliases") or "").split("|") if a]
+            table._add(level, r["name"], region, (r["code"] or "").upper(), rates, aliases)
+            if level == "region":
+                region_rates[r["name"]] = rates
+            elif level == "country":
+                country_rates[r["code"].upper()] = rates
+
+    if DEFAULT_REGION not in table._region_rows:
+        table._add("region", DEFAULT_REGION, DEFAULT_REGION, "", DEFAULT_REGION_RATES)
+    table._finalize()
+    logging.info(f"[Costs] Loaded cost table with {len(table)} places from {path}")
+    return table
@@ -0,0 +1,141 @@
+"""Offline currency conversion for extracted and estimated costs.
+
+Rates (units of each currency per 1 USD) come from a JSON snapshot, loaded
+once at startup; there is no network call on the request path. Refresh the
+snapshot out-of-band, e.g. from a daily cron:
+
+    python currency.py --output data/fx_rates.json
+
+Snapshot layout:
+
+    {"base": "USD", "as_of": "2025-06-01", "rates": {"THB": 32.7, "EUR": 0.88, ...}}
+"""
+import argparse
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+DEFAULT_RATES_URL = "https://open.er-api.com/v6/latest/USD"
+
+# Prefix symbols, longest first so "US$"/"R$" win over "$". A bare "$" is USD:
+# replies quote dollar prices, and local-peso "$" is rare in them.
+CURRENCY_SYMBOLS = {
+    "US$": "USD", "R$": "BRL", "S/": "PEN", "Rp": "IDR", "RM": "MYR", "Bs": "BOB",
+    "$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY", "₫": "VND", "฿": "THB", "₹": "INR", "₱": "PHP",
+    "₩": "KRW", "₺": "TRY", "₭": "LAK", "៛": "KHR", "₪": "ILS", "₦": "NGN", "₾": "GEL", "₴": "UAH",
+}
+CURRENCY_WORDS = {
+    "dollar": "USD", "dollars": "USD", "bucks": "USD",
+    "euro": "EUR", "euros": "EUR", "pound": "GBP", "pounds": "GBP",
+    "baht": "THB", "dong": "VND", "rupiah": "IDR", "ringgit": "MYR", "kip": "LAK", "riel": "KHR", "riels": "KHR",
+    "sol": "PEN", "soles": "PEN", "real": "BRL", "reais": "BRL", "boliviano": "BOB", "bolivianos": "BOB",
+    "yen": "JPY", "yuan": "CNY", "rmb": "CNY", "won": "KRW", "lira": "TRY", "lari": "GEL", "dirham": "MAD",
+    "dirhams": "MAD", "shilling": "KES", "shillings": "KES", "taka": "BDT", "kyat": "MMK", "forint": "HUF",
+    "koruna": "CZK", "zloty": "PLN", "krona": "SEK", "kronor": "SEK", "krone": "NOK", "kroner": "NOK",
+    "peso": None, "pesos": None, "rupee": None, "rupees": None,  # resolved from the destination
+}
+# Currency codes recognized in text (a curated list: matching every ISO code
+# would turn words like "all" or "top" into currencies)
+CURRENCY_CODES = {
+    "USD", "EUR", "GBP", "THB", "VND", "IDR", "INR", "PEN", "MXN", "COP", "ARS", "BRL", "CLP", "BOB", "LAK",
+    "KHR", "MYR", "PHP", "NPR", "LKR", "JPY", "CNY", "KRW", "TRY", "GEL", "MAD", "EGP", "KES", "TZS", "ZAR",
+    "AUD", "NZD", "CAD", "CHF", "HUF", "CZK", "PLN", "ISK", "NOK", "SEK", "DKK", "BDT", "PKR", "MMK", "UAH",
+    "SGD", "TWD", "GTQ", "BZD", "HNL", "NIO", "CRC", "PYG", "RSD", "AMD", "JOD", "PAB",
+}
+# Which peso/rupee a destination means
+COUNTRY_CURRENCIES = {
+    "mexico": "MXN", "colombia": "COP", "argentina": "ARS", "chile": "CLP", "philippines": "PHP",
+    "uruguay": "UYU", "cuba": "CUP", "dominican republic": "DOP",
+    "india": "INR", "nepal": "NPR", "sri lanka": "LKR", "pakistan": "PKR",
+}
+
+_SYMBOL_PATTERN = "|".join(re.escape(s) for s in sorted(CURRENCY_SYMBOLS, key=len, reverse=True))
+_WORD_PATTERN = "|".join(sorted(CURRENCY_WORDS, key=len, reverse=True))
+_CODE_PATTERN = "|".join(sorted(CURRENCY_CODES))
+# Regex fragments for a currency marker before / after an amount. Symbols and
+# codes match case-sensitively even in IGNORECASE patterns ("try 2" isn't lira).
+CURRENCY_PREFIX = rf"(?-i:(?:{_SYMBOL_PATTERN}|\b(?:{_CODE_PATTERN}))\s?)"
+CURRENCY_SUFFIX = rf"(?:\s?(?:[€₫฿₹₭៛₪]|(?-i:\b(?:{_CODE_PATTERN})\b)|\b(?:{_WORD_PATTERN})\b))"
+
+
+def currency_code(marker: str, destination: str = "") -> Optional[str]:
+    """ISO code for a currency symbol, code or word as written, or None if unknown/ambiguous."""
+    marker = marker.strip()
+    if marker in CURRENCY_SYMBOLS:
+        return CURRENCY_SYMBOLS[marker]
+    if marker.upper() in CURRENCY_CODES:
+        return marker.upper()
+    word = marker.casefold()
+    if word in CURRENCY_WORDS:
+        if CURRENCY_WORDS[word]:
+            return CURRENCY_WORDS[word]
+        destination = destination.casefold()
+        return next((code for country, code in COUNTRY_CURRENCIES.items() if country in destination), None)
+    return None
+
+
+class FxRates:
+    def __init__(self, rates: dict[str, float], as_of: str = ""):
+        self.rates = {code.upper(): float(rate) for code, rate in rates.items() if rate}
+        self.rates["USD"] = 1.0
+        self.as_of = as_of
+
+    def to_usd(self, amount: float, currency: str) -> Optional[float]:
+        rate = self.rates.get(currency.upper())
+        return amount / rate if rate else None
+
+    def from_usd(self, amount: float, currency: str) -> Optional[float]:
+        rate = self.rates.get(currency.upper())
+        return amount * rate if rate else None
+
+
+def load_rates(path: str) -> Optional[FxRates]:
+    """Load the rates snapshot, or None (USD-only) if it's missing or unreadable."""
+    if not os.path.exists(path):
+        logging.info(f"[FX] No rates snapshot at {path}, currency conversion disabled")
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        rates = FxRates(data["rates"], data.get("as_of", ""))
+    except Exception as e:
+        logging.error(f"[FX] Failed to load rates snapshot {path}: {e}")
+        return None
+    logging.info(f"[FX] Loaded {len(rates.rates)} exchange rates (as of {rates.as_of or 'unknown'}) from {path}")
+    return rates
+
+
+def refresh_rates(url: str, output_path: str):
+    import httpx
+
+    response = httpx.get(url, timeout=30)
+    response.raise_for_status()
+    data = response.json()
+    if data.get("base_code", data.get("base", "USD")) != "USD":
+        raise ValueError(f"Expected USD-based rates from {url}")
+    snapshot = {
+        "base": "USD",
+        "as_of": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        "rates": {code: rate for code, rate in sorted(data["rates"].items())},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=1)
+    os.replace(tmp_path, output_path)  # atomic, so a running API never reads a half-written file
+    print(f"Wrote {len(snapshot['rates'])} rates to {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the offline exchange-rate snapshot")
+    parser.add_argument("--url", default=DEFAULT_RATES_URL, help="USD-based rates endpoint (JSON with a 'rates' map)")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fx_rates.json"))
+    args = parser.parse_args()
+    refresh_rates(args.url, args.output)
+
+
+if __name__ == "__main__":
+    main()
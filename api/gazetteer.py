@@ -0,0 +1,232 @@
+"""Offline gazetteer for geocoding well-known places without network calls.
+
+Build the data file from a GeoNames dump (e.g. cities1000.txt or allCountries.txt
+from https://download.geonames.org/export/dump/):
+
+    python gazetteer.py path/to/allCountries.txt --output data/gazetteer.bin
+
+File layout (little-endian), memory-mapped at runtime:
+
+    header   "GAZ1" | record_count u32 | index_count u32 | names_len u32
+    records  record_count x (lng f32, lat f32, population u32, name_offset u32,
+                             name_length u16, country 2s, feature_class 1s)
+    index    index_count x (name_hash u64, record_id u32), sorted by hash
+    names    UTF-8 display names referenced by name_offset/name_length
+"""
+import argparse
+import bisect
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import unicodedata
+from typing import NamedTuple, Optional
+
+MAGIC = b"GAZ1"
+HEADER = struct.Struct("<4sIII")
+RECORD = struct.Struct("<ffIIH2s1s")
+INDEX_ENTRY = struct.Struct("<QI")
+
+# GeoNames feature classes/codes worth answering locally. Everything else
+# (hotels, restaurants, individual buildings) goes to the online geocoders.
+FEATURE_CODES = {
+    "P": None,  # populated places - all codes, filtered by population instead
+    "T": {"MT", "MTS", "PK", "PKS", "VLC", "PASS", "CNYN", "VAL", "ISL", "ISLS", "PEN", "DSRT", "BCH"},
+    "L": {"PRK", "RESN", "RESF", "RESW", "AREA", "RGN", "CST"},
+    "H": {"LK", "LKS", "FLLS", "BAY", "GLCR", "HSP", "LGN", "CNL"},
+    "S": {"MUS", "CSTL", "TMPL", "MSQE", "CH", "CTRR", "RUIN", "MNMT", "PAL", "FT", "ANS", "HSTS",
+          "ZOO", "OBPT", "PYR", "PYRS", "SQR", "GDN", "STDM", "MKT", "TOWR", "BDG", "CAVE"},
+}
+DEFAULT_MIN_POPULATION = 1000
+
+# Tie-break between same-named places: populated places outrank features
+FEATURE_CLASS_RANK = {"P": 3, "L": 2, "T": 2, "S": 1, "H": 1}
+# Half-width in degrees of the box around a point that `near` lookups accept (~50km, like the geocoder viewbox)
+NEAR_RADIUS_DEG = 0.5
+
+
+class GazetteerEntry(NamedTuple):
+    name: str
+    lng: float
+    lat: float
+    country_code: str  # lowercase ISO 3166-1 alpha-2
+    feature_class: str
+    population: int
+
+
+def normalize_place_name(name: str) -> str:
+    """Casefold, strip accents and punctuation so "Baños" and "banos" match."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    cleaned = "".join(ch if ch.isalnum() else " " for ch in stripped.casefold())
+    return " ".join(cleaned.split())
+
+
+def name_hash(name: str) -> int:
+    digest = hashlib.blake2b(normalize_place_name(name).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class _IndexHashes:
+    """Sequence view over the hash column of the mmapped index, for bisect."""
+
+    def __init__(self, buf, offset: int, count: int):
+        self._buf = buf
+        self._offset = offset
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i: int) -> int:
+        return INDEX_ENTRY.unpack_from(self._buf, self._offset + i * INDEX_ENTRY.size)[0]
+
+
+class Gazetteer:
+    """Read-only, memory-mapped name -> coordinates lookup."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.record_count, self.index_count, names_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a gazetteer file")
+        self._records_offset = HEADER.size
+        self._index_offset = self._records_offset + self.record_count * RECORD.size
+        self._names_offset = self._index_offset + self.index_count * INDEX_ENTRY.size
+        self._hashes = _IndexHashes(self._mm, self._index_offset, self.index_count)
+
+    def _record(self, record_id: int) -> GazetteerEntry:
+        lng, lat, population, name_offset, name_length, country, feature_class = RECORD.unpack_from(
+            self._mm, self._records_offset + record_id * RECORD.size
+        )
+        start = self._names_offset + name_offset
+        name = self._mm[start:start + name_length].decode("utf-8")
+        # float32 storage is ~1m precise; round off the conversion noise
+        return GazetteerEntry(
+            name, round(lng, 5), round(lat, 5), country.decode("ascii").lower(), feature_class.decode("ascii"), population
+        )
+
+    def candidates(self, name: str) -> list[GazetteerEntry]:
+        """All entries whose name or alternate name matches `name` exactly (after normalization)."""
+        key = name_hash(name)
+        i = bisect.bisect_left(self._hashes, key)
+        matches = []
+        while i < self.index_count:
+            entry_hash, record_id = INDEX_ENTRY.unpack_from(self._mm, self._index_offset + i * INDEX_ENTRY.size)
+            if entry_hash != key:
+                break
+            matches.append(self._record(record_id))
+            i += 1
+        return matches
+
+    def lookup(self, name: str, country_code: Optional[str] = None, feature_classes: Optional[str] = None,
+               near: Optional[tuple[float, float]] = None) -> Optional[GazetteerEntry]:
+        """Best match for `name`, restricted to `country_code`, `feature_classes`
+        (e.g. "P") and to within NEAR_RADIUS_DEG of a (lng, lat) point when given.
+
+        Ambiguous names resolve to the most prominent place (feature rank,
+        then population).
+        """
+        matches = self.candidates(name)
+        if country_code:
+            matches = [m for m in matches if m.country_code == country_code.lower()]
+        if feature_classes:
+            matches = [m for m in matches if m.feature_class in feature_classes]
+        if near:
+            matches = [m for m in matches
+                       if abs(m.lng - near[0]) <= NEAR_RADIUS_DEG and abs(m.lat - near[1]) <= NEAR_RADIUS_DEG]
+        if not matches:
+            return None
+        return max(matches, key=lambda m: (FEATURE_CLASS_RANK.get(m.feature_class, 0), m.population))
+
+
+def load_gazetteer(path: str) -> Optional[Gazetteer]:
+    """Open the gazetteer if the data file exists; the API runs without it otherwise."""
+    if not os.path.exists(path):
+        logging.info(f"[Gazetteer] No data file at {path}, offline geocoding disabled")
+        return None
+    try:
+        gazetteer = Gazetteer(path)
+        logging.info(f"[Gazetteer] Loaded {gazetteer.record_count} places ({gazetteer.index_count} names) from {path}")
+        return gazetteer
+    except Exception as e:
+        logging.error(f"[Gazetteer] Failed to load {path}: {e}")
+        return None
+
+
+# ============================================
+# BUILDER
+# ============================================
+
+def _keep_row(feature_class: str, feature_code: str, population: int, min_population: int) -> bool:
+    if feature_class not in FEATURE_CODES:
+        return False
+    if feature_class == "P":
+        return population >= min_population
+    return feature_code in FEATURE_CODES[feature_class]
+
+
+def build_gazetteer(dump_path: str, output_path: str, min_population: int = DEFAULT_MIN_POPULATION,
+                    include_alternate_names: bool = True):
+    """Convert a GeoNames tab-separated dump into the binary gazetteer format."""
+    records = bytearray()
+    names = bytearray()
+    index = []
+    record_count = 0
+
+    with open(dump_path, "r", encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 15:
+                continue
+            name, ascii_name, alternate_names = cols[1], cols[2], cols[3]
+            feature_class, feature_code, country = cols[6], cols[7], cols[8]
+            population = int(cols[14] or 0)
+            if not _keep_row(feature_class, feature_code, population, min_population):
+                continue
+
+            encoded_name = name.encode("utf-8")[:65535]
+            records += RECORD.pack(
+                float(cols[5]), float(cols[4]), min(population, 2**32 - 1), len(names), len(encoded_name),
+                (country or "--")[:2].encode("ascii", "replace"), feature_class.encode("ascii"),
+            )
+            names += encoded_name
+
+            aliases = {name, ascii_name}
+            if include_alternate_names and alternate_names:
+                aliases.update(alternate_names.split(","))
+            for hashed in {name_hash(alias) for alias in aliases if normalize_place_name(alias)}:
+                index.append((hashed, record_count))
+            record_count += 1
+
+    index.sort()
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, record_count, len(index), len(names)))
+        out.write(records)
+        for hashed, record_id in index:
+            out.write(INDEX_ENTRY.pack(hashed, record_id))
+        out.write(names)
+
+    logging.info(f"[Gazetteer] Wrote {record_count} places and {len(index)} names to {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer from a GeoNames dump")
+    parser.add_argument("dump", help="GeoNames tab-separated dump (allCountries.txt, cities1000.txt, ...)")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "data", "gazetteer.bin"))
+    parser.add_argument("--min-population", type=int, default=DEFAULT_MIN_POPULATION,
+                        help="Minimum population for populated places")
+    parser.add_argument("--no-alternate-names", action="store_true", help="Index only primary and ASCII names")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    build_gazetteer(args.dump, args.output, args.min_population, not args.no_alternate_names)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Multi-worker deployment: gunicorn -c gunicorn.conf.py main:app (run from api/).
+
+Each worker is a uvicorn event loop that imports main.py itself and lazily
+initializes its own vector store client; caches are shared through the
+SQLite file at CACHE_PATH.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Import the app in each worker rather than the master, so no client or
+# connection is ever shared across a fork
+preload_app = False
+# Chat streams can run for a while; don't kill workers mid-response
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# main.py splits per-provider rate limits across this many workers
+os.environ["WEB_CONCURRENCY"] = str(workers)
@@ -0,0 +1,31 @@
+"""LangChain retriever over the local quantized index (VECTOR_BACKEND=local).
+
+Kept out of main.py so numpy and langchain's retriever machinery are only
+imported when the local backend is actually used.
+"""
+import asyncio
+from typing import Any
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+class LocalIndexRetriever(BaseRetriever):
+    """Retriever over a LocalVectorIndex, returning the same Documents as the Pinecone one."""
+
+    index: Any
+    embeddings: Any
+    k: int = 5
+
+    def _to_documents(self, query_vector) -> list[Document]:
+        return [
+            Document(page_content=self.index.texts[row], metadata=self.index.metadatas[row])
+            for row, _ in self.index.search(query_vector, self.k)
+        ]
+
+    def _get_relevant_documents(self, query: str, *, run_manager) -> list[Document]:
+        return self._to_documents(self.embeddings.embed_query(query))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager) -> list[Document]:
+        query_vector = await self.embeddings.aembed_query(query)
+        return await asyncio.to_thread(self._to_documents, query_vector)
@@ -1,29 +1,436 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, PrivateAttr
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough, RunnableBranch, RunnableLambda
 from langchain_core.messages import HumanMessage, AIMessage
-from pinecone import Pinecone
 from typing import Optional
 import os
 import logging
+import logging.handlers
+import atexit
+import queue
+import random
+import time
 import httpx
 import asyncio
 import json
+import re
+import hashlib
+import tempfile
+import functools
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from dotenv import load_dotenv
+from conversation_state import merge_variables, skip_extraction_reason
+from cost_table import load_cost_table
+from currency import load_rates
+from gazetteer import load_gazetteer
+from model_router import load_router
+from packing_rules import (
+    CATEGORIES as PACKING_CATEGORIES, PackingItem, activity_tags, base_packing_list, climate_for,
+)
+from price_rules import extract_prices
+from rerank import load_reranker
+from shared_cache import load_cache
 
 # Load env vars from parent directory
 load_dotenv(os.path.join(os.path.dirname(__file__), "..", ".env.local"))
 
+
+# ============================================
+# LOGGING
+# ============================================
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json or text
+# Fraction of requests (0.0-1.0) whose full system prompt gets logged
+PROMPT_LOG_SAMPLE_RATE = float(os.getenv("PROMPT_LOG_SAMPLE_RATE", "0"))
+# Force-log every prompt (local debugging only - prompts contain profile + RAG text)
+PROMPT_LOG_DEBUG = os.getenv("PROMPT_LOG_DEBUG", "false").lower() == "true"
+# Include per-chunk previews/metadata in the /api/chat rag_debug payload
+RAG_DEBUG_CHUNKS = os.getenv("RAG_DEBUG_CHUNKS", "false").lower() == "true"
+
+# Attributes present on every LogRecord - anything else was passed via `extra=`
+_STANDARD_LOG_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Render log records as single-line JSON objects.
+
+    Fields passed through `extra=` are emitted as top-level keys so log
+    pipelines can filter on them without regex-parsing the message.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_LOG_RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+def configure_logging():
+    """Route all logging through a queue so request handlers never block on log I/O.
+
+    Handlers only enqueue records; a background QueueListener thread does the
+    formatting and writing.
+    """
+    stream_handler = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonLogFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def should_log_prompt() -> bool:
+    """Decide whether this request's full system prompt should be logged."""
+    if PROMPT_LOG_DEBUG:
+        return True
+    return PROMPT_LOG_SAMPLE_RATE > 0 and random.random() < PROMPT_LOG_SAMPLE_RATE
+
+
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
+
+
+# ============================================
+# PROVIDER RESILIENCE (rate limits, concurrency, retries, circuit breakers)
+# ============================================
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Per-provider defaults; each value can be overridden with an env var such as
+# NOMINATIM_RATE_LIMIT, GOOGLE_MAX_CONCURRENCY or OPENAI_MAX_RETRIES
+PROVIDER_DEFAULTS = {
+    # rate: requests/second, burst: bucket size, concurrency: max in-flight calls
+    "google": {"rate": 40, "burst": 40, "concurrency": 20, "max_retries": 2},
+    "nominatim": {"rate": 1, "burst": 1, "concurrency": 1, "max_retries": 1},  # OSM usage policy: max 1 req/s
+    "mapbox": {"rate": 10, "burst": 20, "concurrency": 10, "max_retries": 2},
+    "perplexity": {"rate": 5, "burst": 10, "concurrency": 10, "max_retries": 2},
+    "openai": {"rate": 50, "burst": 50, "concurrency": 32, "max_retries": 1},  # client also retries internally
+    "pinecone": {"rate": 50, "burst": 50, "concurrency": 20, "max_retries": 2},
+}
+# Worker processes on this host (uvicorn --workers and gunicorn both read it). The
+# limits above are per-host budgets, split evenly so N workers don't multiply them.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+PROVIDER_FAILURE_THRESHOLD = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", "5"))
+PROVIDER_RESET_TIMEOUT = float(os.getenv("PROVIDER_RESET_TIMEOUT", "30"))  # seconds an open circuit stays open
+PROVIDER_MAX_QUEUE_WAIT = float(os.getenv("PROVIDER_MAX_QUEUE_WAIT", "5"))  # seconds to wait for admission
+PROVIDER_BACKOFF_BASE = 0.5
+PROVIDER_BACKOFF_CAP = 8.0
+
+
+class ProviderUnavailable(Exception):
+    """Raised when a provider's circuit is open or its admission queue is saturated."""
+
+
+class TokenBucket:
+    """Async token bucket: refills `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Holding the lock while sleeping keeps waiters FIFO
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one trial call (the probe) through after a cool-down.
+
+    The probe's outcome closes or re-opens the circuit. A probe that never
+    reports back (cancelled, or a non-transient error) expires after another
+    cool-down, so the next caller can probe instead.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def available(self) -> bool:
+        """Whether a call would be let through now, without claiming the probe."""
+        state = self.state
+        if state == "half_open":
+            return self.probe_at is None or time.monotonic() - self.probe_at >= self.reset_timeout
+        return state == "closed"
+
+    def allow(self) -> bool:
+        """Admit a call; while half-open, only the caller that claims the probe."""
+        if not self.available():
+            return False
+        if self.state == "half_open":
+            self.probe_at = time.monotonic()
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probe_at = None
 
-app = FastAPI()
+
+def _is_transient_error(exc: Exception) -> bool:
+    """True for timeouts, connection errors and retryable HTTP statuses - not for bad requests."""
+    if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    if getattr(exc, "status_code", None) in RETRYABLE_STATUS_CODES:
+        return True
+    # openai SDK errors (not imported directly here)
+    return type(exc).__name__ in {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+
+def _provider_setting(name: str, key: str, cast=float):
+    env_key = f"{name.upper()}_{'RATE_LIMIT' if key == 'rate' else key.upper()}"
+    return cast(os.getenv(env_key, PROVIDER_DEFAULTS[name][key]))
+
+
+class ProviderGuard:
+    """Admission control for one upstream provider.
+
+    Every call goes through a token bucket and a concurrency semaphore, is
+    retried with jittered exponential backoff on transient failures, and is
+    rejected immediately with ProviderUnavailable while the circuit is open.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.bucket = TokenBucket(
+            rate=_provider_setting(name, "rate") / WEB_CONCURRENCY,
+            capacity=max(1.0, _provider_setting(name, "burst") / WEB_CONCURRENCY),
+        )
+        self.semaphore = asyncio.Semaphore(max(1, _provider_setting(name, "concurrency", int) // WEB_CONCURRENCY))
+        self.max_retries = _provider_setting(name, "max_retries", int)
+        self.breaker = CircuitBreaker(PROVIDER_FAILURE_THRESHOLD, PROVIDER_RESET_TIMEOUT)
+
+    def available(self) -> bool:
+        return self.breaker.available()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Pass the circuit breaker, then wait (bounded) for a rate-limit token and a concurrency slot."""
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.name} circuit open")
+        async with self._admission():
+            yield
+
+    @asynccontextmanager
+    async def _admission(self):
+        try:
+            await asyncio.wait_for(self.bucket.acquire(), timeout=PROVIDER_MAX_QUEUE_WAIT)
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=PROVIDER_MAX_QUEUE_WAIT)
+        except asyncio.TimeoutError:
+            raise ProviderUnavailable(f"{self.name} admission queue saturated")
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), PROVIDER_BACKOFF_CAP)
+            except ValueError:
+                pass
+        # Full jitter: uniform over [0, base * 2^attempt]
+        return random.uniform(0, min(PROVIDER_BACKOFF_CAP, PROVIDER_BACKOFF_BASE * (2 ** attempt)))
+
+    async def call(self, make_call):
+        """Run `make_call()` (a coroutine factory) under this provider's limits.
+
+        httpx responses with a retryable status are retried; once retries are
+        exhausted the last response is returned so callers keep their existing
+        status-code handling. The breaker counts the call, not each attempt:
+        one failure once it has given up. A half-open probe isn't retried.
+        """
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.name} circuit open")
+        probe = self.breaker.state == "half_open"
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            async with self._admission():
+                give_up = probe or attempt == self.max_retries
+                try:
+                    result = await make_call()
+                except Exception as e:
+                    if not _is_transient_error(e):
+                        raise
+                    if give_up or not self.breaker.available():
+                        self.breaker.record_failure()
+                        raise
+                    failure = repr(e)
+                else:
+                    if not (isinstance(result, httpx.Response) and result.status_code in RETRYABLE_STATUS_CODES):
+                        self.breaker.record_success()
+                        return result
+                    if give_up or not self.breaker.available():
+                        self.breaker.record_failure()
+                        return result
+                    failure = f"HTTP {result.status_code}"
+                    retry_after = result.headers.get("Retry-After")
+
+            delay = self._backoff(attempt, retry_after)
+            logging.warning(
+                f"[Resilience] {self.name} transient failure ({failure}), retrying in {delay:.2f}s",
+                extra={"provider": self.name, "attempt": attempt + 1, "breaker_state": self.breaker.state}
+            )
+            await asyncio.sleep(delay)
+
+
+PROVIDERS = {name: ProviderGuard(name) for name in PROVIDER_DEFAULTS}
+
+
+# ============================================
+# REQUEST COALESCING (single-flight)
+# ============================================
+
+def _normalize_payload(value):
+    """Canonicalize a request payload so trivially different duplicates share a key."""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {k: _normalize_payload(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_payload(v) for v in value]
+    return value
+
+
+def cache_key(namespace: str, payload) -> str:
+    """Key from a namespace and a normalized JSON-able payload."""
+    encoded = json.dumps(_normalize_payload(payload), sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(encoded.encode('utf-8')).hexdigest()}"
+
+
+def flight_key(namespace: str, request: BaseModel) -> str:
+    """Build a single-flight key from an endpoint name and its normalized request body."""
+    return cache_key(namespace, request.model_dump())
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls into one shared in-flight task.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task instead of hitting providers again.
+    Results are not cached once the task finishes.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def do(self, key: str, make_call):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make_call())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            logging.info("[SingleFlight] Joined in-flight request", extra={"flight_key": key.split(":")[0]})
+        # Shield so one client disconnecting doesn't cancel the call for everyone else
+        return await asyncio.shield(task)
+
+
+REQUEST_FLIGHTS = SingleFlight()
+
+# Shared across worker processes (single-flight above is per process). CACHE_BACKEND=none disables it.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite").lower()
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(tempfile.gettempdir(), "superglobal-api-cache.sqlite3"))
+CACHE_TTL_GEOCODE = float(os.getenv("CACHE_TTL_GEOCODE", str(30 * 86400)))
+CACHE_TTL_EXTRACTION = float(os.getenv("CACHE_TTL_EXTRACTION", str(7 * 86400)))
+CACHE_TTL_WEB_CONTEXT = float(os.getenv("CACHE_TTL_WEB_CONTEXT", str(6 * 3600)))  # prices/advisories go stale
+SHARED_CACHE = load_cache(CACHE_BACKEND, CACHE_PATH)
+
+
+async def cached_flight(key: str, make_call, ttl: float, cacheable, dump=None, load=None):
+    """Serve `key` from the shared cache, else run it single-flight and cache the result.
+
+    Only results passing `cacheable` are stored, so provider failures (which
+    endpoints report as empty responses) are retried on the next request.
+    `dump`/`load` convert the result to and from JSON (default: pydantic models).
+    """
+    if SHARED_CACHE is None:
+        return await REQUEST_FLIGHTS.do(key, make_call)
+
+    cached = await SHARED_CACHE.aget(key)
+    if cached is not None:
+        logging.info("[Cache] Hit", extra={"cache_namespace": key.split(":")[0]})
+        return load(cached) if load else cached
+
+    async def call_and_store():
+        result = await make_call()
+        if cacheable(result):
+            await SHARED_CACHE.aset(key, dump(result) if dump else result, ttl)
+        return result
+
+    return await REQUEST_FLIGHTS.do(key, call_and_store)
+
+
+# Heavy clients and the vector store initialize on first use, so the app (and
+# /health) is up as soon as the module imports. With WARMUP_ON_STARTUP they are
+# initialized in the background right away instead of on the first request;
+# /ready reports when that has finished.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup_task = start_warm_up() if WARMUP_ON_STARTUP else None
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,58 +440,357 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize RAG components with Pinecone
+# Initialize RAG components. VECTOR_BACKEND=local reads the quantized index
+# written by `ingest.py --target local` instead of Pinecone.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", os.path.join(os.path.dirname(__file__), "data", "vector_index"))
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX = os.getenv("PINECONE_INDEX", "brokepacker-articles")
+# Data-plane host of the index; skips the control-plane lookup (and lets tests use a stub)
+PINECONE_HOST = os.getenv("PINECONE_HOST")
+# Shortened text-embedding-3 vectors (e.g. 1024 or 512). Must match what the index
+# was built with; the Pinecone index is 3072-dimensional, so leave unset for it.
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS")) if os.getenv("EMBEDDING_DIMENSIONS") else None
+
+# OpenAI clients (and the ~1.5s langchain_openai import) are created on first use.
+# Clients are cached per configuration so requests share their connection pools.
+@functools.lru_cache(maxsize=None)
+def get_embeddings():
+    """text-embedding-3-large to match the index (3072 dimensions unless shortened)."""
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(model="text-embedding-3-large", dimensions=EMBEDDING_DIMENSIONS)
+
+
+@functools.lru_cache(maxsize=None)
+def chat_model(model: str, temperature: float, streaming: bool = False):
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=model, temperature=temperature, streaming=streaming)
+
+
+# Extractors get their output through OpenAI function calling bound to a Pydantic
+# model, so replies arrive as validated objects instead of JSON-in-prose. (Strict
+# json_schema mode would reject free-form dicts like ConversationVariables.custom_notes.)
+@functools.lru_cache(maxsize=None)
+def structured_model(model: str, temperature: float, schema: type[BaseModel]):
+    return chat_model(model, temperature).with_structured_output(schema, method="function_calling")
+
+
+# Models are picked per request from the task, input size, message signals and latency budget (model_router.py)
+MODEL_ROUTER = load_router(os.getenv("MODEL_ROUTES"))
 
-# Use text-embedding-3-large to match Pinecone index (3072 dimensions)
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
 
-# Initialize Pinecone vector store
-vectorstore = None
-retriever = None
+def chat_route_signals(message: str) -> frozenset[str]:
+    """Route conditions a chat message meets: "acknowledgement" for "thanks!"-style replies."""
+    return frozenset({"acknowledgement"}) if skip_extraction_reason(message) == "acknowledgement" else frozenset()
 
-if PINECONE_API_KEY:
+
+async def routed_call(task: str, input_text: str, make_call, signals: frozenset[str] = frozenset()):
+    """Run `make_call(model)` on the model routed for `task`, retrying once on the fallback past its latency budget."""
+    route = MODEL_ROUTER.route(task, len(input_text), signals)
+    call = PROVIDERS["openai"].call(lambda: make_call(route.model))
+    if route.timeout is None:
+        return await call
+    try:
+        return await asyncio.wait_for(call, route.timeout)
+    except asyncio.TimeoutError:
+        if not route.fallback:
+            raise
+        logging.warning(f"[Router] {task} on {route.model} exceeded {route.timeout}s, falling back to {route.fallback}")
+        return await PROVIDERS["openai"].call(lambda: make_call(route.fallback))
+
+
+async def astream_routed(task: str, input_text: str, messages, signals: frozenset[str] = frozenset()):
+    """Stream chat chunks from the routed model, switching to the fallback if the first token misses the budget."""
+    route = MODEL_ROUTER.route(task, len(input_text), signals)
+    model = route.model
+    chunks = chat_model(model, CHAT_TEMPERATURE, streaming=True).astream(messages)
+    try:
+        first = await (asyncio.wait_for(anext(chunks, None), route.timeout) if route.timeout else anext(chunks, None))
+    except asyncio.TimeoutError:
+        # Close the abandoned stream so its HTTP response doesn't keep generating until garbage collection
+        await _aclose_quietly(chunks, model)
+        if not route.fallback:
+            raise
+        logging.warning(f"[Router] {task} on {route.model} had no first token in {route.timeout}s, "
+                        f"falling back to {route.fallback}")
+        model = route.fallback
+        chunks = chat_model(model, CHAT_TEMPERATURE, streaming=True).astream(messages)
+        first = await anext(chunks, None)
+    try:
+        if first is None:
+            return
+        yield first
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        await _aclose_quietly(chunks, model)
+
+
+async def _aclose_quietly(chunks, model: str):
     try:
+        await chunks.aclose()
+    except Exception as e:
+        logging.warning(f"[Router] Closing {model} stream failed: {e}")
+
+
+async def extract_structured(prompt: str, schema: type[BaseModel], task: str = "extract", temperature: float = 0,
+                             input_text: Optional[str] = None):
+    """Run `prompt` with structured output, returning a validated `schema` instance.
+
+    The model is routed by `task` and the size of `input_text` (the text being
+    extracted from; defaults to the whole prompt).
+    """
+    result = await routed_call(
+        task, input_text or prompt, lambda model: structured_model(model, temperature, schema).ainvoke(prompt)
+    )
+    if result is None:
+        raise ValueError(f"{task} returned no {schema.__name__}")
+    return result
+
+
+# Long responses are extracted in chunks, concurrently: output generation dominates
+# extraction latency, and each chunk's call only has to write out its share.
+EXTRACTION_CHUNK_CHARS = int(os.getenv("EXTRACTION_CHUNK_CHARS", "2500"))
+EXTRACTION_MAX_CHUNKS = int(os.getenv("EXTRACTION_MAX_CHUNKS", "6"))
+_HEADING_RE = re.compile(r"^(#{1,6}\s|\*\*[^*]+\*\*:?\s*$|(Days?|Week)\s+\d)", re.IGNORECASE)
+
+
+def split_for_extraction(text: str, max_chars: int = EXTRACTION_CHUNK_CHARS,
+                         max_chunks: int = EXTRACTION_MAX_CHUNKS) -> list[str]:
+    """Split text on heading and paragraph boundaries into at most `max_chunks` pieces.
+
+    Paragraphs are never cut, so a chunk can exceed the target size when a
+    single paragraph does. Short text comes back as one chunk.
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+    target = max(max_chars, len(text) // max_chunks + 1)
+
+    # Blocks start at each heading line; within a block, paragraphs are split on blank lines
+    blocks, current = [], []
+    for line in text.splitlines():
+        if _HEADING_RE.match(line.strip()) and current:
+            blocks.append("\n".join(current))
+            current = []
+        current.append(line)
+    blocks.append("\n".join(current))
+    paragraphs = [p.strip() for block in blocks for p in re.split(r"\n\s*\n", block) if p.strip()]
+
+    chunks, current, size = [], [], 0
+    for paragraph in paragraphs:
+        starts_section = bool(_HEADING_RE.match(paragraph))
+        # Prefer to break before a heading once the chunk is reasonably full
+        if current and (size + len(paragraph) > target or (starts_section and size > target // 2)):
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+async def gather_chunks(label: str, calls) -> list:
+    """Await per-chunk extraction calls concurrently, keeping the ones that succeed.
+
+    Failed chunks are logged and dropped, so one provider error doesn't throw
+    away the rest of the reply; the first error is raised only if all failed.
+    """
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    failed = [(i, r) for i, r in enumerate(results) if isinstance(r, BaseException)]
+    for i, e in failed:
+        logging.error(f"[{label}] Chunk {i + 1}/{len(results)} failed: {e}")
+    if failed and len(failed) == len(results):
+        raise failed[0][1]
+    return [r for r in results if not isinstance(r, BaseException)]
+
+
+def dedupe_name(name: str) -> str:
+    """Key for merging per-chunk results that name the same thing differently."""
+    return re.sub(r"[^\w]+", " ", name.casefold()).strip()
+
+
+# Optional rerank stage: overfetch RERANK_CANDIDATES by vector similarity, keep the
+# RERANK_TOP_K most relevant to the question + destination. Modes: off, lexical, cross-encoder
+RERANK_MODE = os.getenv("RERANK_MODE", "off").lower()
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "3"))
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_ENABLED = RERANK_MODE not in ("", "off", "none")
+RETRIEVAL_K = RERANK_CANDIDATES if RERANK_ENABLED else 5
+
+
+@functools.lru_cache(maxsize=None)
+def get_reranker():
+    """Loaded on first use - the cross-encoder model takes seconds to load."""
+    return load_reranker(RERANK_MODE, RERANK_MODEL)
+
+
+def _init_retriever():
+    """Build the retriever for VECTOR_BACKEND, or None if it's unavailable. Blocking."""
+    if VECTOR_BACKEND == "local":
+        try:
+            from vector_index import LocalVectorIndex
+            from local_retriever import LocalIndexRetriever
+            local_index = LocalVectorIndex.load(LOCAL_INDEX_PATH)
+            logging.info(f"Local index initialized with {len(local_index)} vectors "
+                         f"({local_index.dtype}, {local_index.dimensions} dims, {local_index.nbytes / 1e6:.1f} MB) "
+                         f"from '{LOCAL_INDEX_PATH}'")
+            return LocalIndexRetriever(index=local_index, embeddings=get_embeddings(), k=RETRIEVAL_K)
+        except Exception as e:
+            logging.error(f"Failed to load local index from {LOCAL_INDEX_PATH}: {e}")
+            return None
+
+    if not PINECONE_API_KEY:
+        logging.warning("PINECONE_API_KEY not set. Vector search disabled.")
+        return None
+
+    try:
+        from pinecone import Pinecone
+        from langchain_pinecone import PineconeVectorStore
         pc = Pinecone(api_key=PINECONE_API_KEY)
-        index = pc.Index(PINECONE_INDEX)
+        index = pc.Index(PINECONE_INDEX, host=PINECONE_HOST) if PINECONE_HOST else pc.Index(PINECONE_INDEX)
 
-        # Check if index has vectors
-        stats = index.describe_index_stats()
-        total_vectors = stats.get("total_vector_count", 0)
+        # No describe_index_stats() here: it's a network round trip on the
+        # startup path, and an empty index already just returns no documents.
+        logging.info(f"Pinecone initialized for index '{PINECONE_INDEX}'")
 
-        if total_vectors > 0:
-            vectorstore = PineconeVectorStore(
-                index=index,
-                embedding=embeddings,
-                text_key="text"
-            )
-            retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-            logging.info(f"Pinecone initialized with {total_vectors} vectors in index '{PINECONE_INDEX}'")
-        else:
-            logging.warning(f"Pinecone index '{PINECONE_INDEX}' is empty. RAG will work once vectors are uploaded.")
-            # Still create the vectorstore for future use
-            vectorstore = PineconeVectorStore(
-                index=index,
-                embedding=embeddings,
-                text_key="text"
-            )
-            retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
+        vectorstore = PineconeVectorStore(
+            index=index,
+            embedding=get_embeddings(),
+            text_key="text"
+        )
+        return vectorstore.as_retriever(search_kwargs={"k": RETRIEVAL_K})
     except Exception as e:
         logging.error(f"Failed to initialize Pinecone: {e}")
-        vectorstore = None
-        retriever = None
-else:
-    logging.warning("PINECONE_API_KEY not set. Vector search disabled.")
+        return None
+
+
+_retriever = None
+_retriever_initialized = False
+_retriever_lock = asyncio.Lock()
+
+
+async def get_retriever(retry_failed: bool = False):
+    """The vector store retriever, initialized on first use in each worker process.
+
+    Nothing network- or disk-heavy runs at import, so a pre-forking server
+    doesn't share Pinecone connections or a loaded index across workers.
+    A failed initialization is remembered (None) unless retry_failed is set.
+    """
+    global _retriever, _retriever_initialized
+    if not _retriever_initialized or (retry_failed and _retriever is None):
+        async with _retriever_lock:
+            if not _retriever_initialized or (retry_failed and _retriever is None):
+                _retriever = await asyncio.to_thread(_init_retriever)
+                _retriever_initialized = True
+    return _retriever
+
+
+# Destinations used to exercise the retriever during warm-up
+WARMUP_DESTINATIONS = [d.strip() for d in os.getenv(
+    "WARMUP_DESTINATIONS", "Bangkok, Thailand;Hanoi, Vietnam;Bali, Indonesia;Lisbon, Portugal;Mexico City, Mexico;Cusco, Peru"
+).split(";") if d.strip()]
+
+# Per-dependency warm-up results, reported by /ready
+READINESS: dict[str, dict] = {}
+# Seconds before /ready re-runs a warm-up that left a required dependency failing
+WARMUP_RETRY_INTERVAL = float(os.getenv("WARMUP_RETRY_INTERVAL", "15"))
+_warmup_task: Optional[asyncio.Task] = None
+_warmup_started_at = 0.0
+
+
+async def _check_dependency(name: str, make_call, required: bool = True) -> bool:
+    """Run one warm-up step and record its status and latency under READINESS[name]."""
+    READINESS[name] = {"status": "pending", "required": required}
+    start = time.perf_counter()
+    try:
+        await make_call()
+    except Exception as e:
+        READINESS[name] = {"status": "error", "required": required,
+                           "latency_ms": round((time.perf_counter() - start) * 1000, 1), "error": str(e)}
+        logging.warning(f"[Startup] {name} not ready: {e}")
+        return False
+    READINESS[name] = {"status": "ok", "required": required,
+                       "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+    return True
+
+
+async def _warm_embeddings():
+    # A real request opens the client's connection pool (TLS handshake included)
+    await get_embeddings().aembed_query("warm-up")
+
+
+async def _warm_chat_models():
+    for model in sorted(MODEL_ROUTER.models()):
+        await asyncio.to_thread(chat_model, model, CHAT_TEMPERATURE)
+        await asyncio.to_thread(chat_model, model, CHAT_TEMPERATURE, True)
+
+
+async def _warm_retriever():
+    retriever = await get_retriever(retry_failed=True)
+    if retriever is None:
+        raise RuntimeError(f"{VECTOR_BACKEND} vector store unavailable")
+    await retriever.ainvoke(f"backpacking tips for {WARMUP_DESTINATIONS[0] if WARMUP_DESTINATIONS else 'travel'}")
+
+
+async def warm_up():
+    """Initialize the lazily-created clients ahead of the first request, recording each in READINESS.
+
+    Steps are independent: a failing one is reported and the rest still run.
+    Only required steps gate /ready; the vector store and the embeddings it
+    queries with are required only when one is configured.
+    """
+    start = time.perf_counter()
+    retrieval_enabled = VECTOR_BACKEND == "local" or bool(PINECONE_API_KEY)
+    await asyncio.gather(
+        _check_dependency("embeddings", _warm_embeddings, required=retrieval_enabled),
+        _check_dependency("chat_model", _warm_chat_models),
+    )
+    await _check_dependency("retriever", _warm_retriever, required=retrieval_enabled)
+    if RERANK_ENABLED:
+        await _check_dependency("reranker", lambda: asyncio.to_thread(get_reranker), required=False)
+    failed = [name for name, dep in READINESS.items() if dep["status"] != "ok"]
+    logging.info(f"[Startup] Warm-up finished in {time.perf_counter() - start:.2f}s"
+                 + (f", not ready: {', '.join(failed)}" if failed else ""))
+
+
+def required_dependencies_ready() -> bool:
+    return all(dep["status"] == "ok" for dep in READINESS.values() if dep["required"])
+
+
+def start_warm_up() -> asyncio.Task:
+    """Start warm-up once per worker process; later calls return the same task,
+    or a fresh run if the last one left a required dependency failing and
+    WARMUP_RETRY_INTERVAL has passed."""
+    global _warmup_task, _warmup_started_at
+    should_retry = (
+        _warmup_task is not None and _warmup_task.done() and not required_dependencies_ready()
+        and time.monotonic() - _warmup_started_at >= WARMUP_RETRY_INTERVAL
+    )
+    if _warmup_task is None or should_retry:
+        _warmup_started_at = time.monotonic()
+        _warmup_task = asyncio.create_task(warm_up())
+    return _warmup_task
 
-# LLM - Using GPT-5.2 for high-quality responses
-llm = ChatOpenAI(model="gpt-5.2", temperature=0.7)
+# LLM - chat models are picked per request by MODEL_ROUTER (GPT-5.2 for most answers)
+CHAT_TEMPERATURE = 0.7
 
 # Perplexity API for web search
 PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY")
+PERPLEXITY_API_URL = os.getenv("PERPLEXITY_API_URL", "https://api.perplexity.ai/chat/completions")
 
 
 async def search_perplexity(query: str, destination: str) -> str:
+    """Web context for a question, shared across workers for CACHE_TTL_WEB_CONTEXT."""
+    return await cached_flight(
+        cache_key("web-context", {"query": query, "destination": destination}),
+        lambda: _search_perplexity(query, destination), CACHE_TTL_WEB_CONTEXT, cacheable=bool,
+    )
+
+
+async def _search_perplexity(query: str, destination: str) -> str:
     """Query Perplexity API for current travel information."""
     if not PERPLEXITY_API_KEY:
         logging.warning("Perplexity API key not found, skipping web search")
@@ -92,8 +798,8 @@ async def search_perplexity(query: str, destination: str) -> str:
 
     try:
         async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(
-                "https://api.perplexity.ai/chat/completions",
+            response = await PROVIDERS["perplexity"].call(lambda: client.post(
+                PERPLEXITY_API_URL,
                 headers={
                     "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
                     "Content-Type": "application/json"
@@ -114,7 +820,7 @@ async def search_perplexity(query: str, destination: str) -> str:
                     "temperature": 0.2,
                     "search_recency_filter": "month"
                 }
-            )
+            ))
 
             if response.status_code == 200:
                 data = response.json()
@@ -124,6 +830,9 @@ async def search_perplexity(query: str, destination: str) -> str:
             else:
                 logging.error(f"[Perplexity] API error: {response.status_code}")
                 return ""
+    except ProviderUnavailable as e:
+        logging.warning(f"[Perplexity] Skipping web search: {e}")
+        return ""
     except Exception as e:
         logging.error(f"[Perplexity] Request failed: {e}")
         return ""
@@ -330,6 +1039,25 @@ def format_docs(docs):
     return "\n\n".join(doc.page_content for doc in docs)
 
 
+async def rerank_docs(query: str, destination: str, docs: list) -> list:
+    """Trim overfetched retrieval candidates to the RERANK_TOP_K best; no-op when reranking is off."""
+    if not RERANK_ENABLED or len(docs) <= RERANK_TOP_K:
+        return docs
+    try:
+        reranker = await asyncio.to_thread(get_reranker)
+        start = time.perf_counter()
+        # Cross-encoder inference is CPU-bound; keep it off the event loop
+        reranked = await asyncio.to_thread(reranker.rerank, query, docs, RERANK_TOP_K, destination or "")
+        logging.info(
+            f"[Rerank] Kept {len(reranked)}/{len(docs)} chunks ({reranker.name})",
+            extra={"rerank_ms": round((time.perf_counter() - start) * 1000, 1)}
+        )
+        return reranked
+    except Exception as e:
+        logging.warning(f"[Rerank] Failed, using vector order: {e}")
+        return docs[:RERANK_TOP_K]
+
+
 def format_docs_for_logging(docs):
     """Format docs with metadata for debugging/logging purposes."""
     chunks = []
@@ -550,6 +1278,9 @@ def build_conversation_variables_section(conv_vars: Optional[ConversationVarsInp
     if not conv_vars:
         return ""
 
+    # Clients may send an unmerged, ever-growing state; render its deduped, capped form
+    conv_vars = ConversationVarsInput(**merge_conversation_variables(conv_vars, None))
+
     # Check if there's anything meaningful to show
     has_content = (
         len(conv_vars.places_discussed) > 0 or
@@ -703,6 +1434,7 @@ async def chat(request: ChatRequest):
 
     # Get vector store context (if available)
     context = ""
+    retriever = await get_retriever()
     rag_debug = {
         "pinecone_connected": retriever is not None,
         "query_used": None,
@@ -720,20 +1452,26 @@ async def chat(request: ChatRequest):
                     MessagesPlaceholder("chat_history"),
                     ("human", "{input}"),
                 ])
-                standalone_q = (contextualize_q_prompt | llm | StrOutputParser()).invoke({
+                standalone_q = await routed_call("rewrite", request.message, lambda model: (contextualize_q_prompt | chat_model(model, CHAT_TEMPERATURE) | StrOutputParser()).ainvoke({
                     "input": request.message,
                     "chat_history": chat_history
-                })
+                }))
                 rag_debug["query_used"] = standalone_q
-                docs = retriever.invoke(standalone_q)
+                docs = await PROVIDERS["pinecone"].call(lambda: retriever.ainvoke(standalone_q))
             else:
                 rag_debug["query_used"] = request.message
-                docs = retriever.invoke(request.message)
+                docs = await PROVIDERS["pinecone"].call(lambda: retriever.ainvoke(request.message))
 
+            rag_debug["candidates_retrieved"] = len(docs)
+            docs = await rerank_docs(rag_debug["query_used"], request.destination, docs)
             context = format_docs(docs)
             rag_debug["chunks_retrieved"] = len(docs)
-            rag_debug["chunks"] = format_docs_for_logging(docs)
-            logging.info(f"[RAG] Retrieved {len(docs)} chunks for query: {rag_debug['query_used'][:100]}...")
+            if RAG_DEBUG_CHUNKS:
+                rag_debug["chunks"] = format_docs_for_logging(docs)
+            logging.info(
+                f"[RAG] Retrieved {len(docs)} chunks for query: {rag_debug['query_used'][:100]}...",
+                extra={"chunks_retrieved": len(docs), "context_chars": len(context)}
+            )
         except Exception as e:
             logging.warning(f"Vector retrieval failed: {e}")
             rag_debug["error"] = str(e)
@@ -752,9 +1490,7 @@ async def chat(request: ChatRequest):
         ("human", "{input}"),
     ])
 
-    chain = qa_prompt | llm | StrOutputParser()
-
-    response = chain.invoke({
+    response = await routed_call("chat", request.message, lambda model: (qa_prompt | chat_model(model, CHAT_TEMPERATURE) | StrOutputParser()).ainvoke({
         "input": request.message,
         "chat_history": chat_history,
         "destination": request.destination,
@@ -775,7 +1511,7 @@ async def chat(request: ChatRequest):
         "conversation_variables_section": conversation_variables_section,
         "context": context or "No TBB articles available for this query.",
         "web_context": web_context or "No current web data available.",
-    })
+    }), chat_route_signals(request.message))
 
     return {
         "response": response,
@@ -806,6 +1542,7 @@ async def chat_stream(request: ChatRequest):
 
             # Get vector store context (if available)
             context = ""
+            retriever = await get_retriever()
             if retriever:
                 logging.info(f"[Stream] Starting retrieval for: {request.message[:50]}...")
                 try:
@@ -815,13 +1552,14 @@ async def chat_stream(request: ChatRequest):
                             MessagesPlaceholder("chat_history"),
                             ("human", "{input}"),
                         ])
-                        standalone_q = (contextualize_q_prompt | llm | StrOutputParser()).invoke({
+                        standalone_q = await routed_call("rewrite", request.message, lambda model: (contextualize_q_prompt | chat_model(model, CHAT_TEMPERATURE) | StrOutputParser()).ainvoke({
                             "input": request.message,
                             "chat_history": chat_history
-                        })
-                        docs = retriever.invoke(standalone_q)
+                        }))
                     else:
-                        docs = retriever.invoke(request.message)
+                        standalone_q = request.message
+                    docs = await PROVIDERS["pinecone"].call(lambda: retriever.ainvoke(standalone_q))
+                    docs = await rerank_docs(standalone_q, request.destination, docs)
                     context = format_docs(docs)
                 except Exception as e:
                     logging.warning(f"[Stream] Vector retrieval failed: {e}")
@@ -863,22 +1601,34 @@ async def chat_stream(request: ChatRequest):
                 web_context=web_context or "No current web data available.",
             )
 
-            # Log the complete system prompt for debugging
+            # Log prompt sizes on every request; the full prompt only when sampled
             system_message = messages[0].content if messages else "No system message"
-            logging.info("=" * 80)
-            logging.info("[SYSTEM PROMPT START]")
-            logging.info(system_message)
-            logging.info("[SYSTEM PROMPT END]")
-            logging.info("=" * 80)
+            prompt_stats = {
+                "prompt_chars": len(system_message),
+                "context_chars": len(context),
+                "web_context_chars": len(web_context or ""),
+                "history_messages": len(chat_history),
+            }
+            if should_log_prompt():
+                logging.info("[Stream] System prompt", extra={**prompt_stats, "system_prompt": system_message})
+            else:
+                logging.info("[Stream] System prompt built", extra=prompt_stats)
 
             # Stream the response
             logging.info("[Stream] Starting LLM streaming...")
-            streaming_llm = ChatOpenAI(model="gpt-5.2", temperature=0.7, streaming=True)
-
-            async for chunk in streaming_llm.astream(messages):
-                if chunk.content:
-                    # Send as Server-Sent Events format
-                    yield f"data: {json.dumps({'content': chunk.content})}\n\n"
+            # Streams can't be transparently retried, so only admission control applies
+            openai_guard = PROVIDERS["openai"]
+            async with openai_guard.slot():
+                try:
+                    async for chunk in astream_routed("chat_stream", request.message, messages, chat_route_signals(request.message)):
+                        if chunk.content:
+                            # Send as Server-Sent Events format
+                            yield f"data: {json.dumps({'content': chunk.content})}\n\n"
+                except Exception as e:
+                    if _is_transient_error(e):
+                        openai_guard.breaker.record_failure()
+                    raise
+                openai_guard.breaker.record_success()
 
             # Signal end of stream
             yield f"data: {json.dumps({'done': True})}\n\n"
@@ -904,6 +1654,27 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness for load balancers: 200 once every required dependency warmed up, else 503.
+
+    Liveness stays on /health. The first /ready call starts warm-up if
+    WARMUP_ON_STARTUP is off, so probes alone are enough to warm a worker, and
+    later calls retry a warm-up that failed (see WARMUP_RETRY_INTERVAL).
+    """
+    warmup_task = start_warm_up()
+    dependencies = {name: dict(dep) for name, dep in READINESS.items()}
+    is_ready = warmup_task.done() and required_dependencies_ready()
+    for name, guard in PROVIDERS.items():
+        if not guard.available():
+            dependencies[f"provider:{name}"] = {"status": "circuit_open", "required": False}
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "warming" if not warmup_task.done() else "degraded",
+                 "dependencies": dependencies},
+    )
+
+
 # ============================================
 # LOCATION EXTRACTION FOR MAP PINS
 # ============================================
@@ -922,6 +1693,7 @@ class ExtractLocationsRequest(BaseModel):
 
 class ExtractLocationsResponse(BaseModel):
     locations: list[ExtractedLocation]
+    _partial: bool = PrivateAttr(default=False)  # some chunks failed; don't cache
 
 
 # Blocklist of vague/generic location terms that should NOT get add-to-map buttons
@@ -1047,77 +1819,68 @@ For each location provide:
 TEXT TO ANALYZE:
 {text}
 
-Respond with a JSON array. Example:
-
-Input: "Check out Star Kabab for biryani and visit Lalbagh Fort for history"
-[
-  {{"name": "Star Kabab", "type": "restaurant", "description": "Famous for biryani", "area": "Dhaka"}},
-  {{"name": "Lalbagh Fort", "type": "historic", "description": "17th-century Mughal fort", "area": "Dhaka"}}
-]
-
-Input: "Try the local street food and visit some markets"
-[]
-
-Extract ALL named places. Return [] ONLY if there are zero named places.
+Extract ALL named places. Return no locations ONLY if there are zero named places
+(e.g. "Try the local street food and visit some markets").
 """
 
 
 @app.post("/api/extract-locations", response_model=ExtractLocationsResponse)
 async def extract_locations(request: ExtractLocationsRequest):
-    """Extract mappable locations from AI response text."""
-    import json
-    import httpx
-
-    try:
-        # Use gpt-4o for better extraction accuracy (was gpt-4o-mini but it missed too many locations)
-        extraction_llm = ChatOpenAI(model="gpt-4o", temperature=0)
-
-        prompt = LOCATION_EXTRACTION_PROMPT.format(text=request.response_text)
-        result = extraction_llm.invoke(prompt)
+    """Extract mappable locations, cached and coalescing identical concurrent requests."""
+    return await cached_flight(
+        flight_key("extract-locations", request), lambda: _extract_locations(request), CACHE_TTL_EXTRACTION,
+        cacheable=lambda r: bool(r.locations) and not r._partial, dump=lambda r: r.model_dump(),
+        load=ExtractLocationsResponse.model_validate,
+    )
 
-        # Parse the JSON response
-        content = result.content.strip()
-        # Handle markdown code blocks if present
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        content = content.strip()
 
-        locations_data = json.loads(content)
+async def _extract_locations(request: ExtractLocationsRequest):
+    """Extract mappable locations from AI response text."""
+    try:
+        # Long chunks go to gpt-4o (gpt-4o-mini missed too many locations there), short ones to gpt-4o-mini
+        chunks = split_for_extraction(request.response_text) or [request.response_text]
+        results = await gather_chunks("Location Extraction", [
+            extract_structured(LOCATION_EXTRACTION_PROMPT.format(text=chunk), ExtractLocationsResponse,
+                               task="extract_locations", input_text=chunk)
+            for chunk in chunks
+        ])
+        candidates = [loc for result in results for loc in result.locations]
 
         # Validate and filter locations
         valid_types = {"accommodation", "restaurant", "activity", "historic", "transport", "city", "other"}
         # Map old types to new types for backwards compatibility
         type_mapping = {"hostel": "accommodation", "landmark": "historic"}
-        locations = []
-        for loc in locations_data:
-            if isinstance(loc, dict) and "name" in loc:
-                loc_name = loc["name"].strip()
-
-                # Filter out vague/generic locations that slipped through the AI
-                if is_vague_location(loc_name):
-                    logging.info(f"[Location Extraction] Filtered vague location: '{loc_name}'")
-                    continue
-
-                loc_type = loc.get("type", "other").lower()
-                # Map old types to new types
-                loc_type = type_mapping.get(loc_type, loc_type)
-                if loc_type not in valid_types:
-                    loc_type = "other"
-                locations.append(ExtractedLocation(
-                    name=loc_name,
-                    type=loc_type,
-                    description=loc.get("description", ""),
-                    area=loc.get("area", "")  # Geographic context for geocoding
-                ))
-
-        logging.info(f"[Location Extraction] Extracted {len(locations)} valid locations from {len(locations_data)} candidates")
-        return ExtractLocationsResponse(locations=locations)
+        locations = {}  # dedupe_name -> location; chunks (or one long reply) can repeat a place
+        for loc in candidates:
+            loc_name = loc.name.strip()
+
+            # Filter out vague/generic locations that slipped through the AI
+            if not loc_name or is_vague_location(loc_name):
+                logging.info(f"[Location Extraction] Filtered vague location: '{loc_name}'")
+                continue
+
+            key = dedupe_name(loc_name)
+            if key in locations:
+                # Keep the first mention, filling in anything it lacked
+                first = locations[key]
+                locations[key] = first.model_copy(update={
+                    "description": first.description or loc.description, "area": first.area or loc.area,
+                })
+                continue
+
+            loc_type = loc.type.lower()
+            # Map old types to new types
+            loc_type = type_mapping.get(loc_type, loc_type)
+            if loc_type not in valid_types:
+                loc_type = "other"
+            locations[key] = loc.model_copy(update={"name": loc_name, "type": loc_type})
+
+        logging.info(f"[Location Extraction] Extracted {len(locations)} valid locations from {len(candidates)} candidates "
+                     f"in {len(results)}/{len(chunks)} chunk(s)")
+        response = ExtractLocationsResponse(locations=list(locations.values()))
+        response._partial = len(results) < len(chunks)
+        return response
 
-    except json.JSONDecodeError as e:
-        logging.error(f"Failed to parse location extraction response: {e}")
-        return ExtractLocationsResponse(locations=[])
     except Exception as e:
         logging.error(f"Location extraction failed: {e}")
         return ExtractLocationsResponse(locations=[])
@@ -1410,6 +2173,15 @@ def _build_country_names_map():
 
 COUNTRY_CODE_TO_NAMES = _build_country_names_map()
 
+# Offline GeoNames-derived gazetteer (build with `python gazetteer.py <dump>`)
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "gazetteer.bin"))
+GAZETTEER = load_gazetteer(GAZETTEER_PATH)
+
+# Geocoder endpoints - overridable so load tests can point them at local stubs
+GOOGLE_GEOCODE_URL = os.getenv("GOOGLE_GEOCODE_URL", "https://maps.googleapis.com/maps/api/geocode/json")
+NOMINATIM_SEARCH_URL = os.getenv("NOMINATIM_SEARCH_URL", "https://nominatim.openstreetmap.org/search")
+MAPBOX_GEOCODE_URL = os.getenv("MAPBOX_GEOCODE_URL", "https://api.mapbox.com/geocoding/v5/mapbox.places")
+
 
 def is_result_in_expected_country(formatted_address: str, expected_country_code: str) -> bool:
     """Check if a geocoded result's formatted address contains the expected country.
@@ -1475,11 +2247,11 @@ async def geocode_with_google(query: str, region_bias: str = None) -> dict | Non
             logging.info(f"[Google Geocoding] Using region bias: {region_bias}")
 
         async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://maps.googleapis.com/maps/api/geocode/json",
+            response = await PROVIDERS["google"].call(lambda: client.get(
+                GOOGLE_GEOCODE_URL,
                 params=params,
                 timeout=10.0
-            )
+            ))
 
             if response.status_code == 200:
                 data = response.json()
@@ -1511,6 +2283,8 @@ async def geocode_with_google(query: str, region_bias: str = None) -> dict | Non
             else:
                 logging.error(f"[Google Geocoding] HTTP error: {response.status_code}")
 
+    except ProviderUnavailable as e:
+        logging.warning(f"[Google Geocoding] Skipped: {e}")
     except Exception as e:
         logging.error(f"[Google Geocoding] Error: {e}")
 
@@ -1540,12 +2314,12 @@ async def geocode_with_nominatim(query: str, viewbox: tuple = None) -> dict | No
         }
 
         async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://nominatim.openstreetmap.org/search",
+            response = await PROVIDERS["nominatim"].call(lambda: client.get(
+                NOMINATIM_SEARCH_URL,
                 params=params,
                 headers=headers,
                 timeout=10.0
-            )
+            ))
 
             if response.status_code == 200:
                 results = response.json()
@@ -1581,6 +2355,9 @@ async def geocode_with_nominatim(query: str, viewbox: tuple = None) -> dict | No
                 logging.info("[Nominatim] No suitable POI found in results")
                 return None
 
+    except ProviderUnavailable as e:
+        logging.warning(f"[Nominatim] Skipped: {e}")
+        return None
     except Exception as e:
         logging.error(f"[Nominatim] Error: {e}")
         return None
@@ -1620,11 +2397,11 @@ async def geocode_with_mapbox(query: str, proximity: tuple = None, allow_place_f
         encoded_query = quote(query)
 
         async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"https://api.mapbox.com/geocoding/v5/mapbox.places/{encoded_query}.json",
+            response = await PROVIDERS["mapbox"].call(lambda: client.get(
+                f"{MAPBOX_GEOCODE_URL}/{encoded_query}.json",
                 params=params,
                 timeout=10.0
-            )
+            ))
 
             if response.status_code == 200:
                 data = response.json()
@@ -1658,6 +2435,9 @@ async def geocode_with_mapbox(query: str, proximity: tuple = None, allow_place_f
                 logging.info("[Mapbox] No POI matches found")
                 return None
 
+    except ProviderUnavailable as e:
+        logging.warning(f"[Mapbox] Skipped: {e}")
+        return None
     except Exception as e:
         logging.error(f"[Mapbox] Error: {e}")
         return None
@@ -1665,30 +2445,28 @@ async def geocode_with_mapbox(query: str, proximity: tuple = None, allow_place_f
 
 @app.post("/api/geocode", response_model=GeocodeResponse)
 async def geocode_location(request: GeocodeRequest):
+    """Geocode a place name, cached and coalescing identical concurrent requests."""
+    return await cached_flight(
+        flight_key("geocode", request), lambda: _geocode_location(request), CACHE_TTL_GEOCODE,
+        cacheable=lambda r: r.success, dump=lambda r: r.model_dump(), load=GeocodeResponse.model_validate,
+    )
+
+
+async def _geocode_location(request: GeocodeRequest):
     """Geocode a place name using multiple services for best results.
 
     Strategy:
-    1. Check if place name is a known location (mountains, landmarks, etc.)
-    2. Try Google Geocoding first (most accurate, especially for landmarks/mountains)
-    3. Try Nominatim (OpenStreetMap) - good for hostels/hotels
-    4. Fall back to Mapbox if others don't find a POI
+    1. Look the place up in the offline gazetteer (cities, towns, parks, landmarks)
+    2. Check if place name is a known location (mountains, landmarks, etc.)
+    3. Try Google Geocoding first (most accurate, especially for landmarks/mountains)
+    4. Try Nominatim (OpenStreetMap) - good for hostels/hotels
+    5. Fall back to Mapbox if others don't find a POI
     """
 
     # Build the search query
     location_context = (request.city if request.city else request.context or "").strip()
     place_name_lower = request.place_name.lower().strip()
 
-    # FIRST: Check if the place name itself is in CITY_CENTERS (for mountains, landmarks, etc.)
-    # This handles cases like "Illiniza Norte" which might not be in geocoding services
-    for known_place, center in CITY_CENTERS.items():
-        if known_place in place_name_lower or place_name_lower in known_place:
-            logging.info(f"[Geocode] Direct match found in CITY_CENTERS: {known_place} at {center}")
-            return GeocodeResponse(
-                success=True,
-                coordinates=[center[0], center[1]],
-                formatted_name=f"{request.place_name}, {location_context}" if location_context else request.place_name
-            )
-
     # Extract country code from context for API filtering
     country_code = None
     context_lower = location_context.lower()
@@ -1698,7 +2476,7 @@ async def geocode_location(request: GeocodeRequest):
             logging.info(f"[Geocode] Detected country code: {code} from context '{location_context}'")
             break
 
-    # Get proximity point for the area
+    # Get proximity point for the area (also scopes the gazetteer match below)
     proximity_point = None
     viewbox = None
     city_key = location_context.lower()
@@ -1710,6 +2488,44 @@ async def geocode_location(request: GeocodeRequest):
             logging.info(f"[Geocode] Using region bias for {known_city}: {center}")
             break
 
+    # Cities missing from CITY_CENTERS can still get a bias point from the gazetteer
+    if proximity_point is None and GAZETTEER and location_context:
+        city_entry = GAZETTEER.lookup(location_context.split(",")[0], country_code, feature_classes=None if country_code else "P")
+        if city_entry:
+            proximity_point = (city_entry.lng, city_entry.lat)
+            viewbox = (city_entry.lng - 0.5, city_entry.lat + 0.5, city_entry.lng + 0.5, city_entry.lat - 0.5)
+            logging.info(f"[Geocode] Using gazetteer region bias for {city_entry.name}: {proximity_point}")
+
+    # FIRST: Exact name match in the offline gazetteer - no network call needed.
+    # Only named places GeoNames knows about match; hostels/restaurants fall through.
+    if GAZETTEER:
+        if country_code:
+            entry = GAZETTEER.lookup(request.place_name, country_code)
+        elif proximity_point:
+            entry = GAZETTEER.lookup(request.place_name, near=proximity_point)
+        else:
+            # Unscoped, the most prominent same-named feature anywhere in the world wins
+            # (a "Blue Lagoon" in Iceland for one in Laos); only trust towns and cities
+            entry = GAZETTEER.lookup(request.place_name, feature_classes="P")
+        if entry:
+            logging.info(f"[Geocode] Gazetteer match: {entry.name} ({entry.country_code}, class {entry.feature_class}) at [{entry.lng}, {entry.lat}]")
+            return GeocodeResponse(
+                success=True,
+                coordinates=[entry.lng, entry.lat],
+                formatted_name=f"{request.place_name}, {location_context}" if location_context else request.place_name
+            )
+
+    # Check if the place name itself is in CITY_CENTERS (for mountains, landmarks, etc.)
+    # This handles cases like "Illiniza Norte" which might not be in geocoding services
+    for known_place, center in CITY_CENTERS.items():
+        if known_place in place_name_lower or place_name_lower in known_place:
+            logging.info(f"[Geocode] Direct match found in CITY_CENTERS: {known_place} at {center}")
+            return GeocodeResponse(
+                success=True,
+                coordinates=[center[0], center[1]],
+                formatted_name=f"{request.place_name}, {location_context}" if location_context else request.place_name
+            )
+
     # Build different query variations to try
     queries_to_try = []
 
@@ -1722,8 +2538,16 @@ async def geocode_location(request: GeocodeRequest):
 
     logging.info(f"[Geocode] Searching for: {queries_to_try} (country_code={country_code})")
 
+    # Skip any geocoder whose circuit breaker is open instead of waiting out its timeout
+    unhealthy = [name for name in ("google", "nominatim", "mapbox") if not PROVIDERS[name].available()]
+    if unhealthy:
+        logging.warning(f"[Geocode] Skipping geocoders with open circuits: {unhealthy}")
+    google_queries = [] if "google" in unhealthy else queries_to_try
+    nominatim_queries = [] if "nominatim" in unhealthy else queries_to_try
+    mapbox_queries = [] if "mapbox" in unhealthy else queries_to_try
+
     # Try Google Geocoding first (most accurate, especially for mountains/landmarks)
-    for query in queries_to_try:
+    for query in google_queries:
         result = await geocode_with_google(query, region_bias=country_code)
         if result:
             # Validate result is in the expected country by checking formatted address
@@ -1738,7 +2562,7 @@ async def geocode_location(request: GeocodeRequest):
             )
 
     # Try Nominatim (better for accommodations like hostels/hotels)
-    for query in queries_to_try:
+    for query in nominatim_queries:
         result = await geocode_with_nominatim(query, viewbox)
         if result:
             # Validate result is in the expected country by checking formatted address
@@ -1753,7 +2577,7 @@ async def geocode_location(request: GeocodeRequest):
             )
 
     # Fall back to Mapbox (strict POI mode) WITH country restriction
-    for query in queries_to_try:
+    for query in mapbox_queries:
         result = await geocode_with_mapbox(query, proximity_point, allow_place_fallback=False, country_code=country_code)
         if result:
             return GeocodeResponse(
@@ -1765,7 +2589,7 @@ async def geocode_location(request: GeocodeRequest):
     # Final fallback: allow place-type results (city/town level) WITH country restriction
     # This is better than nothing - at least puts the pin in the right general area
     logging.info(f"[Geocode] No POI found, trying place-type fallback...")
-    for query in queries_to_try:
+    for query in mapbox_queries:
         result = await geocode_with_mapbox(query, proximity_point, allow_place_fallback=True, country_code=country_code)
         if result:
             is_exact = result.get("is_exact", False)
@@ -1793,6 +2617,9 @@ class ExtractedCost(BaseModel):
     notes: str = ""  # Range info if applicable (e.g., "Range $10-15")
     text_to_match: str = ""  # Exact text from original to place button after
     is_range: bool = False  # True if extracted from a price range (e.g., "$10-15")
+    currency: str = "USD"  # Currency `amount` is in; the LLM reports the quoted one and we convert to USD
+    # The LLM's own USD conversion, used only for currencies missing from FX_RATES; never sent to clients
+    amount_usd: Optional[float] = Field(default=None, exclude=True)
 
 
 class TouristTrapWarning(BaseModel):
@@ -1811,6 +2638,7 @@ class ExtractCostsRequest(BaseModel):
 class ExtractCostsResponse(BaseModel):
     costs: list[ExtractedCost]
     tourist_traps: list[TouristTrapWarning]
+    _partial: bool = PrivateAttr(default=False)  # some chunks failed; don't cache
 
 
 COST_EXTRACTION_PROMPT = """You are an expert travel budget analyst. Extract ALL budget-relevant costs from this travel advice text.
@@ -1849,34 +2677,11 @@ These do NOT scale with trip duration. Paid once for the whole trip.
 - Ferry tickets, bus tickets (specific journeys)
 
 === EXAMPLES ===
-
-INPUT: "Hostels cost $10-15/night. Food is about $8/day. eSIM is $30-60."
-OUTPUT:
-{{
-  "costs": [
-    {{"category": "accommodation", "name": "Hostels", "amount": 12.5, "unit": "night", "notes": "Range $10-15", "is_range": true}},
-    {{"category": "food", "name": "Daily Food", "amount": 8, "unit": "day", "notes": ""}},
-    {{"category": "sim_connectivity", "name": "eSIM", "amount": 45, "unit": "trip", "notes": "Range $30-60", "is_range": true}}
-  ]
-}}
-
-INPUT: "Overnight ferry to Barisal: $15. Boat tour in Sundarbans: $65."
-OUTPUT:
-{{
-  "costs": [
-    {{"category": "transport_local", "name": "Overnight Ferry to Barisal", "amount": 15, "unit": "trip", "notes": ""}},
-    {{"category": "activities", "name": "Boat Tour in Sundarbans", "amount": 65, "unit": "trip", "notes": ""}}
-  ]
-}}
-
-INPUT: "Budget guesthouses run $6-10/night. CNG rickshaws cost $10-15/day."
-OUTPUT:
-{{
-  "costs": [
-    {{"category": "accommodation", "name": "Budget Guesthouses", "amount": 8, "unit": "night", "notes": "Range $6-10", "is_range": true}},
-    {{"category": "transport_local", "name": "CNG Rickshaws", "amount": 12.5, "unit": "day", "notes": "Range $10-15", "is_range": true}}
-  ]
-}}
+- "Hostels cost $10-15/night" → accommodation "Hostels", amount 12.5, unit "night", is_range
+- "Food is about $8/day" → food "Daily Food", amount 8, unit "day"
+- "eSIM is $30-60" → sim_connectivity "eSIM", amount 45, unit "trip", is_range
+- "Overnight ferry to Barisal: $15" → transport_local, amount 15, unit "trip"
+- "Boat tour in Sundarbans: $65" → activities, amount 65, unit "trip"
 
 === WHAT TO EXTRACT ===
 - Bullet point lists with prices
@@ -1912,7 +2717,9 @@ RIGHT OUTPUT: Skip all of these - they're summaries, not specific costs
 For each cost:
 - category: accommodation, transport_local, transport_flights, food, activities, visa_border, sim_connectivity, moped_rental, gear, insurance, misc
 - name: Descriptive name
-- amount: The rate in USD (NOT the total)
+- amount: The rate exactly as quoted, in its original currency (NOT the total) - do not convert
+- currency: ISO 4217 code of the quoted amount (USD for $, THB for baht, VND for dong, EUR for €, ...)
+- amount_usd: Your best estimate of amount in USD (same as amount when the currency is USD)
 - unit: "day", "night", or "trip"
 - notes: Include range info if applicable
 - text_to_match: Exact phrase from text for button placement
@@ -1926,137 +2733,176 @@ Extract warnings about scams or overpriced places:
 
 === TEXT TO ANALYZE ===
 {text}
-
-Respond with ONLY valid JSON (no markdown, no explanation):
 """
 
 
+# Rates the frontend multiplies by trip length; the prompt asks for one per category
+RECURRING_COST_UNITS = {"night", "day"}
+
+# Offline exchange rates (refresh with `python currency.py`); without them only USD prices convert
+FX_RATES_PATH = os.getenv("FX_RATES_PATH", os.path.join(os.path.dirname(__file__), "data", "fx_rates.json"))
+FX_RATES = load_rates(FX_RATES_PATH)
+
+
+def cost_in_usd(cost: ExtractedCost) -> Optional[ExtractedCost]:
+    """Convert a cost the LLM reported in a local currency to USD, noting the quoted amount.
+
+    Clients read every amount as USD, so a cost with no offline rate falls
+    back to the LLM's own conversion, and is dropped (None) without one.
+    """
+    currency = (cost.currency or "USD").upper()
+    if currency == "USD":
+        return cost if cost.currency == "USD" else cost.model_copy(update={"currency": "USD"})
+    amount = FX_RATES.to_usd(cost.amount, currency) if FX_RATES else None
+    quoted = f"Quoted as {cost.amount:g} {currency}"
+    if amount is None:
+        if not cost.amount_usd:
+            logging.warning(f"[Cost Extraction] No exchange rate or USD estimate for {currency}, dropping '{cost.name}'")
+            return None
+        logging.warning(f"[Cost Extraction] No exchange rate for {currency}, using the model's USD estimate for '{cost.name}'")
+        amount, quoted = cost.amount_usd, f"{quoted}, approximate conversion"
+    return cost.model_copy(update={
+        "amount": round(amount, 2), "currency": "USD",
+        "notes": f"{cost.notes}; {quoted}" if cost.notes else quoted,
+    })
+
+# Parse explicit "$15/night"-style prices locally and only call the LLM when the text is ambiguous
+COST_PRICE_RULES = os.getenv("COST_PRICE_RULES", "true").lower() == "true"
+
+
+def merge_costs(cost_lists: list[list[ExtractedCost]]) -> list[ExtractedCost]:
+    """Merge costs extracted in separate passes over one response (text chunks, or the price rules).
+
+    One-time costs are deduplicated by name, keeping the first mention. Recurring
+    rates are merged per (category, unit) and averaged - the deduplication rule
+    the prompt gives, which neither a per-chunk call nor the rules can apply on their own.
+    """
+    groups: dict[tuple, list[ExtractedCost]] = {}
+    for cost in (c for costs in cost_lists for c in costs):
+        if cost.unit in RECURRING_COST_UNITS:
+            key = ("rate", cost.category, cost.unit, cost.currency)
+        else:
+            key = ("name", dedupe_name(cost.name))
+        groups.setdefault(key, []).append(cost)
+
+    merged = []
+    for (kind, *_), costs in groups.items():
+        first = costs[0]
+        amounts = [c.amount for c in costs]
+        if kind == "rate" and min(amounts) != max(amounts):
+            spread = (f"${min(amounts):g}-${max(amounts):g}" if first.currency == "USD"
+                      else f"{min(amounts):g}-{max(amounts):g} {first.currency}")
+            first = first.model_copy(update={
+                "amount": round(sum(amounts) / len(amounts), 2),
+                "notes": f"Average of {len(costs)} mentions ({spread})",
+                "is_range": True,
+            })
+        merged.append(first)
+    return merged
+
+
 @app.post("/api/extract-costs", response_model=ExtractCostsResponse)
 async def extract_costs(request: ExtractCostsRequest):
-    """Extract cost information and tourist trap warnings from AI response text."""
-    import json
+    """Extract costs and tourist traps, cached and coalescing identical concurrent requests."""
+    return await cached_flight(
+        flight_key("extract-costs", request), lambda: _extract_costs(request), CACHE_TTL_EXTRACTION,
+        cacheable=lambda r: bool(r.costs or r.tourist_traps) and not r._partial, dump=lambda r: r.model_dump(),
+        load=ExtractCostsResponse.model_validate,
+    )
+
 
+async def _extract_costs(request: ExtractCostsRequest):
+    """Extract cost information and tourist trap warnings from AI response text."""
     try:
-        extraction_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+        if COST_PRICE_RULES:
+            parsed = extract_prices(request.response_text, FX_RATES, request.destination)
+            if parsed.reason is None:
+                costs = merge_costs([[ExtractedCost(**mention._asdict()) for mention in parsed.mentions]])
+                logging.info(f"[Cost Extraction] Price rules found {len(costs)} costs, LLM skipped")
+                return ExtractCostsResponse(costs=costs, tourist_traps=[])
+            logging.info(f"[Cost Extraction] Price rules inconclusive ({parsed.reason}), using LLM")
 
         # Format trip days for prompt
         trip_days_str = f"{request.trip_days}" if request.trip_days > 0 else "unknown"
 
-        prompt = COST_EXTRACTION_PROMPT.format(
-            text=request.response_text,
-            destination=request.destination,
-            num_travelers=request.num_travelers,
-            trip_days=trip_days_str
-        )
-        result = extraction_llm.invoke(prompt)
-
-        content = result.content.strip()
-        # Handle markdown code blocks
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        content = content.strip()
-
-        data = json.loads(content)
+        chunks = split_for_extraction(request.response_text) or [request.response_text]
+        results = await gather_chunks("Cost Extraction", [
+            extract_structured(COST_EXTRACTION_PROMPT.format(
+                text=chunk,
+                destination=request.destination,
+                num_travelers=request.num_travelers,
+                trip_days=trip_days_str
+            ), ExtractCostsResponse)
+            for chunk in chunks
+        ])
 
         valid_categories = {"accommodation", "transport_local", "transport_flights", "food", "activities", "visa_border", "sim_connectivity", "moped_rental", "gear", "insurance", "misc"}
         valid_units = {"night", "day", "meal", "trip", "person", "month", "week"}
 
-        costs = []
-        for c in data.get("costs", []):
-            if isinstance(c, dict) and "name" in c and "amount" in c:
-                cat = c.get("category", "misc").lower()
+        chunk_costs = []
+        for result in results:
+            costs = []
+            for c in result.costs:
+                cat = c.category.lower()
                 if cat not in valid_categories:
                     cat = "misc"
-                unit = c.get("unit", "trip").lower()
+                unit = c.unit.lower()
                 if unit not in valid_units:
                     unit = "trip"
-                costs.append(ExtractedCost(
-                    category=cat,
-                    name=c["name"],
-                    amount=float(c.get("amount", 0)),
-                    quantity=float(c.get("quantity", 1)),
-                    unit=unit,
-                    notes=c.get("notes", ""),
-                    text_to_match=c.get("text_to_match", ""),
-                    is_range=bool(c.get("is_range", False))
-                ))
-
-        tourist_traps = []
-        for t in data.get("tourist_traps", []):
-            if isinstance(t, dict) and "name" in t:
-                tourist_traps.append(TouristTrapWarning(
-                    name=t["name"],
-                    description=t.get("description", ""),
-                    location=t.get("location", "")
-                ))
-
-        logging.info(f"[Cost Extraction] Found {len(costs)} costs and {len(tourist_traps)} tourist traps")
-        return ExtractCostsResponse(costs=costs, tourist_traps=tourist_traps)
+                converted = cost_in_usd(c.model_copy(update={"category": cat, "unit": unit}))
+                if converted is not None:
+                    costs.append(converted)
+            chunk_costs.append(costs)
+
+        if len(results) == 1:
+            costs, tourist_traps = chunk_costs[0], results[0].tourist_traps
+        else:
+            costs = merge_costs(chunk_costs)
+            tourist_traps = {}
+            for trap in (t for result in results for t in result.tourist_traps):
+                tourist_traps.setdefault(dedupe_name(trap.name), trap)
+            tourist_traps = list(tourist_traps.values())
+
+        logging.info(f"[Cost Extraction] Found {len(costs)} costs and {len(tourist_traps)} tourist traps "
+                     f"in {len(results)}/{len(chunks)} chunk(s)")
+        response = ExtractCostsResponse(costs=costs, tourist_traps=tourist_traps)
+        response._partial = len(results) < len(chunks)
+        return response
 
-    except json.JSONDecodeError as e:
-        logging.error(f"Failed to parse cost extraction response: {e}")
-        return ExtractCostsResponse(costs=[], tourist_traps=[])
     except Exception as e:
         logging.error(f"Cost extraction failed: {e}")
         return ExtractCostsResponse(costs=[], tourist_traps=[])
 
 
-# Regional cost estimates (average USD per day)
-REGION_COST_ESTIMATES = {
-    "southeast_asia": {
-        "accommodation": 12,  # hostel dorm
-        "food": 15,  # 3 meals
-        "transport_local": 5,
-        "sim_connectivity": 10,  # per month
-        "moped_rental": 8,  # per day
-    },
-    "south_america": {
-        "accommodation": 15,
-        "food": 18,
-        "transport_local": 8,
-        "sim_connectivity": 15,
-        "moped_rental": 12,
-    },
-    "europe": {
-        "accommodation": 30,
-        "food": 35,
-        "transport_local": 12,
-        "sim_connectivity": 20,
-        "moped_rental": 25,
-    },
-    "default": {
-        "accommodation": 20,
-        "food": 25,
-        "transport_local": 10,
-        "sim_connectivity": 15,
-        "moped_rental": 15,
-    }
-}
+COST_TABLE_PATH = os.getenv("COST_TABLE_PATH", os.path.join(os.path.dirname(__file__), "data", "cost_table.csv"))
+COST_TABLE = load_cost_table(COST_TABLE_PATH)
+
+# Nightly rate relative to a dorm bed
+ACCOMMODATION_MULTIPLIERS = {"hostel_dorm": 1.0, "hostel_private": 2.0, "guesthouse": 2.5, "apartment": 3.0}
 
-COUNTRY_TO_REGION = {
-    # Southeast Asia
-    "thailand": "southeast_asia", "vietnam": "southeast_asia", "cambodia": "southeast_asia",
-    "laos": "southeast_asia", "myanmar": "southeast_asia", "indonesia": "southeast_asia",
-    "philippines": "southeast_asia", "malaysia": "southeast_asia", "singapore": "southeast_asia",
-    # South America
-    "ecuador": "south_america", "peru": "south_america", "colombia": "south_america",
-    "bolivia": "south_america", "argentina": "south_america", "chile": "south_america",
-    "brazil": "south_america", "uruguay": "south_america", "paraguay": "south_america",
-    # Europe
-    "spain": "europe", "portugal": "europe", "france": "europe", "italy": "europe",
-    "germany": "europe", "netherlands": "europe", "greece": "europe", "croatia": "europe",
-}
+
+def cost_table_row(location: str) -> int:
+    """Cost table row for a location: a known city, country or region, else the gazetteer's country, else default rates."""
+    row = COST_TABLE.resolve(location, _town_countries if GAZETTEER is not None else None)
+    return row if row is not None else COST_TABLE.default_row
+
+
+def _town_countries(name: str) -> list[str]:
+    """Country codes of gazetteer towns called `name`, most populous first."""
+    # Only towns and cities: a same-named park or temple is no clue to the country
+    towns = [e for e in GAZETTEER.candidates(name) if e.feature_class == "P"]
+    return [e.country_code.upper() for e in sorted(towns, key=lambda e: e.population, reverse=True)]
 
 
 class EstimateCostsRequest(BaseModel):
-    destination: str
-    trip_duration_days: int
+    destination: str = ""
+    trip_duration_days: int = 0
     accommodation_style: str = "hostel_dorm"  # hostel_dorm, hostel_private, guesthouse, etc.
     transportation_style: str = "mixed"  # bus, moto, flights, etc.
     include_moped: bool = False
     include_flights: int = 0  # number of internal flights
+    currency: str = "USD"  # ISO code to report amounts in (converted from USD with FX_RATES)
+    trip_context: Optional[TripContext] = None  # multi-stop trips: estimated across itinerary_breakdown
 
 
 class EstimateCostsResponse(BaseModel):
@@ -2064,104 +2910,164 @@ class EstimateCostsResponse(BaseModel):
     daily_estimate: float
     total_estimate: float
     region: str
+    currency: str = "USD"
+
+
+def estimate_currency(currency: str) -> tuple[float, str]:
+    """USD -> `currency` rate for reporting estimates, falling back to USD when there's no rate."""
+    currency = currency.upper()
+    if currency == "USD":
+        return 1.0, currency
+    rate = FX_RATES.from_usd(1.0, currency) if FX_RATES else None
+    if rate is None:
+        logging.warning(f"[Cost Estimate] No exchange rate for {currency}, returning USD")
+        return 1.0, "USD"
+    return rate, currency
+
+
+def estimate_cost_lines(by_category: dict[str, tuple[float, float]], where: str, accommodation_style: str,
+                        include_moped: bool, include_flights: int, rate: float, currency: str) -> list[ExtractedCost]:
+    """ExtractedCost lines from TripEstimate.by_category() totals, converted with `rate`."""
+    countries = int(by_category["sim_connectivity"][1])
+    lines = {
+        "accommodation": (f"{accommodation_style.replace('_', ' ').title()} ({where} avg)", "night",
+                          "Estimated from destination averages"),
+        "food": ("Daily food budget", "day", "3 meals per day, local food"),
+        "transport_local": ("Local transport (buses, tuk-tuks, etc.)", "day", "Estimated daily transport within cities"),
+    }
+    if countries:  # a stop later in a country already visited reuses its SIM
+        lines["sim_connectivity"] = ("Local SIM card with data", "trip",
+                                     "Monthly plan, one-time cost" if countries == 1 else f"One per country ({countries} countries)")
+    if include_moped:
+        lines["moped_rental"] = ("Moped/scooter rental", "day", "Daily rental rate")
+    if include_flights > 0:
+        lines["transport_flights"] = ("Internal flight", "trip", "Estimated from destination averages")
+
+    costs = []
+    for category, (name, unit, notes) in lines.items():
+        amount, quantity = by_category[category]
+        costs.append(ExtractedCost(
+            category=category,
+            name=name,
+            amount=round(amount * rate, 2),
+            quantity=round(quantity, 2),
+            unit=unit,
+            notes=notes,
+            currency=currency
+        ))
+    return costs
 
 
 @app.post("/api/estimate-costs", response_model=EstimateCostsResponse)
 async def estimate_costs(request: EstimateCostsRequest):
-    """Generate cost estimates based on destination and trip parameters."""
-
-    # Determine region
-    destination_lower = request.destination.lower()
-    region = "default"
-    for country, reg in COUNTRY_TO_REGION.items():
-        if country in destination_lower:
-            region = reg
-            break
-
-    estimates = REGION_COST_ESTIMATES.get(region, REGION_COST_ESTIMATES["default"])
+    """Generate cost estimates from the cost table, summed across stops for multi-stop trips."""
 
-    costs = []
+    if request.trip_context and request.trip_context.itinerary_breakdown:
+        stops = [(s.location, max(s.days, 0)) for s in request.trip_context.itinerary_breakdown]
+    else:
+        stops = [(request.destination, max(request.trip_duration_days, 0))]
 
-    # Accommodation
-    accom_multiplier = 1.0
-    if request.accommodation_style == "hostel_private":
-        accom_multiplier = 2.0
-    elif request.accommodation_style == "guesthouse":
-        accom_multiplier = 2.5
-    elif request.accommodation_style == "apartment":
-        accom_multiplier = 3.0
-
-    costs.append(ExtractedCost(
-        category="accommodation",
-        name=f"{request.accommodation_style.replace('_', ' ').title()} ({region.replace('_', ' ').title()} avg)",
-        amount=estimates["accommodation"] * accom_multiplier,
-        quantity=request.trip_duration_days,
-        unit="night",
-        notes="Estimated based on region averages"
-    ))
-
-    # Food
-    costs.append(ExtractedCost(
-        category="food",
-        name="Daily food budget",
-        amount=estimates["food"],
-        quantity=request.trip_duration_days,
-        unit="day",
-        notes="3 meals per day, local food"
-    ))
-
-    # Local transport
-    costs.append(ExtractedCost(
-        category="transport_local",
-        name="Local transport (buses, tuk-tuks, etc.)",
-        amount=estimates["transport_local"],
-        quantity=request.trip_duration_days,
-        unit="day",
-        notes="Estimated daily transport within cities"
-    ))
-
-    # SIM card
-    costs.append(ExtractedCost(
-        category="sim_connectivity",
-        name="Local SIM card with data",
-        amount=estimates["sim_connectivity"],
-        quantity=1,
-        unit="trip",
-        notes="Monthly plan, one-time cost"
-    ))
-
-    # Moped rental if requested
-    if request.include_moped:
-        costs.append(ExtractedCost(
-            category="moped_rental",
-            name="Moped/scooter rental",
-            amount=estimates["moped_rental"],
-            quantity=request.trip_duration_days,
-            unit="day",
-            notes="Daily rental rate"
-        ))
+    rows = [cost_table_row(location) for location, _ in stops]
+    days = [d for _, d in stops]
+    multipliers = {"accommodation": ACCOMMODATION_MULTIPLIERS.get(request.accommodation_style, 1.0)}
+    trip = COST_TABLE.estimate_trip(rows, days, multipliers, flights=request.include_flights)
 
-    # Internal flights if any
-    if request.include_flights > 0:
-        flight_cost = 80 if region == "southeast_asia" else 120 if region == "south_america" else 150
-        costs.append(ExtractedCost(
-            category="transport_flights",
-            name="Internal flight",
-            amount=flight_cost,
-            quantity=request.include_flights,
-            unit="trip",
-            notes="Estimated based on region"
-        ))
+    regions = list(dict.fromkeys(COST_TABLE.regions[r] for r in rows))
+    places = list(dict.fromkeys(COST_TABLE.names[r].replace("_", " ").title() for r in rows))
+    where = places[0] if len(places) == 1 else f"{len(places)} stops"
+    rate, currency = estimate_currency(request.currency)
+    costs = estimate_cost_lines(trip.by_category(), where, request.accommodation_style,
+                                request.include_moped, request.include_flights, rate, currency)
 
     # Calculate totals
     total = sum(c.amount * c.quantity for c in costs)
-    daily = total / request.trip_duration_days if request.trip_duration_days > 0 else 0
+    trip_days = sum(days)
+    daily = total / trip_days if trip_days > 0 else 0
 
     return EstimateCostsResponse(
         costs=costs,
         daily_estimate=round(daily, 2),
         total_estimate=round(total, 2),
-        region=region
+        region=regions[0] if len(regions) == 1 else "multi_region",
+        currency=currency
+    )
+
+
+class EstimateItineraryCostsRequest(BaseModel):
+    stops: list[ItineraryStop]
+    accommodation_style: str = "hostel_dorm"
+    include_moped: bool = False
+    include_flights: int = 0  # internal flights for the whole trip, shared evenly across stops
+    currency: str = "USD"
+
+
+class StopCostEstimate(BaseModel):
+    location: str  # as given in the request
+    matched_place: str  # cost table entry used (city, country or region)
+    region: str
+    days: int
+    costs: list[ExtractedCost]
+    daily_estimate: float
+    total_estimate: float
+
+
+class EstimateItineraryCostsResponse(BaseModel):
+    stops: list[StopCostEstimate]
+    costs: list[ExtractedCost]  # whole-trip totals per category
+    daily_estimate: float
+    total_estimate: float
+    currency: str = "USD"
+
+
+@app.post("/api/estimate-costs/batch", response_model=EstimateItineraryCostsResponse)
+async def estimate_itinerary_costs(request: EstimateItineraryCostsRequest):
+    """Per-stop and whole-trip cost estimates for an itinerary in one call."""
+
+    # Resolve each distinct location once; itineraries often revisit a hub city
+    resolved = {}
+    for stop in request.stops:
+        if stop.location not in resolved:
+            resolved[stop.location] = cost_table_row(stop.location)
+    rows = [resolved[s.location] for s in request.stops]
+    days = [max(s.days, 0) for s in request.stops]
+
+    multipliers = {"accommodation": ACCOMMODATION_MULTIPLIERS.get(request.accommodation_style, 1.0)}
+    trip = COST_TABLE.estimate_trip(rows, days, multipliers, flights=request.include_flights)
+    rate, currency = estimate_currency(request.currency)
+
+    def summarize(costs: list[ExtractedCost], stop_days: int) -> tuple[float, float]:
+        total = sum(c.amount * c.quantity for c in costs)
+        return round(total / stop_days if stop_days > 0 else 0, 2), round(total, 2)
+
+    stops = []
+    for i, (stop, row) in enumerate(zip(request.stops, rows)):
+        place = COST_TABLE.names[row].replace("_", " ").title()
+        costs = estimate_cost_lines(trip.by_category(i), place, request.accommodation_style,
+                                    request.include_moped, request.include_flights, rate, currency)
+        daily, total = summarize(costs, days[i])
+        stops.append(StopCostEstimate(
+            location=stop.location,
+            matched_place=place,
+            region=COST_TABLE.regions[row],
+            days=days[i],
+            costs=costs,
+            daily_estimate=daily,
+            total_estimate=total
+        ))
+
+    places = list(dict.fromkeys(s.matched_place for s in stops))
+    where = places[0] if len(places) == 1 else f"{len(places)} stops"
+    costs = estimate_cost_lines(trip.by_category(), where, request.accommodation_style,
+                                request.include_moped, request.include_flights, rate, currency)
+    daily, total = summarize(costs, sum(days))
+
+    logging.info(f"[Cost Estimate] Estimated {len(stops)} stops ({len(resolved)} distinct places)")
+    return EstimateItineraryCostsResponse(
+        stops=stops,
+        costs=costs,
+        daily_estimate=daily,
+        total_estimate=total,
+        currency=currency
     )
 
 
@@ -2193,128 +3099,88 @@ class GeneratePackingListResponse(BaseModel):
     items: list[PackingItemOutput]
 
 
-PACKING_LIST_PROMPT = """Generate a personalized packing list for a backpacker trip.
+PACKING_ADDITIONS_PROMPT = """A backpacker already has a standard packing list. Suggest only the extra items their specific bucket-list plans need.
 
-TRIP DETAILS:
-- Destination: {destination}
-- Duration: {trip_duration} days
-- Accommodation: {accommodation_style}
-- Pack Weight Preference: {pack_weight}
-- Electronics Tolerance: {electronics_tolerance}
-- Hygiene Level: {hygiene_threshold}
-- Travel Style: {travel_style}
-- Female Traveler Concerns: {female_traveler_concerns}
+TRIP: {destination}, {trip_duration} days, {travel_style} travel
 
-BUCKET LIST / PLANNED ACTIVITIES:
+BUCKET LIST:
 {bucket_list}
 
-TRIP GOALS:
-{activities}
-
-PACKING GUIDELINES BY WEIGHT PREFERENCE:
-- minimalist: Absolute essentials only, pack light (under 30L), wash clothes frequently
-- moderate: Balance of essentials and comfort items (30-45L)
-- maximalist: Full comfort with extras (45L+)
-
-HYGIENE GUIDELINES:
-- daily: Plan for daily showering, bring more toiletries
-- every_3_days: Standard backpacker hygiene
-- broke_backpacker_mode: Minimal toiletries, embrace the adventure
-
-ELECTRONICS BY TOLERANCE:
-- low: Phone and charger only
-- medium: Phone, charger, maybe a kindle or small camera
-- high: Laptop, camera, drone, power bank, multiple chargers
-
-Generate a practical packing list with items categorized as:
-- clothing: Shirts, pants, underwear, socks, shoes, layers, swimwear, etc.
-- electronics: Devices, chargers, adapters, etc.
-- toiletries: Hygiene products, sunscreen, etc.
-- documents: Passport, copies, cards, etc.
-- gear: Backpack accessories, locks, towels, etc.
-- medical: First aid, medications, etc.
-- misc: Other useful items
-
-Consider the specific activities and destinations. For example:
-- Hiking/trekking: hiking shoes, quick-dry clothes, rain gear
-- Beach: swimsuit, reef-safe sunscreen, sarong
-- Temples/cultural sites: modest clothing, scarf for covering
-- Nightlife: one nice outfit
-- Surfing: rash guard, board shorts
-
-Respond with ONLY valid JSON array of items:
-[
-  {{"name": "Quick-dry T-shirts", "category": "clothing", "quantity": 3, "notes": "Merino wool recommended"}},
-  {{"name": "Travel towel", "category": "gear", "quantity": 1, "notes": "Microfiber, quick-dry"}},
-  {{"name": "Passport", "category": "documents", "quantity": 1, "notes": "Check expiry 6+ months"}}
-]
-"""
+ALREADY PACKED:
+{packed}
 
+Return at most {max_items} items that these particular plans call for and that aren't already packed
+(e.g. "White clothes you don't mind ruining" for Holi, "Printed trek permit" for the Inca Trail).
+Return no items if the plans need nothing beyond the standard list.
 
-@app.post("/api/generate-packing-list", response_model=GeneratePackingListResponse)
-async def generate_packing_list(request: GeneratePackingListRequest):
-    """Generate a personalized packing list based on trip details and user preferences."""
-    import json
+Categories: clothing, electronics, toiletries, documents, gear, medical, misc.
+Keep notes short and practical.
+"""
+PACKING_MAX_ADDITIONS = 8
+
+
+async def packing_additions(request: GeneratePackingListRequest, bucket_list: list[str],
+                            base: tuple[PackingItem, ...]) -> list[PackingItemOutput]:
+    """LLM-suggested items for bucket-list plans the templates don't cover, cached per plan."""
+    prompt = PACKING_ADDITIONS_PROMPT.format(
+        destination=request.destination,
+        trip_duration=request.trip_duration,
+        travel_style=request.travel_style,
+        bucket_list="\n".join(f"- {item}" for item in bucket_list),
+        packed=", ".join(item.name for item in base),
+        max_items=PACKING_MAX_ADDITIONS,
+    )
 
-    try:
-        extraction_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+    async def suggest():
+        extracted = await extract_structured(prompt, GeneratePackingListResponse, temperature=0.3)
+        return extracted.items[:PACKING_MAX_ADDITIONS]
 
-        # Format bucket list
-        bucket_list_str = "\n".join([f"- {item}" for item in request.bucket_list]) if request.bucket_list else "None specified"
+    return await cached_flight(
+        cache_key("packing-additions", prompt), suggest, CACHE_TTL_EXTRACTION, cacheable=bool,
+        dump=lambda items: [i.model_dump() for i in items], load=lambda d: [PackingItemOutput(**i) for i in d],
+    )
 
-        # Format activities
-        activities_str = "\n".join([f"- {act.replace('_', ' ').title()}" for act in request.activities]) if request.activities else "General exploration"
 
-        prompt = PACKING_LIST_PROMPT.format(
-            destination=request.destination,
-            trip_duration=request.trip_duration,
-            accommodation_style=request.accommodation_style.replace('_', ' '),
-            pack_weight=request.pack_weight,
-            electronics_tolerance=request.electronics_tolerance,
-            hygiene_threshold=request.hygiene_threshold.replace('_', ' '),
-            travel_style=request.travel_style,
-            female_traveler_concerns="Yes - include female-specific items" if request.female_traveler_concerns else "No",
-            bucket_list=bucket_list_str,
-            activities=activities_str,
+@app.post("/api/generate-packing-list", response_model=GeneratePackingListResponse)
+async def generate_packing_list(request: GeneratePackingListRequest):
+    """Packing list from templates, with LLM additions only for bucket-list plans they don't cover."""
+    try:
+        region = COST_TABLE.regions[cost_table_row(request.destination)]
+        tags, unmatched = activity_tags(request.activities, request.bucket_list)
+        base = base_packing_list(
+            climate_for(request.destination, region),
+            request.trip_duration,
+            request.accommodation_style,
+            request.pack_weight,
+            request.electronics_tolerance,
+            request.hygiene_threshold,
+            request.travel_style,
+            request.female_traveler_concerns,
+            activities=tags,
         )
-
-        result = extraction_llm.invoke(prompt)
-
-        content = result.content.strip()
-        # Handle markdown code blocks
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        content = content.strip()
-
-        items_data = json.loads(content)
-
-        valid_categories = {"clothing", "electronics", "toiletries", "documents", "gear", "medical", "misc"}
-
-        items = []
-        for item in items_data:
-            if isinstance(item, dict) and "name" in item:
-                cat = item.get("category", "misc").lower()
-                if cat not in valid_categories:
-                    cat = "misc"
-                items.append(PackingItemOutput(
-                    name=item["name"],
-                    category=cat,
-                    quantity=int(item.get("quantity", 1)),
-                    notes=item.get("notes", "")
-                ))
-
-        logging.info(f"[Packing List] Generated {len(items)} items for {request.destination}")
-        return GeneratePackingListResponse(items=items)
-
-    except json.JSONDecodeError as e:
-        logging.error(f"Failed to parse packing list response: {e}")
-        return GeneratePackingListResponse(items=[])
+        items = [PackingItemOutput(**item._asdict()) for item in base]
     except Exception as e:
         logging.error(f"Packing list generation failed: {e}")
         return GeneratePackingListResponse(items=[])
 
+    if unmatched:
+        try:
+            packed = {dedupe_name(item.name) for item in items}
+            for item in await packing_additions(request, unmatched, base):
+                cat = item.category.lower()
+                if cat not in PACKING_CATEGORIES:
+                    cat = "misc"
+                if dedupe_name(item.name) not in packed:
+                    packed.add(dedupe_name(item.name))
+                    items.append(item.model_copy(update={"category": cat}))
+        except Exception as e:
+            # The template list is still a complete answer
+            logging.warning(f"[Packing List] Bucket-list additions failed, returning base list: {e}")
+
+    logging.info(f"[Packing List] {len(base)} template items + {len(items) - len(base)} additions "
+                 f"for {request.destination} ({len(unmatched)} bucket-list items sent to LLM)")
+    return GeneratePackingListResponse(items=items)
+
 
 # ============================================
 # EVENT DISCOVERY (Perplexity-powered)
@@ -2401,8 +3267,8 @@ Return as JSON:
 }}"""
 
         async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                "https://api.perplexity.ai/chat/completions",
+            response = await PROVIDERS["perplexity"].call(lambda: client.post(
+                PERPLEXITY_API_URL,
                 headers={
                     "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
                     "Content-Type": "application/json"
@@ -2423,7 +3289,7 @@ Return as JSON:
                     "temperature": 0.2,
                     "search_recency_filter": "month"
                 }
-            )
+            ))
 
             if response.status_code != 200:
                 logging.error(f"[Events] Perplexity API error: {response.status_code}")
@@ -2490,6 +3356,9 @@ Return as JSON:
             logging.info(f"[Events] Found {len(events)} events for {request.destination}")
             return DiscoverEventsResponse(events=events, travel_advisory=travel_advisory)
 
+    except ProviderUnavailable as e:
+        logging.warning(f"[Events] Perplexity unavailable: {e}")
+        return DiscoverEventsResponse(events=[], travel_advisory="Event discovery is temporarily unavailable")
     except json.JSONDecodeError as e:
         logging.error(f"[Events] Failed to parse response: {e}")
         return DiscoverEventsResponse(events=[], travel_advisory="Failed to parse event data")
@@ -2520,11 +3389,28 @@ class ExtractConversationVarsRequest(BaseModel):
     user_message: str
     ai_response: str
     destination: str
+    current_variables: Optional[ConversationVariables] = None  # state from earlier turns, merged into `state`
 
 
 class ExtractConversationVarsResponse(BaseModel):
-    variables: ConversationVariables
+    variables: ConversationVariables  # learned from this exchange only
     has_new_info: bool = False
+    state: Optional[ConversationVariables] = None  # current_variables + variables, deduped and capped
+
+
+# Skip the LLM for exchanges with nothing to remember ("thanks!" answered without naming any place)
+CONV_VARS_GATING = os.getenv("CONV_VARS_GATING", "true").lower() == "true"
+
+
+def conversation_place_key(name: str) -> Optional[str]:
+    """Canonical key for a place the cost table knows under several names ("Saigon", "HCMC")."""
+    row = COST_TABLE.lookup(name)
+    return COST_TABLE.names[row].casefold() if row is not None else None
+
+
+def merge_conversation_variables(current: Optional[BaseModel], update: Optional[BaseModel]) -> dict:
+    return merge_variables(current.model_dump() if current else None, update.model_dump() if update else None,
+                           conversation_place_key)
 
 
 # ============================================
@@ -2585,59 +3471,32 @@ RULES:
 6. Return empty list if no clear itinerary is present
 7. IMPORTANT: If the text mentions a specific trip length (e.g., "21-Day Itinerary"), make sure total_days matches!
 8. Don't skip travel/transit days - "Day 10: Travel day" still counts as 1 day
-
-Respond with ONLY valid JSON:
-{{
-  "itinerary": [
-    {{"location": "Islamabad", "days": 3, "notes": "Acclimatize, explore Faisal Mosque and Margalla Hills", "order": 0}},
-    {{"location": "Naran", "days": 3, "notes": "Lake Saif-ul-Mulook, stunning mountain scenery", "order": 1}},
-    {{"location": "Hunza Valley", "days": 5, "notes": "Karimabad, Eagle's Nest viewpoint, Attabad Lake", "order": 2}}
-  ],
-  "total_days": 11,
-  "has_itinerary": true
-}}
-
-If no itinerary found, respond with:
-{{
-  "itinerary": [],
-  "total_days": 0,
-  "has_itinerary": false
-}}
 """
 
 
 @app.post("/api/extract-itinerary", response_model=ExtractItineraryResponse)
 async def extract_itinerary(request: ExtractItineraryRequest):
+    """Extract itinerary stops, cached and coalescing identical concurrent requests."""
+    return await cached_flight(
+        flight_key("extract-itinerary", request), lambda: _extract_itinerary(request), CACHE_TTL_EXTRACTION,
+        cacheable=lambda r: bool(r.itinerary), dump=lambda r: r.model_dump(), load=ExtractItineraryResponse.model_validate,
+    )
+
+
+async def _extract_itinerary(request: ExtractItineraryRequest):
     """Extract itinerary stops from AI response text."""
     try:
-        extraction_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-
         prompt = ITINERARY_EXTRACTION_PROMPT.format(
             destination=request.destination,
             text=request.response_text
         )
 
-        result = extraction_llm.invoke(prompt)
-
-        content = result.content.strip()
-        # Handle markdown code blocks
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        content = content.strip()
-
-        data = json.loads(content)
-
-        itinerary = []
-        for idx, stop in enumerate(data.get("itinerary", [])):
-            if isinstance(stop, dict) and "location" in stop and "days" in stop:
-                itinerary.append(ExtractedItineraryStop(
-                    location=stop["location"],
-                    days=int(stop.get("days", 1)),
-                    notes=stop.get("notes", ""),
-                    order=stop.get("order", idx)
-                ))
+        # total_days and has_itinerary are recomputed below rather than trusted
+        extracted = await extract_structured(prompt, ExtractItineraryResponse)
+        itinerary = [
+            stop if "order" in stop.model_fields_set else stop.model_copy(update={"order": idx})
+            for idx, stop in enumerate(extracted.itinerary) if stop.location.strip()
+        ]
 
         total_days = sum(stop.days for stop in itinerary)
         has_itinerary = len(itinerary) >= 2  # Need at least 2 stops for a real itinerary
@@ -2658,9 +3517,6 @@ async def extract_itinerary(request: ExtractItineraryRequest):
             matches_expected_days=matches_expected
         )
 
-    except json.JSONDecodeError as e:
-        logging.error(f"[Itinerary Extraction] Failed to parse response: {e}")
-        return ExtractItineraryResponse(itinerary=[], total_days=0, has_itinerary=False, matches_expected_days=True)
     except Exception as e:
         logging.error(f"[Itinerary Extraction] Failed: {e}")
         return ExtractItineraryResponse(itinerary=[], total_days=0, has_itinerary=False, matches_expected_days=True)
@@ -2696,61 +3552,46 @@ RULES:
 3. For custom_notes, use descriptive keys like "reason_for_trip", "special_occasion", "medical_condition"
 4. If nothing new is learned, return empty lists/strings
 5. Don't include generic travel advice - only user-specific preferences and facts
-
-Return ONLY valid JSON:
-{{
-  "places_discussed": ["specific place 1", "specific place 2"],
-  "places_to_avoid": [],
-  "activity_preferences": ["activity 1"],
-  "food_preferences": [],
-  "accommodation_notes": [],
-  "travel_companions": "",
-  "pace_preference": "",
-  "must_do_activities": [],
-  "concerns": [],
-  "budget_notes": [],
-  "custom_notes": {{}}
-}}
 """
 
 
 @app.post("/api/extract-conversation-vars", response_model=ExtractConversationVarsResponse)
 async def extract_conversation_vars(request: ExtractConversationVarsRequest):
+    """Extract conversation variables and merge them into the caller's state.
+
+    Extraction is cached and coalesced per exchange; the merge is cheap and
+    runs per request, since the state differs between sessions.
+    """
+    if CONV_VARS_GATING:
+        reason = skip_extraction_reason(request.user_message, lambda text: COST_TABLE.resolve(text) is not None,
+                                        request.ai_response)
+        if reason:
+            logging.info(f"[ConvVars] Skipped extraction ({reason}), has_new_info=False")
+            state = merge_conversation_variables(request.current_variables, None)
+            return ExtractConversationVarsResponse(
+                variables=ConversationVariables(), has_new_info=False, state=ConversationVariables(**state)
+            )
+
+    extracted = await cached_flight(
+        cache_key("extract-conversation-vars", request.model_dump(exclude={"current_variables"})),
+        lambda: _extract_conversation_vars(request),
+        CACHE_TTL_EXTRACTION, cacheable=lambda r: any(r.variables.model_dump().values()),
+        dump=lambda r: r.model_dump(), load=ExtractConversationVarsResponse.model_validate,
+    )
+    state = merge_conversation_variables(request.current_variables, extracted.variables)
+    return extracted.model_copy(update={"state": ConversationVariables(**state)})
+
+
+async def _extract_conversation_vars(request: ExtractConversationVarsRequest):
     """Extract conversation variables from a user/AI exchange."""
     try:
-        extraction_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-
         prompt = CONVERSATION_VARS_PROMPT.format(
             destination=request.destination,
             user_message=request.user_message,
             ai_response=request.ai_response
         )
 
-        result = extraction_llm.invoke(prompt)
-
-        content = result.content.strip()
-        # Handle markdown code blocks
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        content = content.strip()
-
-        data = json.loads(content)
-
-        variables = ConversationVariables(
-            places_discussed=data.get("places_discussed", []),
-            places_to_avoid=data.get("places_to_avoid", []),
-            activity_preferences=data.get("activity_preferences", []),
-            food_preferences=data.get("food_preferences", []),
-            accommodation_notes=data.get("accommodation_notes", []),
-            travel_companions=data.get("travel_companions", ""),
-            pace_preference=data.get("pace_preference", ""),
-            must_do_activities=data.get("must_do_activities", []),
-            concerns=data.get("concerns", []),
-            budget_notes=data.get("budget_notes", []),
-            custom_notes=data.get("custom_notes", {})
-        )
+        variables = await extract_structured(prompt, ConversationVariables)
 
         # Check if any meaningful info was extracted
         has_new_info = (
@@ -2770,9 +3611,6 @@ async def extract_conversation_vars(request: ExtractConversationVarsRequest):
         logging.info(f"[ConvVars] Extracted variables, has_new_info={has_new_info}")
         return ExtractConversationVarsResponse(variables=variables, has_new_info=has_new_info)
 
-    except json.JSONDecodeError as e:
-        logging.error(f"[ConvVars] Failed to parse response: {e}")
-        return ExtractConversationVarsResponse(variables=ConversationVariables(), has_new_info=False)
     except Exception as e:
         logging.error(f"[ConvVars] Extraction failed: {e}")
         return ExtractConversationVarsResponse(variables=ConversationVariables(), has_new_info=False)
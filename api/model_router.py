@@ -0,0 +1,100 @@
+"""Per-request model choice by task, input size and latency budget.
+
+Each task has ordered routes; the first whose conditions all hold (or that has
+none) picks the model:
+
+    max_chars  the input is at most this long
+    when       the caller passed this signal, e.g. "acknowledgement" for a
+               "thanks!" that doesn't need the flagship to answer
+
+`timeout` is the task's latency budget in seconds (time to first token for
+streams): past it the call is abandoned and retried once on `fallback`, a
+faster model. Streams have none by default, since the flagship's slow starts
+are normal; set one to trade answer quality for a bounded wait.
+
+Override any task with MODEL_ROUTES, as inline JSON or a path to a JSON file:
+
+    MODEL_ROUTES='{"chat_stream": {"routes": [{"when": "acknowledgement", "model": "gpt-4o"}, {"model": "gpt-5.2"}],
+                                   "fallback": "gpt-4o", "timeout": 30}}'
+"""
+import json
+import logging
+import os
+from typing import Iterable, NamedTuple, Optional
+
+FLAGSHIP_MODEL = "gpt-5.2"
+
+DEFAULT_ROUTES = {
+    # Short asks can still be demanding ("Plan my 2 week trip to Peru"); only acknowledgements skip the flagship
+    "chat": {"routes": [{"when": "acknowledgement", "model": "gpt-4o"}, {"model": FLAGSHIP_MODEL}],
+             "fallback": "gpt-4o", "timeout": 90},
+    "chat_stream": {"routes": [{"when": "acknowledgement", "model": "gpt-4o"}, {"model": FLAGSHIP_MODEL}],
+                    "fallback": "gpt-4o", "timeout": None},
+    # Standalone-question rewrite before retrieval: a short reformulation, on every multi-turn message
+    "rewrite": {"routes": [{"model": "gpt-4o-mini"}], "fallback": None, "timeout": None},
+    # Short texts have few places; long ones are where the small model missed locations
+    "extract_locations": {"routes": [{"max_chars": 800, "model": "gpt-4o-mini"}, {"model": "gpt-4o"}],
+                          "fallback": "gpt-4o-mini", "timeout": 30},
+    "extract": {"routes": [{"model": "gpt-4o-mini"}], "fallback": None, "timeout": None},
+}
+
+
+class Route(NamedTuple):
+    model: str
+    fallback: Optional[str]
+    timeout: Optional[float]
+
+
+class ModelRouter:
+    def __init__(self, routes: dict):
+        self.routes = routes
+
+    def route(self, task: str, input_chars: int, signals: Iterable[str] = ()) -> Route:
+        config = self.routes.get(task) or self.routes["extract"]
+        signals = set(signals)
+        model = next(
+            r["model"] for r in config["routes"]
+            if (r.get("max_chars") is None or input_chars <= r["max_chars"]) and (not r.get("when") or r["when"] in signals)
+        )
+        return Route(model, config.get("fallback"), config.get("timeout"))
+
+    def models(self) -> set[str]:
+        """Every model some route or fallback can pick."""
+        models = set()
+        for config in self.routes.values():
+            models.update(r["model"] for r in config["routes"])
+            if config.get("fallback"):
+                models.add(config["fallback"])
+        return models
+
+
+def _valid(task: str, config) -> bool:
+    try:
+        routes = config["routes"]
+        ok = (bool(routes) and all(isinstance(r["model"], str) for r in routes)
+              and routes[-1].get("max_chars") is None and not routes[-1].get("when"))
+    except (KeyError, TypeError):
+        ok = False
+    if not ok:
+        logging.error(f"[Router] Ignoring MODEL_ROUTES entry for {task!r}: needs 'routes' ending in one without conditions")
+    return ok
+
+
+def load_router(override: Optional[str] = None) -> ModelRouter:
+    """Default routes with MODEL_ROUTES (inline JSON or a file path) applied per task."""
+    routes = {task: dict(config) for task, config in DEFAULT_ROUTES.items()}
+    if override:
+        try:
+            if os.path.exists(override):
+                with open(override, "r", encoding="utf-8") as f:
+                    custom = json.load(f)
+            else:
+                custom = json.loads(override)
+        except (OSError, ValueError) as e:
+            logging.error(f"[Router] Invalid MODEL_ROUTES, using defaults: {e}")
+            custom = {}
+        routes.update({task: config for task, config in custom.items() if _valid(task, config)})
+    logging.info("[Router] Model routes: " + ", ".join(
+        f"{task}={'/'.join(r['model'] for r in config['routes'])}" for task, config in routes.items()
+    ))
+    return ModelRouter(routes)
@@ -0,0 +1,214 @@
+"""Template packing lists, so /api/generate-packing-list rarely needs the LLM.
+
+Most of a backpacker's list follows from a handful of facts: climate, trip
+length, pack weight, where they sleep and what they'll do. Those map to
+items through PACKING_ITEMS below; the list for a given combination is built
+once per process and cached. Only bucket-list entries the keyword rules don't
+recognize ("White clothes for Holi", "Tango lesson in Buenos Aires") go to the LLM.
+
+    tags, unmatched = activity_tags(request.activities, request.bucket_list)
+    items = base_packing_list(climate_for(destination, region), trip_duration, ..., activities=tags)
+"""
+import functools
+import re
+from typing import NamedTuple
+
+CATEGORIES = ("documents", "clothing", "toiletries", "electronics", "gear", "medical", "misc")
+
+# Cost-table region -> climate, overridden by CLIMATE_KEYWORDS in the destination
+CLIMATE_BY_REGION = {
+    "southeast_asia": "tropical", "south_asia": "tropical", "central_america": "tropical",
+    "south_america": "temperate", "east_asia": "temperate", "europe": "temperate", "north_america": "temperate",
+    "oceania": "temperate", "middle_east": "arid", "africa": "arid",
+}
+CLIMATE_KEYWORDS = [
+    ("cold", ("patagonia", "iceland", "himalaya", "himalayas", "himalayan", "alps", "tibet", "ladakh", "lapland",
+              "mongolia", "antarctica", "greenland", "svalbard", "norway", "siberia")),
+    ("arid", ("desert", "deserts", "sahara", "atacama", "wadi rum", "rajasthan", "outback", "gobi")),
+    ("tropical", ("amazon", "jungle", "jungles", "caribbean", "bali", "borneo", "zanzibar", "galapagos")),
+]
+
+# Activity tags recognized in trip goals and bucket-list entries; first matches are
+# not exclusive ("trek to everest base camp" is trekking and altitude). Keywords
+# match whole words, so plurals and -ing forms are listed ("camp" isn't "Campeche").
+ACTIVITY_KEYWORDS = [
+    ("trekking", ("trek", "treks", "trekking", "hike", "hikes", "hiking", "summit", "summits", "volcano", "volcanoes",
+                  "mountain", "mountains", "camino", "walk", "walks", "walking", "trail", "trails")),
+    ("altitude", ("altitude", "everest", "annapurna", "himalaya", "himalayas", "kilimanjaro", "andes", "base camp",
+                  "rainbow mountain")),
+    ("beach", ("beach", "beaches", "island", "islands", "snorkel", "snorkeling", "snorkelling", "swim", "swimming",
+               "sail", "sailing", "lagoon", "lagoons", "kayak", "kayaking")),
+    ("surf", ("surf", "surfing", "surfer", "surfers")),
+    ("diving", ("dive", "dives", "diving", "scuba", "freedive", "freediving")),
+    ("temples", ("temple", "temples", "pagoda", "pagodas", "mosque", "mosques", "monastery", "monasteries", "shrine",
+                 "shrines", "cathedral", "cathedrals", "angkor", "cultural")),
+    ("nightlife", ("party", "parties", "partying", "nightlife", "club", "clubs", "clubbing", "bar crawl", "pub crawl",
+                   "full moon")),
+    ("snow", ("ski", "skiing", "snowboard", "snowboarding", "glacier", "glaciers", "snow", "northern lights",
+              "aurora")),
+    ("camping", ("camp", "camps", "camping", "campsite", "safari", "safaris")),
+    ("moto", ("moto", "motorbike", "motorbikes", "motorbiking", "motorcycle", "motorcycles", "scooter", "scooters",
+              "moped", "mopeds", "road trip")),
+    ("volunteering", ("volunteer", "volunteers", "volunteering")),
+    ("work", ("digital nomad", "remote work", "coworking")),
+]
+
+# Days of clothes to carry before doing laundry
+CLOTHING_DAYS = {"minimalist": 3, "moderate": 5, "maximalist": 7}
+
+# (name, category, quantity, notes, conditions). Every condition must hold; a
+# condition is a tag, "a|b" for any of several, or "!tag" for its absence.
+# Quantity "days" means one per day of clothes.
+PACKING_ITEMS = [
+    ("Passport", "documents", 1, "Check expiry 6+ months", ()),
+    ("Passport copies", "documents", 1, "Paper copy plus one in the cloud", ()),
+    ("Debit and backup credit card", "documents", 2, "Keep them in separate bags", ()),
+    ("Travel insurance details", "documents", 1, "", ()),
+    ("Passport photos", "documents", 4, "For visas and SIM cards", ("!duration:short",)),
+    ("International Driving Permit", "documents", 1, "Needed for moped insurance to pay out", ("activity:moto",)),
+
+    ("Underwear", "clothing", "days", "", ()),
+    ("Socks", "clothing", "days", "", ()),
+    ("T-shirts", "clothing", "days", "Quick-dry or merino", ()),
+    ("Shorts", "clothing", 2, "", ("climate:tropical|climate:arid|activity:beach",)),
+    ("Lightweight trousers", "clothing", 1, "Doubles for temples and night buses", ()),
+    ("Fleece or mid-layer", "clothing", 1, "", ("climate:cold|climate:temperate|activity:altitude|activity:snow",)),
+    ("Insulated jacket", "clothing", 1, "Packable down", ("climate:cold|activity:altitude|activity:snow",)),
+    ("Thermal base layers", "clothing", 1, "", ("climate:cold|activity:altitude|activity:snow",)),
+    ("Beanie and gloves", "clothing", 1, "", ("climate:cold|activity:altitude|activity:snow",)),
+    ("Rain jacket", "clothing", 1, "Packable", ("!climate:arid",)),
+    ("Sun hat", "clothing", 1, "", ("climate:tropical|climate:arid|activity:beach",)),
+    ("Swimwear", "clothing", 1, "", ("climate:tropical|activity:beach|activity:surf|activity:diving",)),
+    ("Rash guard", "clothing", 1, "", ("activity:surf|activity:diving",)),
+    ("Flip-flops", "clothing", 1, "Also for hostel showers", ()),
+    ("Walking shoes", "clothing", 1, "", ("!activity:trekking",)),
+    ("Hiking boots", "clothing", 1, "Broken in before the trip", ("activity:trekking",)),
+    ("Scarf or sarong", "clothing", 1, "Covers shoulders and knees at religious sites",
+     ("activity:temples|climate:arid|female",)),
+    ("One nice outfit", "clothing", 1, "", ("activity:nightlife|weight:maximalist",)),
+    ("Work clothes and gloves", "clothing", 1, "", ("activity:volunteering",)),
+    ("Sleepwear", "clothing", 1, "", ("!weight:minimalist",)),
+
+    ("Toothbrush and toothpaste", "toiletries", 1, "", ()),
+    ("Deodorant", "toiletries", 1, "", ()),
+    ("Shampoo bar", "toiletries", 1, "Solid, so no liquid limits", ()),
+    ("Soap bar", "toiletries", 1, "", ("!hygiene:broke_backpacker_mode",)),
+    ("Razor", "toiletries", 1, "", ("!hygiene:broke_backpacker_mode",)),
+    ("Sunscreen", "toiletries", 1, "Reef-safe for beaches",
+     ("climate:tropical|climate:arid|activity:beach|activity:snow|activity:altitude",)),
+    ("Insect repellent", "toiletries", 1, "DEET or picaridin", ("climate:tropical|activity:camping",)),
+    ("Lip balm with SPF", "toiletries", 1, "", ("climate:cold|climate:arid|activity:altitude|activity:snow",)),
+    ("Wet wipes", "toiletries", 1, "", ()),
+    ("Hand sanitizer", "toiletries", 1, "", ()),
+    ("Menstrual cup or supplies", "toiletries", 1, "", ("female",)),
+    ("Laundry soap", "toiletries", 1, "For sink washing", ("weight:minimalist|duration:long",)),
+    ("Nail clippers", "toiletries", 1, "", ("!weight:minimalist",)),
+
+    ("Phone", "electronics", 1, "Unlocked, for local SIMs", ()),
+    ("Phone charger and cable", "electronics", 1, "", ()),
+    ("Universal travel adapter", "electronics", 1, "", ()),
+    ("Power bank", "electronics", 1, "10,000 mAh is plenty", ("!electronics:low",)),
+    ("Headphones", "electronics", 1, "", ("!electronics:low",)),
+    ("E-reader", "electronics", 1, "", ("electronics:medium|electronics:high",)),
+    ("Laptop and charger", "electronics", 1, "", ("electronics:high|activity:work",)),
+    ("Camera", "electronics", 1, "", ("electronics:high",)),
+    ("Waterproof phone pouch", "electronics", 1, "", ("activity:beach|activity:surf|activity:diving",)),
+
+    ("Backpack", "gear", 1, "Under 30L, carry-on size", ("weight:minimalist",)),
+    ("Backpack", "gear", 1, "30-45L", ("weight:moderate",)),
+    ("Backpack", "gear", 1, "45L+", ("weight:maximalist",)),
+    ("Packable daypack", "gear", 1, "", ("!weight:minimalist",)),
+    ("Packing cubes", "gear", 2, "", ("!weight:minimalist",)),
+    ("Padlock", "gear", 1, "For hostel lockers", ("accommodation:hostel_dorm|accommodation:hostel_private",)),
+    ("Earplugs and eye mask", "gear", 1, "",
+     ("accommodation:hostel_dorm|accommodation:hostel_private|accommodation:couchsurfing",)),
+    ("Quick-dry towel", "gear", 1, "",
+     ("accommodation:hostel_dorm|accommodation:hostel_private|accommodation:tent|accommodation:van"
+      "|accommodation:couchsurfing|activity:beach",)),
+    ("Sleeping bag liner", "gear", 1, "Silk, for questionable sheets", ("accommodation:hostel_dorm|activity:trekking",)),
+    ("Headlamp", "gear", 1, "", ("activity:trekking|activity:camping|accommodation:hostel_dorm|accommodation:tent",)),
+    ("Reusable water bottle", "gear", 1, "One with a filter where tap water isn't safe", ()),
+    ("Dry bag", "gear", 1, "", ("activity:beach|activity:surf|activity:diving|activity:trekking",)),
+    ("Trekking poles", "gear", 1, "", ("activity:trekking", "!weight:minimalist")),
+    ("Tent, sleeping bag and mat", "gear", 1, "", ("accommodation:tent",)),
+    ("Snorkel mask", "gear", 1, "", ("activity:beach|activity:diving", "!weight:minimalist")),
+    ("Door stop alarm", "gear", 1, "", ("female", "style:solo")),
+
+    ("First aid kit", "medical", 1, "Plasters, blister pads, antiseptic", ()),
+    ("Painkillers", "medical", 1, "", ()),
+    ("Anti-diarrhea tablets", "medical", 1, "", ()),
+    ("Prescription medications", "medical", 1, "Enough for the whole trip, plus copies of prescriptions", ()),
+    ("Rehydration salts", "medical", 1, "", ("climate:tropical|climate:arid|activity:trekking",)),
+    ("Altitude sickness tablets", "medical", 1, "Ask a travel clinic about acetazolamide", ("activity:altitude",)),
+    ("Antimalarials", "medical", 1, "Only if a travel clinic advises them", ("climate:tropical",)),
+    ("Motion sickness tablets", "medical", 1, "", ("activity:beach|activity:diving",)),
+    ("Children's medicine", "medical", 1, "", ("style:family",)),
+
+    ("Ziplock bags", "misc", 3, "", ()),
+    ("Pen", "misc", 1, "For arrival forms", ()),
+    ("Deck of cards", "misc", 1, "", ("style:couple|style:group|style:family",)),
+]
+
+
+class PackingItem(NamedTuple):
+    name: str
+    category: str
+    quantity: int
+    notes: str
+
+
+def _keyword_tags(text: str, rules) -> list[str]:
+    lowered = text.replace("_", " ").casefold()
+    return [tag for tag, keywords in rules if any(re.search(rf"\b{re.escape(k)}\b", lowered) for k in keywords)]
+
+
+def climate_for(destination: str, region: str = "") -> str:
+    """Rough climate for a destination: named cold/arid/tropical places first, then its region."""
+    tags = _keyword_tags(destination, CLIMATE_KEYWORDS)
+    return tags[0] if tags else CLIMATE_BY_REGION.get(region, "temperate")
+
+
+def activity_tags(activities: list[str], bucket_list: list[str]) -> tuple[frozenset[str], list[str]]:
+    """Activity tags from trip goals and bucket-list entries, plus the entries no rule recognized."""
+    tags = set()
+    for activity in activities:
+        tags.update(_keyword_tags(activity, ACTIVITY_KEYWORDS))
+    unmatched = []
+    for entry in bucket_list:
+        entry_tags = _keyword_tags(entry, ACTIVITY_KEYWORDS)
+        tags.update(entry_tags)
+        if not entry_tags:
+            unmatched.append(entry)
+    return frozenset(tags), unmatched
+
+
+def _holds(condition: str, tags: frozenset[str]) -> bool:
+    if condition.startswith("!"):
+        return condition[1:] not in tags
+    return any(option in tags for option in condition.split("|"))
+
+
+@functools.lru_cache(maxsize=512)
+def _build(tags: frozenset[str], clothing_days: int) -> tuple[PackingItem, ...]:
+    items = []
+    for name, category, quantity, notes, conditions in PACKING_ITEMS:
+        if all(_holds(c, tags) for c in conditions):
+            items.append(PackingItem(name, category, clothing_days if quantity == "days" else quantity, notes))
+    return tuple(items)
+
+
+def base_packing_list(climate: str, trip_duration: int, accommodation_style: str, pack_weight: str,
+                      electronics_tolerance: str, hygiene_threshold: str, travel_style: str,
+                      female_traveler_concerns: bool, activities: frozenset[str] = frozenset()) -> tuple[PackingItem, ...]:
+    """Deterministic base list; identical combinations share one cached build."""
+    pack_weight = pack_weight if pack_weight in CLOTHING_DAYS else "moderate"
+    duration = "short" if trip_duration <= 7 else "long" if trip_duration >= 30 else "medium"
+    clothing_days = max(1, min(trip_duration, CLOTHING_DAYS[pack_weight] + (hygiene_threshold == "daily")))
+    tags = {
+        f"climate:{climate}", f"duration:{duration}", f"weight:{pack_weight}", f"electronics:{electronics_tolerance}",
+        f"hygiene:{hygiene_threshold}", f"accommodation:{accommodation_style}", f"style:{travel_style}",
+        *(f"activity:{a}" for a in activities),
+    }
+    if female_traveler_concerns:
+        tags.add("female")
+    return _build(frozenset(tags), clothing_days)
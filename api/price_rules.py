@@ -0,0 +1,241 @@
+"""Rule-based price extraction for the common, unambiguous case.
+
+Most assistant replies quote a handful of explicit prices in "<thing> costs
+$15/night" or "dorms are 250 baht" shape. Those parse deterministically in well
+under a millisecond, with local currencies converted to USD from the offline
+rates table, so /api/extract-costs only needs the LLM when the text is
+ambiguous: prices with no recognizable subject or currency, totals for several
+nights or people, abbreviated or spelled-out amounts ("$1.5k", "ten dollars"),
+scam warnings to pick out, or more figures than a reply's rates usually have.
+
+    result = extract_prices(text, fx_rates, destination)
+    if result.reason is None:
+        ...  # result.mentions is the complete answer, amounts in USD
+"""
+import re
+from typing import NamedTuple, Optional
+
+from currency import CURRENCY_PREFIX, CURRENCY_SUFFIX, FxRates, currency_code
+
+# More mentions than this is usually a full budget breakdown with per-city
+# duplicates and summaries - the judgment calls the LLM prompt is written for
+MAX_MENTIONS = 12
+
+_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?"
+_UNIT_WORDS = {
+    "night": "night", "nightly": "night", "nite": "night",
+    "day": "day", "daily": "day",
+    "meal": "meal", "dish": "meal", "plate": "meal",
+    "person": "person", "pp": "person", "head": "person",
+    "week": "week", "weekly": "week",
+    "month": "month", "monthly": "month",
+    "trip": "trip", "ride": "trip", "journey": "trip", "entry": "trip", "ticket": "trip",
+}
+_UNIT_PATTERN = "|".join(sorted(_UNIT_WORDS, key=len, reverse=True))
+# Matches bare numbers too; extract_prices skips those without a currency marker
+PRICE_RE = re.compile(
+    rf"(?P<prefix>{CURRENCY_PREFIX})?(?P<low>{_NUMBER})"
+    rf"(?:\s?(?:-|–|—|to)\s?{CURRENCY_PREFIX}?(?P<high>{_NUMBER}))?"
+    rf"(?P<suffix>{CURRENCY_SUFFIX})?"
+    rf"(?P<unit>\s?(?:/|per\s|an?\s|each\s)\s?(?:{_UNIT_PATTERN})\b|\s(?:nightly|daily|weekly|monthly)\b)?",
+    re.IGNORECASE,
+)
+
+TOURIST_TRAP_RE = re.compile(r"\b(?:scams?|scammers?|rip-?offs?|tourist traps?|overpriced|overcharg\w*)\b", re.IGNORECASE)
+# Figures the extraction prompt says to skip: budget summaries and totals
+SUMMARY_RE = re.compile(r"\b(?:total|daily budget|budget:|budget of|budget around|in total|altogether|overall)\b", re.IGNORECASE)
+
+# First match wins, so specific categories come before the broad ones
+# ("boat tour" is an activity, "overnight boat" is transport)
+CATEGORY_KEYWORDS = [
+    ("visa_border", ("visa", "border", "departure tax", "entry permit", "arrival fee")),
+    ("sim_connectivity", ("esim", "sim card", "sim", "data plan", "mobile data", "wifi")),
+    ("insurance", ("insurance",)),
+    ("moped_rental", ("moped", "scooter", "motorbike", "motorcycle rental", "bike rental")),
+    ("transport_flights", ("flight", "airfare", "plane ticket", "airline")),
+    ("activities", ("tour", "trek", "hike", "entrance", "entry", "admission", "museum",
+                    "park fee", "national park", "temple", "dive", "diving", "snorkel", "surf", "lesson",
+                    "class", "massage", "cruise", "excursion", "safari", "kayak", "climb")),
+    ("accommodation", ("hostel", "dorm", "guesthouse", "guest house", "hotel", "room", "bungalow",
+                       "homestay", "airbnb", "camping", "campsite", "lodge", "bed", "accommodation", "stay")),
+    ("transport_local", ("bus", "tuk-tuk", "tuk tuk", "taxi", "grab", "uber", "metro", "subway", "train",
+                         "ferry", "boat", "rickshaw", "songthaew", "minivan", "colectivo", "jeepney",
+                         "shuttle", "transfer", "transport")),
+    ("food", ("food", "meal", "breakfast", "lunch", "dinner", "street food", "restaurant", "eat", "dish",
+              "beer", "coffee", "drink", "snack", "noodle", "curry", "pad thai", "pho", "market", "groceries",
+              "taco", "banh mi", "dumpling", "empanada", "kebab", "sandwich", "soup", "smoothie", "cocktail")),
+    ("gear", ("gear", "backpack", "rain jacket", "lock", "towel", "headlamp")),
+]
+# Unit implied when the text gives none (matches the extraction prompt's guidance)
+DEFAULT_UNITS = {"accommodation": "night", "food": "meal", "moped_rental": "day", "transport_local": "trip"}
+
+# List markers and bare counts, but not the number in "2-hour boat"
+_LEADING_FILLER = re.compile(r"^(?:[-*•>#.)\s]|\d+(?=[.)\s])|\*\*|(?:and|or|while|but|plus|with|a|an|the)(?:\s|$)|,|;)+",
+                             re.IGNORECASE)
+_TRAILING_FILLER = re.compile(
+    r"(?:\s|:|-|–|\*\*|=|~|\(|\b(?:costs?|run|runs|is|are|was|go(?:es)?(?: for)?|ranges?|about|around|roughly|approx(?:imately)?|"
+    r"from|for|at|only|just|usually|typically|will set you back|sets you back|expect(?: to)?|pay|spend|charges?|"
+    r"starts? at|starting at|will be|should be|be)\b)+$",
+    re.IGNORECASE,
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z*])|\n")
+# A name is the noun phrase next to its price: clauses before it ("Night bus takes 10 hours and costs $15",
+# "You can get a beer for $2") are cut at punctuation, conjunctions and verbs
+_CLAUSE_BREAK = re.compile(
+    r"[,;]|\b(?:but|so|then|though|although|because|which|that|where|when|while|if|"
+    r"is|are|was|were|has|have|had|takes?|took|lasts?|can|could|will|would|should|might|may|"
+    r"get|gets|got|buy|bought|find|grab|pay|paid|spend|spent)\b",
+    re.IGNORECASE,
+)
+_MEASURE = re.compile(
+    r"\b\d+(?:\.\d+)?\s+(?:hours?|hrs?|minutes?|mins?|days?|nights?|weeks?|months?|km|kilomet(?:er|re)s?|miles?)\b",
+    re.IGNORECASE,
+)
+_PRONOUN = re.compile(r"^(?:i|you|we|they|he|she|it|this|that|these|those|there|one)(?:'\w+)?$", re.IGNORECASE)
+_MAX_NAME_WORDS = 6
+
+# A price for several nights or people ("5 nights in a bungalow is $100") isn't a unit rate
+_QUANTITY = re.compile(
+    r"\b(?:\d+|two|three|four|five|six|seven|eight|nine|ten|a few|several|a couple of)\s+"
+    r"(?:nights|days|weeks|months|people|persons|travell?ers)\b",
+    re.IGNORECASE,
+)
+# "$1.5k", "2 million dong": PRICE_RE stops before the magnitude
+_NUMBER_WORDS = (r"one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|fifteen|twenty|thirty|forty|"
+                 r"fifty|sixty|seventy|eighty|ninety|hundred|thousand|few|couple(?: of)?|several")
+# "ten dollars a night": a price PRICE_RE can't read, so the sentence isn't fully parsed
+_SPELLED_PRICE = re.compile(rf"\b(?:{_NUMBER_WORDS})(?:[\s-]+(?:{_NUMBER_WORDS}|and))*{CURRENCY_SUFFIX}", re.IGNORECASE)
+_MAGNITUDE = re.compile(rf"\s?(?:k|m|mn|bn|grand|thousand|million)\b(?P<suffix>{CURRENCY_SUFFIX})?", re.IGNORECASE)
+
+
+class PriceMention(NamedTuple):
+    category: str
+    name: str
+    amount: float
+    unit: str
+    notes: str
+    text_to_match: str
+    is_range: bool
+
+
+class PriceExtraction(NamedTuple):
+    mentions: list[PriceMention]
+    reason: Optional[str]  # why the LLM is still needed; None when the mentions are the full answer
+
+
+def _amount(value: str) -> float:
+    return float(value.replace(",", ""))
+
+
+def _strip_filler(text: str) -> str:
+    text = _LEADING_FILLER.sub("", text.strip())
+    return _TRAILING_FILLER.sub("", text).strip(" *:-–,")
+
+
+def _clean_name(fragment: str, before_price: bool = True) -> str:
+    """The noun phrase of `fragment` nearest the price, or "" if that's a pronoun ("...and it costs $20")."""
+    clauses = [_strip_filler(_MEASURE.sub("", c)) for c in _CLAUSE_BREAK.split(_strip_filler(fragment))]
+    clauses = [c for c in clauses if c]
+    if not clauses:
+        return ""
+    words = (clauses[-1] if before_price else clauses[0]).split()
+    if _PRONOUN.match(words[-1] if before_price else words[0]):
+        return ""
+    return " ".join(words[-_MAX_NAME_WORDS:])
+
+
+def categorize(text: str) -> Optional[str]:
+    lowered = text.casefold()
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(re.search(rf"\b{re.escape(k)}", lowered) for k in keywords):
+            return category
+    return None
+
+
+def _sentences(text: str):
+    """Split on sentence ends and line breaks (bullets are one line each)."""
+    start = 0
+    for boundary in _SENTENCE_END.finditer(text):
+        yield text[start:boundary.start()]
+        start = boundary.end()
+    yield text[start:]
+
+
+def _format_amount(value: float) -> str:
+    return f"{value:,.2f}".rstrip("0").rstrip(".")
+
+
+def extract_prices(text: str, fx: Optional[FxRates] = None, destination: str = "") -> PriceExtraction:
+    """Parse explicit prices into USD cost mentions, or say why the text needs the LLM.
+
+    Without `fx` only USD prices can be parsed; anything else is inconclusive.
+    `destination` disambiguates pesos and rupees.
+    """
+    if TOURIST_TRAP_RE.search(text):
+        return PriceExtraction([], "mentions scams or tourist traps")
+
+    mentions = []
+    for sentence in _sentences(text):
+        if SUMMARY_RE.search(sentence):
+            continue  # budget summaries and totals aren't extractable costs
+        spelled = _SPELLED_PRICE.search(sentence)
+        if spelled:
+            return PriceExtraction([], f"spelled-out amount '{spelled.group(0).strip()}'")
+        matches = []
+        for m in PRICE_RE.finditer(sentence):
+            magnitude = _MAGNITUDE.match(sentence, m.end())
+            if magnitude and (m.group("prefix") or m.group("suffix") or magnitude.group("suffix")):
+                return PriceExtraction([], f"abbreviated amount '{sentence[m.start():magnitude.end()].strip()}'")
+            if m.group("prefix") or m.group("suffix"):
+                matches.append(m)
+        previous_end = 0
+        for match in matches:
+            name = _clean_name(sentence[previous_end:match.start()])
+            after = sentence[match.end():]
+            previous_end = match.end()
+            if not name:
+                # "$5 for a bus ticket" - the subject follows the price
+                follow = re.match(r"\s*(?:for|on)\s+(?:an?\s|the\s)?([^,;.()]+)", after)
+                name = _clean_name(follow.group(1), before_price=False) if follow else ""
+            category = categorize(name)
+            if not category and len(matches) == 1:
+                category = categorize(sentence)  # "Dinner at Jay Fai is $40" - keyword outside the name
+            if not name or not category:
+                return PriceExtraction([], f"no recognizable subject for '{match.group(0).strip()}'")
+
+            marker = (match.group("suffix") or match.group("prefix")).strip()
+            currency = currency_code(marker, destination)
+            if currency is None:
+                return PriceExtraction([], f"unknown currency '{marker}'")
+            low = _amount(match.group("low"))
+            high = _amount(match.group("high")) if match.group("high") else None
+            if high is not None and high < low:
+                return PriceExtraction([], f"unclear range '{match.group(0).strip()}'")
+
+            quoted = ""
+            if currency != "USD":
+                if fx is None or fx.to_usd(low, currency) is None:
+                    return PriceExtraction([], f"no exchange rate for {currency}")
+                quoted = f"Quoted as {_format_amount(low)}{'-' + _format_amount(high) if high is not None else ''} {currency}"
+                low, high = fx.to_usd(low, currency), fx.to_usd(high, currency) if high is not None else None
+            if not match.group("unit") and _QUANTITY.search(sentence):
+                return PriceExtraction([], f"'{match.group(0).strip()}' may cover several nights or people")
+            unit_text = (match.group("unit") or "").strip().split()[-1:] or [""]
+            unit = _UNIT_WORDS.get(unit_text[0].lstrip("/").casefold()) or DEFAULT_UNITS.get(category, "trip")
+
+            mentions.append(PriceMention(
+                category=category,
+                name=name[:1].upper() + name[1:] if name[1:2].islower() else name,
+                amount=round((low + high) / 2 if high is not None else low, 2),
+                unit=unit,
+                notes="; ".join(filter(None, [
+                    f"Range ${_format_amount(round(low, 2))}-{_format_amount(round(high, 2))}" if high is not None else "",
+                    quoted,
+                ])),
+                text_to_match=match.group(0).strip(),
+                is_range=high is not None,
+            ))
+            if len(mentions) > MAX_MENTIONS:
+                return PriceExtraction([], f"more than {MAX_MENTIONS} prices")
+
+    return PriceExtraction(mentions, None)
@@ -0,0 +1,111 @@
+"""Optional rerank stage between vector retrieval and the prompt.
+
+The retriever overfetches candidates by raw vector similarity; a reranker
+scores them against the standalone question and the trip destination and
+keeps the best few, so the prompt carries fewer but more relevant chunks.
+
+Two scorers:
+  lexical        BM25 over the candidate set plus a destination bonus, fused
+                 with the original vector rank (reciprocal rank fusion). No
+                 extra dependencies, sub-millisecond.
+  cross-encoder  sentence-transformers CrossEncoder on CPU
+                 (pip install sentence-transformers). Falls back to lexical
+                 if the package or model is unavailable.
+"""
+import logging
+import math
+import re
+from collections import Counter
+from typing import Optional
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "best", "by", "can", "do", "does", "for", "from", "get", "how",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "should", "that", "the", "there", "this", "to",
+    "what", "when", "where", "which", "who", "why", "with", "you", "your",
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Lexical evidence that a chunk is about the trip destination (text or section headers)
+DESTINATION_BONUS = 2.0
+# Reciprocal rank fusion constant; keeps the vector ordering as a prior
+RRF_K = 60
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN_RE.findall(text.casefold()) if t not in STOPWORDS and len(t) > 1]
+
+
+def _searchable_text(doc) -> str:
+    # Header metadata from the markdown splitter often names the place when the chunk body doesn't
+    headers = " ".join(str(v) for k, v in (doc.metadata or {}).items() if k.startswith("Header"))
+    return f"{headers} {doc.page_content}"
+
+
+class LexicalReranker:
+    name = "lexical"
+
+    def scores(self, query: str, docs: list, destination: str = "") -> list[float]:
+        query_terms = set(tokenize(query))
+        destination_terms = set(tokenize(destination)) - query_terms
+        doc_terms = [Counter(tokenize(_searchable_text(doc))) for doc in docs]
+        if not doc_terms:
+            return []
+
+        avg_len = sum(sum(c.values()) for c in doc_terms) / len(doc_terms) or 1
+        df = Counter(term for terms in doc_terms for term in set(terms))
+        n = len(doc_terms)
+
+        scores = []
+        for terms in doc_terms:
+            length = sum(terms.values())
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term, 0)
+                if tf:
+                    idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                    score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len))
+            if destination_terms and destination_terms <= terms.keys():
+                score += DESTINATION_BONUS
+            scores.append(score)
+        return scores
+
+    def rerank(self, query: str, docs: list, top_k: int, destination: str = "") -> list:
+        lexical = self.scores(query, docs, destination)
+        lexical_rank = {i: r for r, i in enumerate(sorted(range(len(docs)), key=lambda i: -lexical[i]))}
+        # Chunks with no lexical overlap at all only keep their vector-rank share
+        fused = [1 / (RRF_K + i) + (1 / (RRF_K + lexical_rank[i]) if lexical[i] > 0 else 0) for i in range(len(docs))]
+        order = sorted(range(len(docs)), key=lambda i: -fused[i])
+        return [docs[i] for i in order[:top_k]]
+
+
+class CrossEncoderReranker:
+    name = "cross-encoder"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def rerank(self, query: str, docs: list, top_k: int, destination: str = "") -> list:
+        if destination and destination.casefold() not in query.casefold():
+            query = f"{query} ({destination})"
+        scores = self.model.predict([(query, doc.page_content) for doc in docs])
+        order = sorted(range(len(docs)), key=lambda i: -float(scores[i]))
+        return [docs[i] for i in order[:top_k]]
+
+
+def load_reranker(mode: str, model_name: str) -> Optional[object]:
+    """Reranker for RERANK_MODE, or None when reranking is off."""
+    if mode in ("", "off", "none"):
+        return None
+    if mode == "cross-encoder":
+        try:
+            reranker = CrossEncoderReranker(model_name)
+            logging.info(f"[Rerank] Loaded cross-encoder {model_name}")
+            return reranker
+        except Exception as e:
+            logging.warning(f"[Rerank] Cross-encoder unavailable ({e}), using lexical reranker")
+    elif mode != "lexical":
+        logging.warning(f"[Rerank] Unknown RERANK_MODE '{mode}', using lexical reranker")
+    return LexicalReranker()
@@ -0,0 +1,91 @@
+"""Response cache shared by all API worker processes on a host.
+
+Backed by one SQLite file in WAL mode: readers never block each other or the
+writer, so every uvicorn/gunicorn worker can read and write the same cache
+concurrently. Values are JSON with a per-entry expiry. Connections are opened
+lazily per process and per thread, so forking workers after import is safe.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+BUSY_TIMEOUT_MS = 2000
+# Fraction of writes that also sweep expired rows, so the file doesn't grow unbounded
+PRUNE_PROBABILITY = 0.01
+
+
+class SQLiteCache:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # A connection inherited across fork() must not be reused; reopen per process
+        if self._pid != os.getpid():
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # durable enough for a cache, much faster commits
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            conn.execute(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, default=str), time.time() + ttl),
+        )
+        if random.random() < PRUNE_PROBABILITY:
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get() that never fails the request: cache errors are logged and treated as a miss."""
+        try:
+            return await asyncio.to_thread(self.get, key)
+        except Exception as e:
+            logging.warning(f"[Cache] Read failed for {key.split(':')[0]}: {e}")
+            return None
+
+    async def aset(self, key: str, value: Any, ttl: float):
+        try:
+            await asyncio.to_thread(self.set, key, value, ttl)
+        except Exception as e:
+            logging.warning(f"[Cache] Write failed for {key.split(':')[0]}: {e}")
+
+
+def load_cache(backend: str, path: str) -> Optional[SQLiteCache]:
+    """Shared cache for CACHE_BACKEND, or None when caching is disabled."""
+    if backend in ("", "none", "off"):
+        logging.info("[Cache] Disabled")
+        return None
+    if backend != "sqlite":
+        logging.warning(f"[Cache] Unknown CACHE_BACKEND '{backend}', caching disabled")
+        return None
+    logging.info(f"[Cache] SQLite (WAL) cache at {path}")
+    return SQLiteCache(path)
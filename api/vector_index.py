@@ -0,0 +1,160 @@
+"""Local brute-force vector index with optional float16/int8 quantization.
+
+Written by `ingest.py --target local`, read by the API when VECTOR_BACKEND=local.
+
+Directory layout:
+
+    meta.json      {"dtype", "dimensions", "count", "model"}
+    vectors.npy    (count, dimensions) array in float32, float16 or int8
+    scales.npy     (count,) float32 per-row dequantization scales (int8 only)
+    records.jsonl  one {"id", "text", "metadata"} object per row, same order
+
+Vectors are L2-normalized before quantization, so a dot product is cosine
+similarity. int8 uses symmetric per-vector scaling (row max -> 127).
+"""
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+# Rows upcast to float32 at a time when scoring quantized vectors (numpy has no
+# fast float16/int8 matmul), so search memory stays bounded
+SEARCH_BLOCK_ROWS = 8192
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def truncate_dimensions(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    """Shorten text-embedding-3 vectors the way the API's `dimensions` parameter does."""
+    return normalize(np.asarray(vectors, dtype=np.float32)[..., :dimensions])
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """Returns (stored vectors, per-row scales or None) for normalized float32 input."""
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales
+    return vectors.astype(DTYPES[dtype]), None
+
+
+class LocalVectorIndex:
+    """In-memory index of (id, vector, text, metadata) rows with exact top-k search."""
+
+    def __init__(self, dtype: str = "float32", model: str = ""):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}, expected one of {list(DTYPES)}")
+        self.dtype = dtype
+        self.model = model
+        self.ids: list[str] = []
+        self.texts: list[str] = []
+        self.metadatas: list[dict] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dimensions(self) -> int:
+        return 0 if self.vectors is None else self.vectors.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by stored vectors (and scales) - the part quantization shrinks."""
+        size = 0 if self.vectors is None else self.vectors.nbytes
+        return size + (0 if self.scales is None else self.scales.nbytes)
+
+    # ---- building ----
+
+    def _dequantized(self) -> np.ndarray:
+        if self.vectors is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = self.vectors.astype(np.float32)
+        return vectors * self.scales[:, None] if self.scales is not None else vectors
+
+    def upsert(self, ids, vectors, texts, metadatas):
+        """Insert or replace rows. Rewrites the arrays, so call with large batches."""
+        new = normalize(vectors)
+        replaced = set(ids)
+        keep = [i for i, cid in enumerate(self.ids) if cid not in replaced]
+
+        existing = self._dequantized()[keep] if keep else np.zeros((0, new.shape[1]), dtype=np.float32)
+        self.ids = [self.ids[i] for i in keep] + list(ids)
+        self.texts = [self.texts[i] for i in keep] + list(texts)
+        self.metadatas = [self.metadatas[i] for i in keep] + list(metadatas)
+        self.vectors, self.scales = quantize(np.vstack([existing, new]), self.dtype)
+
+    def delete(self, ids):
+        drop = set(ids)
+        keep = [i for i, cid in enumerate(self.ids) if cid not in drop]
+        if len(keep) == len(self.ids):
+            return
+        self.ids = [self.ids[i] for i in keep]
+        self.texts = [self.texts[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self.vectors = self.vectors[keep] if self.vectors is not None else None
+        self.scales = self.scales[keep] if self.scales is not None else None
+
+    # ---- search ----
+
+    def search(self, query_vector, k: int = 5) -> list[tuple[int, float]]:
+        """Top-k (row, cosine score) pairs for a query embedding."""
+        if not self.ids:
+            return []
+        query = normalize(query_vector)
+        if query.shape[-1] != self.dimensions:
+            query = truncate_dimensions(query, self.dimensions)
+        query = query.astype(np.float32)
+        if self.vectors.dtype == np.float32:
+            scores = self.vectors @ query
+        else:
+            scores = np.concatenate([
+                self.vectors[i:i + SEARCH_BLOCK_ROWS].astype(np.float32) @ query
+                for i in range(0, len(self.vectors), SEARCH_BLOCK_ROWS)
+            ])
+        if self.scales is not None:
+            scores = scores * self.scales
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    # ---- persistence ----
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        vectors = self.vectors if self.vectors is not None else np.zeros((0, 0), dtype=DTYPES[self.dtype])
+        np.save(os.path.join(path, "vectors.npy"), vectors)
+        scales_path = os.path.join(path, "scales.npy")
+        if self.scales is not None:
+            np.save(scales_path, self.scales)
+        elif os.path.exists(scales_path):
+            os.remove(scales_path)
+        with open(os.path.join(path, "records.jsonl"), "w", encoding="utf-8") as f:
+            for cid, text, metadata in zip(self.ids, self.texts, self.metadatas):
+                f.write(json.dumps({"id": cid, "text": text, "metadata": metadata}, ensure_ascii=False) + "\n")
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "dimensions": self.dimensions, "count": len(self), "model": self.model}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "LocalVectorIndex":
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(meta["dtype"], meta.get("model", ""))
+        index.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        scales_path = os.path.join(path, "scales.npy")
+        index.scales = np.load(scales_path) if os.path.exists(scales_path) else None
+        with open(os.path.join(path, "records.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                index.ids.append(record["id"])
+                index.texts.append(record["text"])
+                index.metadatas.append(record["metadata"])
+        return index
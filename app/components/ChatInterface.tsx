@@ -7,7 +7,7 @@ import { motion, AnimatePresence } from 'framer-motion';
 import ReactMarkdown, { Components } from 'react-markdown';
 import remarkGfm from 'remark-gfm';
 import clsx from 'clsx';
-import { useChats, MapPinType, ExtractedLocation, MessageLocations, ExtractedCost, MessageCosts, CostCategory, ExtractedItinerary, MessageItineraries, ItineraryStop, PlaceDetails } from '../context/ChatsContext';
+import { useChats, MapPinType, ExtractedLocation, MessageLocations, ExtractedCost, MessageCosts, CostCategory, ExtractedItinerary, MessageItineraries, ItineraryStop, PlaceDetails, ConversationVariables } from '../context/ChatsContext';
 import { useProfile } from '../context/ProfileContext';
 import { useTranslations } from '../context/LocaleContext';
 import ChatSidebar from './ChatSidebar';
@@ -88,7 +88,7 @@ function ThinkingAnimation() {
 export default function ChatInterface() {
     const searchParams = useSearchParams();
     const router = useRouter();
-    const { activeChat, updateChat, addMessage, addMapPin, removeMapPin, addTouristTrap, updateMapView, mergeConversationVariables, setExtractedLocations, setExtractedCosts, setExtractedItinerary, addCostItem, updateCostItem, updateTripContext, updateMapPin } = useChats();
+    const { activeChat, updateChat, addMessage, addMapPin, removeMapPin, addTouristTrap, updateMapView, mergeConversationVariables, updateConversationVariables, setExtractedLocations, setExtractedCosts, setExtractedItinerary, addCostItem, updateCostItem, updateTripContext, updateMapPin } = useChats();
     const { profile, isProfileSet } = useProfile();
     const t = useTranslations('chat');
     const tProfile = useTranslations('profile');
@@ -276,7 +276,9 @@ export default function ChatInterface() {
     }, [setExtractedCosts]);
 
     // Extract conversation variables from a message exchange
-    const extractConversationVariables = useCallback(async (userMessage: string, aiResponse: string, chatId: string, destination: string) => {
+    // `variablesVersion` is the lastUpdated of `currentVariables`, so a state built from an
+    // outdated snapshot is merged rather than overwriting what a later extraction learned
+    const extractConversationVariables = useCallback(async (userMessage: string, aiResponse: string, chatId: string, destination: string, currentVariables: Record<string, unknown> | null, variablesVersion?: number) => {
         console.log('[ConvVars Extraction] Starting extraction');
 
         try {
@@ -287,6 +289,7 @@ export default function ChatInterface() {
                     user_message: userMessage,
                     ai_response: aiResponse,
                     destination: destination,
+                    current_variables: currentVariables,
                 }),
             });
 
@@ -294,10 +297,15 @@ export default function ChatInterface() {
                 const data = await response.json();
                 console.log('[ConvVars Extraction] API Response:', data);
 
-                if (data.has_new_info && data.variables) {
+                if (data.has_new_info && (data.state || data.variables)) {
+                    // The API returns the merged, deduped state; fall back to merging the
+                    // exchange's variables locally for older API versions
+                    const vars = data.state || data.variables;
+                    const applyVariables = data.state
+                        ? (id: string, v: Partial<ConversationVariables>) => updateConversationVariables(id, v, variablesVersion)
+                        : mergeConversationVariables;
                     // Convert snake_case to camelCase for frontend
-                    const vars = data.variables;
-                    mergeConversationVariables(chatId, {
+                    applyVariables(chatId, {
                         placesDiscussed: vars.places_discussed || [],
                         placesToAvoid: vars.places_to_avoid || [],
                         activityPreferences: vars.activity_preferences || [],
@@ -318,7 +326,7 @@ export default function ChatInterface() {
         } catch (e) {
             console.error('[ConvVars Extraction] Failed:', e);
         }
-    }, [mergeConversationVariables]);
+    }, [mergeConversationVariables, updateConversationVariables]);
 
     // Extract itinerary from a message using AI
     const extractItineraryFromMessage = useCallback(async (messageContent: string, messageIndex: number, chatId: string, destination: string, expectedDays: number = 0) => {
@@ -1098,6 +1106,22 @@ export default function ChatInterface() {
             updateChat(chatId, { title: newTitle });
         }
 
+        // Conversation variables for personalization (also sent with extraction, which merges into them)
+        const conversationVariables = activeChat.conversationVariables ? {
+            places_discussed: activeChat.conversationVariables.placesDiscussed,
+            places_to_avoid: activeChat.conversationVariables.placesToAvoid,
+            activity_preferences: activeChat.conversationVariables.activityPreferences,
+            food_preferences: activeChat.conversationVariables.foodPreferences,
+            accommodation_notes: activeChat.conversationVariables.accommodationNotes,
+            travel_companions: activeChat.conversationVariables.travelCompanions,
+            pace_preference: activeChat.conversationVariables.pacePreference,
+            must_do_activities: activeChat.conversationVariables.mustDoActivities,
+            concerns: activeChat.conversationVariables.concerns,
+            budget_notes: activeChat.conversationVariables.budgetNotes,
+            custom_notes: activeChat.conversationVariables.customNotes,
+        } : null;
+        const conversationVariablesVersion = activeChat.conversationVariables?.lastUpdated;
+
         // Build the request body
         const requestBody = {
             message: userMsg.content,
@@ -1151,19 +1175,7 @@ export default function ChatInterface() {
                 visa_notes: activeChat.tripContext.visaNotes,
             } : null,
             // Conversation variables for personalization
-            conversation_variables: activeChat.conversationVariables ? {
-                places_discussed: activeChat.conversationVariables.placesDiscussed,
-                places_to_avoid: activeChat.conversationVariables.placesToAvoid,
-                activity_preferences: activeChat.conversationVariables.activityPreferences,
-                food_preferences: activeChat.conversationVariables.foodPreferences,
-                accommodation_notes: activeChat.conversationVariables.accommodationNotes,
-                travel_companions: activeChat.conversationVariables.travelCompanions,
-                pace_preference: activeChat.conversationVariables.pacePreference,
-                must_do_activities: activeChat.conversationVariables.mustDoActivities,
-                concerns: activeChat.conversationVariables.concerns,
-                budget_notes: activeChat.conversationVariables.budgetNotes,
-                custom_notes: activeChat.conversationVariables.customNotes,
-            } : null,
+            conversation_variables: conversationVariables,
         };
 
         // Log the full request body for debugging (visible in browser console)
@@ -1234,7 +1246,7 @@ export default function ChatInterface() {
                     extractItineraryFromMessage(fullResponse, assistantMsgIdx, chatId, destination, tripDays);
                 }
                 // Extract conversation variables from the exchange
-                extractConversationVariables(userMsgContent, fullResponse, chatId, destination);
+                extractConversationVariables(userMsgContent, fullResponse, chatId, destination, conversationVariables, conversationVariablesVersion);
             }
         } catch (error) {
             console.error(error);
@@ -282,6 +282,30 @@ export const defaultConversationVariables: ConversationVariables = {
   lastUpdated: Date.now(),
 };
 
+// Merge new variables into existing ones (deduplicate arrays, merge customNotes)
+function mergedConversationVariables(existing: ConversationVariables, newVars: Partial<ConversationVariables>): ConversationVariables {
+  return {
+    // Merge arrays with deduplication
+    placesDiscussed: [...new Set([...existing.placesDiscussed, ...(newVars.placesDiscussed || [])])],
+    placesToAvoid: [...new Set([...existing.placesToAvoid, ...(newVars.placesToAvoid || [])])],
+    activityPreferences: [...new Set([...existing.activityPreferences, ...(newVars.activityPreferences || [])])],
+    foodPreferences: [...new Set([...existing.foodPreferences, ...(newVars.foodPreferences || [])])],
+    accommodationNotes: [...new Set([...existing.accommodationNotes, ...(newVars.accommodationNotes || [])])],
+    mustDoActivities: [...new Set([...existing.mustDoActivities, ...(newVars.mustDoActivities || [])])],
+    concerns: [...new Set([...existing.concerns, ...(newVars.concerns || [])])],
+    budgetNotes: [...new Set([...existing.budgetNotes, ...(newVars.budgetNotes || [])])],
+
+    // Override strings if new value is non-empty
+    travelCompanions: newVars.travelCompanions || existing.travelCompanions,
+    pacePreference: newVars.pacePreference || existing.pacePreference,
+
+    // Merge custom notes
+    customNotes: { ...existing.customNotes, ...(newVars.customNotes || {}) },
+
+    lastUpdated: Date.now(),
+  };
+}
+
 export interface TripContext {
   // Trip Logistics
   itineraryBreakdown: ItineraryStop[];
@@ -438,7 +462,7 @@ interface ChatsContextType {
   toggleEventInterest: (chatId: string, eventId: string) => void;
   clearEvents: (chatId: string) => void;
   // Conversation variables functions
-  updateConversationVariables: (chatId: string, variables: Partial<ConversationVariables>) => void;
+  updateConversationVariables: (chatId: string, variables: Partial<ConversationVariables>, basedOn?: number) => void;
   mergeConversationVariables: (chatId: string, newVars: Partial<ConversationVariables>) => void;
   clearConversationVariables: (chatId: string) => void;
   // Route segments for itinerary
@@ -1431,60 +1455,46 @@ export function ChatsProvider({ children }: { children: ReactNode }) {
   };
 
   // Conversation variables management functions
-  const updateConversationVariables = (chatId: string, variables: Partial<ConversationVariables>) => {
-    setChats(prev => prev.map(chat =>
-      chat.id === chatId
-        ? {
-            ...chat,
-            conversationVariables: {
-              ...chat.conversationVariables,
-              ...variables,
-              lastUpdated: Date.now(),
-            },
-            updatedAt: Date.now(),
-          }
-        : chat
-    ));
-  };
-
-  // Merge new variables with existing (deduplicate arrays, merge customNotes)
-  const mergeConversationVariables = (chatId: string, newVars: Partial<ConversationVariables>) => {
+  // `basedOn` is the lastUpdated of the variables `variables` were computed from (e.g. the server's
+  // merged state); if they changed since - another extraction landed meanwhile - merge instead of
+  // replacing, so that update isn't lost
+  const updateConversationVariables = (chatId: string, variables: Partial<ConversationVariables>, basedOn?: number) => {
     // Resolve chatId - it might be a stale local ID if the chat was synced to DB during extraction
     const resolvedId = idMappingRef.current.get(chatId) || chatId;
 
     setChats(prev => prev.map(chat => {
       if (chat.id !== resolvedId) return chat;
-
-      const existing = chat.conversationVariables;
-      const merged: ConversationVariables = {
-        // Merge arrays with deduplication
-        placesDiscussed: [...new Set([...existing.placesDiscussed, ...(newVars.placesDiscussed || [])])],
-        placesToAvoid: [...new Set([...existing.placesToAvoid, ...(newVars.placesToAvoid || [])])],
-        activityPreferences: [...new Set([...existing.activityPreferences, ...(newVars.activityPreferences || [])])],
-        foodPreferences: [...new Set([...existing.foodPreferences, ...(newVars.foodPreferences || [])])],
-        accommodationNotes: [...new Set([...existing.accommodationNotes, ...(newVars.accommodationNotes || [])])],
-        mustDoActivities: [...new Set([...existing.mustDoActivities, ...(newVars.mustDoActivities || [])])],
-        concerns: [...new Set([...existing.concerns, ...(newVars.concerns || [])])],
-        budgetNotes: [...new Set([...existing.budgetNotes, ...(newVars.budgetNotes || [])])],
-
-        // Override strings if new value is non-empty
-        travelCompanions: newVars.travelCompanions || existing.travelCompanions,
-        pacePreference: newVars.pacePreference || existing.pacePreference,
-
-        // Merge custom notes
-        customNotes: { ...existing.customNotes, ...(newVars.customNotes || {}) },
-
-        lastUpdated: Date.now(),
-      };
-
+      const stale = basedOn !== undefined && chat.conversationVariables.lastUpdated !== basedOn;
       return {
         ...chat,
-        conversationVariables: merged,
+        conversationVariables: stale
+          ? mergedConversationVariables(chat.conversationVariables, variables)
+          : {
+              ...chat.conversationVariables,
+              ...variables,
+              lastUpdated: Date.now(),
+            },
         updatedAt: Date.now(),
       };
     }));
   };
 
+  // Merge new variables with existing
+  const mergeConversationVariables = (chatId: string, newVars: Partial<ConversationVariables>) => {
+    // Resolve chatId - it might be a stale local ID if the chat was synced to DB during extraction
+    const resolvedId = idMappingRef.current.get(chatId) || chatId;
+
+    setChats(prev => prev.map(chat =>
+      chat.id === resolvedId
+        ? {
+            ...chat,
+            conversationVariables: mergedConversationVariables(chat.conversationVariables, newVars),
+            updatedAt: Date.now(),
+          }
+        : chat
+    ));
+  };
+
   const clearConversationVariables = (chatId: string) => {
     setChats(prev => prev.map(chat =>
       chat.id === chatId
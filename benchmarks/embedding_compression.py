@@ -0,0 +1,122 @@
+"""Recall vs. size for shortened and quantized embeddings.
+
+Embeds a sample of corpus chunks and a set of queries once with
+text-embedding-3-large at full size (3072 dims, float32 - the current Pinecone
+setup), then derives each shortened variant by truncating and re-normalizing,
+which is what the API's `dimensions` parameter does for text-embedding-3
+models. Every (dimensions, dtype) variant is loaded into a LocalVectorIndex
+and scored on recall@k against the full-size top-k.
+
+    python benchmarks/embedding_compression.py --chunks 5000 --queries queries.txt
+
+Embeddings are cached in --cache, so reruns don't hit the API.
+"""
+import argparse
+import itertools
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+from vector_index import LocalVectorIndex, truncate_dimensions  # noqa: E402
+
+FULL_DIMENSIONS = 3072
+DIMENSIONS = [3072, 1536, 1024, 512, 256]
+DTYPES = ["float32", "float16", "int8"]
+
+DEFAULT_QUERIES = [
+    "cheap hostels in Bangkok",
+    "how to get from Lima to Cusco on a budget",
+    "is Colombia safe for solo travelers",
+    "best street food in Mexico City",
+    "overland border crossing from Vietnam to Laos",
+    "daily budget for backpacking Europe",
+    "hiking the W trek in Patagonia without a guide",
+    "visa on arrival in Indonesia",
+    "night buses in India",
+    "volunteering for free accommodation",
+    "travel insurance for long trips",
+    "couchsurfing tips",
+    "best time to visit Nepal for trekking",
+    "how to avoid tourist traps in Marrakech",
+    "budget island hopping in the Philippines",
+    "hitchhiking in Eastern Europe",
+]
+
+
+def embed_corpus(chunk_limit, queries, cache_path, batch_size=100):
+    if os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        if len(cached["docs"]) >= chunk_limit and len(cached["queries"]) == len(queries):
+            return cached["docs"][:chunk_limit], cached["queries"]
+
+    from langchain_openai import OpenAIEmbeddings
+    from ingest import DATA_DIR, iter_documents, iter_splits, with_retry
+
+    texts = [s.page_content for s in itertools.islice(iter_splits(iter_documents(DATA_DIR)), chunk_limit)]
+    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+    docs = []
+    for i in range(0, len(texts), batch_size):
+        docs.extend(with_retry(embeddings.embed_documents, texts[i:i + batch_size]))
+        logging.info(f"Embedded {min(i + batch_size, len(texts))}/{len(texts)} chunks")
+    docs = np.asarray(docs, dtype=np.float32)
+    query_vectors = np.asarray(with_retry(embeddings.embed_documents, queries), dtype=np.float32)
+
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    np.savez(cache_path, docs=docs, queries=query_vectors)
+    return docs, query_vectors
+
+
+def build_index(docs, dimensions, dtype):
+    index = LocalVectorIndex(dtype)
+    ids = [str(i) for i in range(len(docs))]
+    index.upsert(ids, truncate_dimensions(docs, dimensions), [""] * len(docs), [{}] * len(docs))
+    return index
+
+
+def run(docs, queries, k):
+    baseline = build_index(docs, FULL_DIMENSIONS, "float32")
+    truth = [{row for row, _ in baseline.search(q, k)} for q in queries]
+    baseline_bytes = baseline.nbytes
+
+    print(f"{len(docs)} chunks, {len(queries)} queries, recall@{k} vs. {FULL_DIMENSIONS}-dim float32\n")
+    print(f"{'dims':>5} {'dtype':>8} {'recall':>7} {'bytes/vec':>10} {'index MB':>9} {'size':>6} {'ms/query':>9}")
+    for dimensions, dtype in itertools.product(DIMENSIONS, DTYPES):
+        index = build_index(docs, dimensions, dtype)
+        query_vectors = truncate_dimensions(queries, dimensions)
+
+        start = time.perf_counter()
+        results = [{row for row, _ in index.search(q, k)} for q in query_vectors]
+        elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        recall = np.mean([len(got & want) / len(want) for got, want in zip(results, truth)])
+        print(f"{dimensions:>5} {dtype:>8} {recall:>7.3f} {index.nbytes / len(docs):>10.0f} "
+              f"{index.nbytes / 1e6:>9.2f} {index.nbytes / baseline_bytes:>6.1%} {elapsed_ms:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall vs. size of shortened/quantized embeddings")
+    parser.add_argument("--chunks", type=int, default=5000, help="Corpus chunks to embed")
+    parser.add_argument("--queries", help="File with one query per line (default: built-in travel queries)")
+    parser.add_argument("--k", type=int, default=5, help="Top-k to compare (the API retrieves 5)")
+    parser.add_argument("--cache", default=os.path.join(ROOT, "vector_store", "embedding_benchmark.npz"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    docs, query_vectors = embed_corpus(args.chunks, queries, args.cache)
+    run(docs, query_vectors, args.k)
+
+
+if __name__ == "__main__":
+    main()
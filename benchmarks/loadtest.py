@@ -0,0 +1,269 @@
+"""End-to-end load test of the API against local provider stubs.
+
+Starts stub_providers.py and the API (uvicorn, pointed at the stubs through
+the provider URL env vars), then drives a weighted mix of chat streams,
+geocodes and extraction calls from --concurrency virtual users for
+--duration seconds. Reports per-endpoint throughput, errors, latency
+percentiles and, for /api/chat/stream, time to first token.
+
+    python benchmarks/loadtest.py --concurrency 50 --duration 60
+    python benchmarks/loadtest.py --latency openai=1.2 --error-rate nominatim=0.1 --workers 4
+    python benchmarks/loadtest.py --api-url http://127.0.0.1:8000   # already-running API (must use the stubs)
+
+Provider rate limits and concurrency caps stay at their production defaults
+so the numbers include admission-control queueing; pass --unthrottled to lift
+them and measure the API alone.
+
+The API's embeddings client needs tiktoken's encoding file, which tiktoken
+downloads once and caches (TIKTOKEN_CACHE_DIR); without it, retrieval fails
+and chat streams run without RAG context.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+from stub_providers import PROVIDERS, add_stub_arguments
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), "api")
+
+DEFAULT_MIX = "chat_stream=2,geocode=6,extract_locations=1,extract_costs=1,extract_itinerary=1,extract_conversation_vars=1"
+
+PLACES = [
+    ("Wat Pho", "Bangkok, Thailand", "Bangkok"), ("Yaowarat Night Market", "Bangkok, Thailand", "Bangkok"),
+    ("Khao San Road", "Bangkok, Thailand", "Bangkok"), ("Chatuchak Weekend Market", "Bangkok, Thailand", "Bangkok"),
+    ("Lumphini Park", "Bangkok, Thailand", "Bangkok"), ("Jim Thompson House", "Bangkok, Thailand", "Bangkok"),
+    ("Talad Rot Fai", "Bangkok, Thailand", "Bangkok"), ("Wat Saket", "Bangkok, Thailand", "Bangkok"),
+]
+QUESTIONS = [
+    "Where should I stay in Bangkok on a tight budget?",
+    "What's the cheapest way to get from Bangkok to Chiang Mai?",
+    "Plan me two weeks in Thailand for under $800",
+    "Which street food should I try in Chinatown?",
+    "Is the Chao Phraya boat worth it?",
+]
+RESPONSE_TEXT = (
+    "Stay near Khao San Road where dorms cost around 250 baht a night. Eat at the Yaowarat night market, "
+    "where pad kra pao is 50 baht, and take the Chao Phraya Express Boat for 16 baht to Wat Pho. "
+    "Spend 4 days in Bangkok, 3 days in Chiang Mai and a week in Bali."
+)
+
+
+def build_request(endpoint, rng):
+    """(path, json body, is_stream) for one request of the given kind."""
+    if endpoint == "chat_stream":
+        history = [] if rng.random() < 0.5 else [
+            {"role": "user", "content": "I'm heading to Thailand next month"},
+            {"role": "assistant", "content": "Great choice! How long will you be there?"},
+        ]
+        return "/api/chat/stream", {"message": rng.choice(QUESTIONS), "history": history, "destination": "Thailand"}, True
+    if endpoint == "geocode":
+        name, context, city = rng.choice(PLACES)
+        return "/api/geocode", {"place_name": name, "context": context, "city": city}, False
+    if endpoint == "extract_locations":
+        return "/api/extract-locations", {"response_text": RESPONSE_TEXT, "destination": "Thailand"}, False
+    if endpoint == "extract_costs":
+        return "/api/extract-costs", {"response_text": RESPONSE_TEXT, "destination": "Thailand", "trip_days": 14}, False
+    if endpoint == "extract_itinerary":
+        return "/api/extract-itinerary", {"response_text": RESPONSE_TEXT, "destination": "Thailand"}, False
+    if endpoint == "extract_conversation_vars":
+        return "/api/extract-conversation-vars", {
+            "user_message": rng.choice(QUESTIONS), "ai_response": RESPONSE_TEXT, "destination": "Thailand",
+        }, False
+    raise ValueError(f"Unknown endpoint '{endpoint}'")
+
+
+async def timed_request(client, endpoint, rng):
+    path, body, stream = build_request(endpoint, rng)
+    start = time.perf_counter()
+    ttft = None
+    if stream:
+        async with client.stream("POST", path, json=body) as response:
+            ok = response.status_code == 200
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                if "error" in event:
+                    ok = False
+                elif ttft is None and event.get("content"):
+                    ttft = time.perf_counter() - start
+    else:
+        response = await client.post(path, json=body)
+        ok = response.status_code == 200
+    return ok, time.perf_counter() - start, ttft
+
+
+async def virtual_user(client, endpoints, weights, deadline, results, seed):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        endpoint = rng.choices(endpoints, weights)[0]
+        try:
+            ok, latency, ttft = await timed_request(client, endpoint, rng)
+        except httpx.HTTPError:
+            ok, latency, ttft = False, None, None
+        results[endpoint].append((ok, latency, ttft))
+
+
+async def run_load(api_url, mix, concurrency, duration, seed):
+    endpoints, weights = zip(*mix.items())
+    results = defaultdict(list)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=api_url, timeout=120.0, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*[
+            virtual_user(client, endpoints, weights, deadline, results, seed + i) for i in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def summarize(results, elapsed):
+    def ms(values, p):
+        return float(np.percentile(values, p)) * 1000 if values else None
+
+    summary = {}
+    for endpoint, samples in sorted(results.items()):
+        latencies = [latency for ok, latency, _ in samples if ok and latency is not None]
+        ttfts = [ttft for ok, _, ttft in samples if ok and ttft is not None]
+        summary[endpoint] = {
+            "requests": len(samples),
+            "errors": sum(1 for ok, _, _ in samples if not ok),
+            "rps": len(samples) / elapsed,
+            "p50_ms": ms(latencies, 50), "p95_ms": ms(latencies, 95), "p99_ms": ms(latencies, 99),
+            "max_ms": max(latencies) * 1000 if latencies else None,
+            "ttft_p50_ms": ms(ttfts, 50), "ttft_p99_ms": ms(ttfts, 99),
+        }
+    return summary
+
+
+def print_summary(summary, elapsed, concurrency):
+    def fmt(value):
+        return f"{value:.0f}" if value is not None else "-"
+
+    total = sum(s["requests"] for s in summary.values())
+    errors = sum(s["errors"] for s in summary.values())
+    print(f"\n{total} requests in {elapsed:.1f}s from {concurrency} users: {total / elapsed:.1f} req/s, {errors} errors\n")
+    print(f"{'endpoint':<26} {'reqs':>6} {'err':>5} {'req/s':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7} "
+          f"{'ttft50':>7} {'ttft99':>7}   (ms)")
+    for endpoint, s in summary.items():
+        print(f"{endpoint:<26} {s['requests']:>6} {s['errors']:>5} {s['rps']:>7.2f} {fmt(s['p50_ms']):>7} "
+              f"{fmt(s['p95_ms']):>7} {fmt(s['p99_ms']):>7} {fmt(s['max_ms']):>7} "
+              f"{fmt(s['ttft_p50_ms']):>7} {fmt(s['ttft_p99_ms']):>7}")
+
+
+def stub_env(stub_url, unthrottled, workers=1, cache_backend="sqlite"):
+    env = {
+        "WEB_CONCURRENCY": str(workers),
+        "CACHE_BACKEND": cache_backend,
+        # Fresh cache per run so one run doesn't warm the next
+        "CACHE_PATH": os.path.join(tempfile.mkdtemp(prefix="loadtest-cache-"), "cache.sqlite3"),
+        "OPENAI_API_KEY": "stub", "OPENAI_BASE_URL": f"{stub_url}/v1", "OPENAI_API_BASE": f"{stub_url}/v1",
+        "PINECONE_API_KEY": "stub", "PINECONE_HOST": stub_url, "VECTOR_BACKEND": "pinecone",
+        "PERPLEXITY_API_KEY": "stub", "PERPLEXITY_API_URL": f"{stub_url}/perplexity/chat/completions",
+        "GOOGLE_MAPS_API_KEY": "stub", "GOOGLE_GEOCODE_URL": f"{stub_url}/google/geocode/json",
+        "NOMINATIM_SEARCH_URL": f"{stub_url}/nominatim/search",
+        "MAPBOX_ACCESS_TOKEN": "stub", "MAPBOX_GEOCODE_URL": f"{stub_url}/mapbox",
+        "LOG_LEVEL": "WARNING",
+    }
+    if unthrottled:
+        for provider in PROVIDERS:
+            env[f"{provider.upper()}_RATE_LIMIT"] = "100000"
+            env[f"{provider.upper()}_BURST"] = "100000"
+            env[f"{provider.upper()}_MAX_CONCURRENCY"] = "100000"
+    return env
+
+
+async def wait_until_up(url, timeout=60.0):
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def stub_argv(args):
+    argv = [sys.executable, os.path.join(BENCHMARKS_DIR, "stub_providers.py"), "--port", str(args.stub_port),
+            "--jitter", str(args.jitter), "--token-delay", str(args.token_delay), "--tokens", str(args.tokens)]
+    for flag, values in (("--latency", args.latency), ("--error-rate", args.error_rate)):
+        for value in values or []:
+            argv += [flag, value]
+    if args.ttft is not None:
+        argv += ["--ttft", str(args.ttft)]
+    if args.seed is not None:
+        argv += ["--seed", str(args.seed)]
+    return argv
+
+
+def parse_mix(mix):
+    return {name: float(weight) for name, _, weight in (item.partition("=") for item in mix.split(","))}
+
+
+async def main_async(args):
+    processes = []
+    try:
+        api_url = args.api_url
+        if not api_url:
+            stub_url = f"http://127.0.0.1:{args.stub_port}"
+            processes.append(subprocess.Popen(stub_argv(args)))
+            await wait_until_up(f"{stub_url}/stats")
+
+            api_url = f"http://127.0.0.1:{args.api_port}"
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.api_port),
+                 "--workers", str(args.workers), "--log-level", "warning"],
+                cwd=API_DIR, env={**os.environ, **stub_env(stub_url, args.unthrottled, args.workers, args.cache_backend)},
+            ))
+            await wait_until_up(f"{api_url}/health")
+
+        results, elapsed = await run_load(api_url, parse_mix(args.mix), args.concurrency, args.duration, args.seed or 0)
+        summary = summarize(results, elapsed)
+        print_summary(summary, elapsed, args.concurrency)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"elapsed": elapsed, "concurrency": args.concurrency, "endpoints": summary}, f, indent=2)
+        return summary
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Load test the API against local provider stubs")
+    parser.add_argument("--api-url", help="Use an already-running API instead of starting one")
+    parser.add_argument("--api-port", type=int, default=8901)
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for the API")
+    parser.add_argument("--concurrency", type=int, default=20, help="Virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated endpoint=weight")
+    parser.add_argument("--unthrottled", action="store_true", help="Lift provider rate limits/concurrency caps")
+    parser.add_argument("--cache-backend", default="sqlite", help="API CACHE_BACKEND (sqlite or none)")
+    parser.add_argument("--json", help="Also write the summary to this file")
+    add_stub_arguments(parser)
+    return parser
+
+
+def main():
+    asyncio.run(main_async(build_parser().parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Retrieval quality and latency benchmark over a labeled fixture corpus.
+
+Chunks the fixture articles with ingest.py's splitter for each chunking
+configuration, indexes them in each retriever backend, and runs the labeled
+queries (query -> source article) through them. Reports recall@k, MRR@k,
+index build time, memory, and p50/p99 query latency.
+
+Runs fully offline: vectors come from a deterministic hashing embedder, so
+scores are comparable between runs and across code changes, not with real
+embeddings. Use embedding_compression.py for real-embedding recall.
+
+    python benchmarks/retrieval_eval.py
+    python benchmarks/retrieval_eval.py --chunk-sizes 200,500,1000 --backends local-float32,local-int8 --rerank
+
+Point --corpus/--queries at other data to evaluate it the same way; corpus
+files must follow the data/<Continent>/<Country>/<City>/<Title>.md layout and
+each query names its article by title.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+from ingest import CHUNK_OVERLAP, CHUNK_SIZE, iter_documents, split_documents  # noqa: E402
+from rerank import LexicalReranker, tokenize  # noqa: E402
+from vector_index import LocalVectorIndex  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FAKE_EMBEDDING_DIMENSIONS = 384
+RERANK_CANDIDATES = 20
+
+
+class HashingEmbeddings:
+    """Deterministic stand-in for OpenAIEmbeddings: signed feature hashing of
+    word unigrams and bigrams. Same text, same vector, on every machine."""
+
+    def __init__(self, dimensions=FAKE_EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        tokens = tokenize(text)
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[h % self.dimensions] += 1.0 if (h >> 63) else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class Chunk:
+    """Search result in the shape the reranker expects (page_content + metadata)."""
+
+    def __init__(self, metadata, page_content):
+        self.metadata = metadata
+        self.page_content = page_content
+
+
+class LocalBackend:
+    def __init__(self, dtype):
+        self.name = f"local-{dtype}"
+        self.index = LocalVectorIndex(dtype)
+
+    def build(self, splits, vectors):
+        ids = [str(i) for i in range(len(splits))]
+        self.index.upsert(ids, np.asarray(vectors), [s.page_content for s in splits], [s.metadata for s in splits])
+
+    def search(self, query_vector, k):
+        return [Chunk(self.index.metadatas[row], self.index.texts[row]) for row, _ in self.index.search(query_vector, k)]
+
+    @property
+    def nbytes(self):
+        return self.index.nbytes
+
+
+class ChromaBackend:
+    name = "chroma"
+    nbytes = None  # lives in Chroma's native store, not measurable from here
+
+    def __init__(self):
+        import chromadb
+        client = chromadb.EphemeralClient()
+        collection_name = f"eval-{time.perf_counter_ns()}"
+        self.collection = client.create_collection(collection_name, metadata={"hnsw:space": "cosine"})
+
+    def build(self, splits, vectors):
+        self.collection.add(
+            ids=[str(i) for i in range(len(splits))],
+            embeddings=[list(map(float, v)) for v in vectors],
+            documents=[s.page_content for s in splits],
+            metadatas=[s.metadata for s in splits],
+        )
+
+    def search(self, query_vector, k):
+        result = self.collection.query(query_embeddings=[list(map(float, query_vector))], n_results=k)
+        return [Chunk(m, d) for m, d in zip(result["metadatas"][0], result["documents"][0])]
+
+
+BACKENDS = {
+    "local-float32": lambda: LocalBackend("float32"),
+    "local-float16": lambda: LocalBackend("float16"),
+    "local-int8": lambda: LocalBackend("int8"),
+    "chroma": ChromaBackend,
+}
+
+
+def load_queries(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) if values else 0.0
+
+
+def evaluate(backend, splits, queries, embedder, k, rerank=False, repeat=1):
+    vectors = embedder.embed_documents([s.page_content for s in splits])
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    backend.build(splits, vectors)
+    build_seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    reranker = LexicalReranker() if rerank else None
+    hits, reciprocal_ranks, latencies = 0, [], []
+    for q in queries:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query_vector = embedder.embed_query(q["query"])
+            if reranker:
+                candidates = backend.search(query_vector, RERANK_CANDIDATES)
+                results = reranker.rerank(q["query"], candidates, k, q.get("destination", ""))
+            else:
+                results = backend.search(query_vector, k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        titles = [chunk.metadata.get("title") for chunk in results]
+        if q["article"] in titles:
+            hits += 1
+            reciprocal_ranks.append(1 / (titles.index(q["article"]) + 1))
+        else:
+            reciprocal_ranks.append(0.0)
+
+    return {
+        "backend": backend.name + ("+lexical" if rerank else ""),
+        "chunks": len(splits),
+        "recall": hits / len(queries),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "build_ms": build_seconds * 1000,
+        "peak_mb": peak / 1e6,
+        "index_mb": backend.nbytes / 1e6 if backend.nbytes is not None else None,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval quality and latency benchmark")
+    parser.add_argument("--corpus", default=os.path.join(FIXTURES_DIR, "data"))
+    parser.add_argument("--queries", default=os.path.join(FIXTURES_DIR, "queries.jsonl"))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--chunk-sizes", default=f"200,400,{CHUNK_SIZE}", help="Comma-separated splitter chunk sizes")
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP)
+    parser.add_argument("--backends", default="local-float32,local-float16,local-int8,chroma",
+                        help=f"Comma-separated, from: {', '.join(BACKENDS)}")
+    parser.add_argument("--rerank", action="store_true", help="Also score each backend with the lexical reranker")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query for latency percentiles")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    queries = load_queries(args.queries)
+    documents = list(iter_documents(args.corpus))
+    embedder = HashingEmbeddings()
+
+    results = []
+    print(f"{len(documents)} articles, {len(queries)} labeled queries, k={args.k}\n")
+    print(f"{'chunk':>6} {'backend':<22} {'chunks':>6} {'recall':>7} {'MRR':>6} {'build ms':>9} "
+          f"{'peak MB':>8} {'index MB':>9} {'p50 ms':>7} {'p99 ms':>7}")
+    for chunk_size in [int(c) for c in args.chunk_sizes.split(",")]:
+        splits = split_documents(documents, chunk_size, min(args.chunk_overlap, chunk_size // 2))
+        for name in args.backends.split(","):
+            for rerank in ([False, True] if args.rerank else [False]):
+                try:
+                    backend = BACKENDS[name]()
+                except ImportError as e:
+                    print(f"{chunk_size:>6} {name:<22} skipped ({e})")
+                    break
+                row = {"chunk_size": chunk_size, **evaluate(backend, splits, queries, embedder, args.k, rerank, args.repeat)}
+                results.append(row)
+                index_mb = f"{row['index_mb']:.3f}" if row["index_mb"] is not None else "-"
+                print(f"{chunk_size:>6} {row['backend']:<22} {row['chunks']:>6} {row['recall']:>7.3f} {row['mrr']:>6.3f} "
+                      f"{row['build_ms']:>9.1f} {row['peak_mb']:>8.2f} {index_mb:>9} {row['p50_ms']:>7.3f} {row['p99_ms']:>7.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Throughput scaling across API worker processes.
+
+Runs loadtest.py once per worker count, scaling the number of virtual users
+with the workers so each worker sees the same load, and reports total
+throughput and scaling efficiency relative to a single worker.
+
+    python benchmarks/scaling.py --workers 1,2,4,8 --users-per-worker 40 --duration 30
+
+Provider limits are lifted (--unthrottled) and stub latencies kept low, so the
+API's own CPU is the bottleneck rather than upstream budgets. Pass
+--cache-backend none to measure without the shared cache.
+"""
+import argparse
+import asyncio
+import os
+
+from loadtest import build_parser, main_async
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API throughput vs. worker count")
+    parser.add_argument("--workers", default=f"1,2,{max(2, min(8, os.cpu_count() or 1))}",
+                        help="Comma-separated worker counts")
+    parser.add_argument("--users-per-worker", type=int, default=40)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--cache-backend", default="sqlite")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="Latency of every stubbed provider")
+    args = parser.parse_args()
+
+    rows = []
+    for workers in [int(w) for w in args.workers.split(",")]:
+        loadtest_args = build_parser().parse_args([
+            "--workers", str(workers), "--concurrency", str(workers * args.users_per_worker),
+            "--duration", str(args.duration), "--unthrottled", "--cache-backend", args.cache_backend,
+            "--ttft", str(args.stub_latency), "--token-delay", "0.002", "--seed", "1",
+            *[arg for p in ("openai", "pinecone", "perplexity", "google", "nominatim", "mapbox")
+              for arg in ("--latency", f"{p}={args.stub_latency}")],
+        ])
+        print(f"\n=== {workers} worker(s), {loadtest_args.concurrency} users ===")
+        summary = asyncio.run(main_async(loadtest_args))
+        total = sum(s["requests"] for s in summary.values())
+        rps = sum(s["rps"] for s in summary.values())
+        errors = sum(s["errors"] for s in summary.values())
+        rows.append((workers, rps, errors, total))
+
+    base = rows[0][1] / rows[0][0]
+    print(f"\n{'workers':>7} {'req/s':>8} {'speedup':>8} {'efficiency':>10} {'errors':>7}")
+    for workers, rps, errors, total in rows:
+        print(f"{workers:>7} {rps:>8.1f} {rps / rows[0][1]:>7.2f}x {rps / (base * workers):>10.0%} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""Local stand-ins for every upstream the API calls, for load testing.
+
+One server, one port, with routes shaped like each provider's real API:
+
+    /v1/chat/completions          OpenAI (streaming and non-streaming)
+    /v1/embeddings                OpenAI embeddings
+    /query, /describe_index_stats Pinecone data plane
+    /perplexity/chat/completions  Perplexity
+    /google/geocode/json          Google Geocoding
+    /nominatim/search             Nominatim
+    /mapbox/{query}.json          Mapbox Geocoding
+
+Each provider gets a configurable latency (+ jitter) and error rate; errors
+are 429/503 so the API's retry and circuit-breaker paths get exercised too.
+
+    python benchmarks/stub_providers.py --port 8900 --latency openai=0.8 --error-rate google=0.05
+
+Chat completions return canned JSON matched to the extraction prompts, so the
+extraction endpoints parse real-looking output.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PROVIDERS = ["openai", "pinecone", "perplexity", "google", "nominatim", "mapbox"]
+DEFAULT_LATENCY = {
+    "openai": 0.6, "pinecone": 0.05, "perplexity": 1.5, "google": 0.1, "nominatim": 0.3, "mapbox": 0.1,
+}
+DEFAULT_JITTER = 0.25  # +/- fraction of latency
+EMBEDDING_DIMENSIONS = 3072
+
+CHAT_ANSWER = (
+    "Bangkok is easy on a budget. Stay near Khao San Road where dorms cost around 250 baht a night. "
+    "Eat at the Yaowarat night market, where a plate of pad kra pao is 50 baht. Take the Chao Phraya "
+    "Express Boat for 16 baht to reach Wat Pho and Wat Arun. Then head north to Chiang Mai for 3 days "
+    "of trekking before flying to Bali for a week."
+)
+
+# (prompt marker, canned completion) - first match wins
+CANNED_COMPLETIONS = [
+    ("Extract ALL specific, named locations", {"locations": [
+        {"name": "Wat Pho", "type": "landmark", "description": "Temple of the reclining Buddha", "area": "Bangkok, Thailand"},
+        {"name": "Yaowarat Night Market", "type": "market", "description": "Chinatown street food", "area": "Bangkok, Thailand"},
+        {"name": "Khao San Road", "type": "neighborhood", "description": "Backpacker hub", "area": "Bangkok, Thailand"},
+    ]}),
+    ("expert travel budget analyst", {
+        "costs": [
+            {"category": "accommodation", "name": "Dorm bed", "amount": 250, "currency": "THB", "quantity": 1,
+             "unit": "night", "text_to_match": "250 baht a night"},
+            {"category": "food", "name": "Pad kra pao", "amount": 50, "currency": "THB", "quantity": 1, "unit": "meal",
+             "text_to_match": "50 baht"},
+            {"category": "transport", "name": "Express boat", "amount": 16, "currency": "THB", "quantity": 1,
+             "unit": "trip", "text_to_match": "16 baht"},
+        ],
+        "tourist_traps": [{"name": "20 baht tuk-tuk tour", "description": "Ends at a gem shop", "location": "Bangkok"}],
+    }),
+    ("extract any itinerary", {
+        "itinerary": [
+            {"location": "Bangkok", "days": 4, "order": 0},
+            {"location": "Chiang Mai", "days": 3, "order": 1},
+            {"location": "Bali", "days": 7, "order": 2},
+        ],
+        "total_days": 14,
+        "has_itinerary": True,
+    }),
+    ("extract key variables", {
+        "places_discussed": ["Bangkok", "Chiang Mai"],
+        "activity_preferences": ["street food", "trekking"],
+        "budget_notes": ["Dorms around 250 baht"],
+    }),
+    ("Suggest only the extra items", {"items": [
+        {"name": "White clothes you don't mind ruining", "category": "clothing", "quantity": 1, "notes": "For Holi"},
+        {"name": "Waterproof phone pouch", "category": "electronics", "quantity": 1},
+        {"name": "Passport", "category": "documents", "quantity": 1, "notes": "Check expiry 6+ months"},
+    ]}),
+    ("travel event researcher", {"events": [], "travel_advisory": ""}),
+    ("formulate a standalone question", "What are the best budget tips for Bangkok?"),
+]
+
+
+class StubConfig:
+    def __init__(self, latency=None, error_rate=None, jitter=DEFAULT_JITTER, ttft=None, token_delay=0.02,
+                 tokens=120, seed=None):
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.error_rate = {p: 0.0 for p in PROVIDERS} | (error_rate or {})
+        self.jitter = jitter
+        self.ttft = ttft if ttft is not None else self.latency["openai"]
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.random = random.Random(seed)
+
+    def delay(self, seconds):
+        return max(0.0, seconds * (1 + self.random.uniform(-self.jitter, self.jitter)))
+
+    def should_fail(self, provider):
+        return self.random.random() < self.error_rate[provider]
+
+
+def _prompt_text(body) -> str:
+    return " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+
+
+def canned_completion(prompt: str) -> str:
+    for marker, completion in CANNED_COMPLETIONS:
+        if marker in prompt:
+            return completion if isinstance(completion, str) else json.dumps(completion)
+    return CHAT_ANSWER
+
+
+def fake_embedding(text: str, dimensions: int) -> list[float]:
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    return [rng.uniform(-1, 1) for _ in range(dimensions)]
+
+
+def fake_coordinates(query: str) -> tuple[float, float]:
+    """Stable (lng, lat) near Bangkok, so results pass the API's plausibility checks for the test payloads."""
+    h = int.from_bytes(hashlib.sha256(query.encode("utf-8")).digest()[:4], "little")
+    return 100.5 + (h % 1000) / 10000, 13.7 + (h // 1000 % 1000) / 10000
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI()
+    stats = {p: {"requests": 0, "errors": 0} for p in PROVIDERS}
+
+    async def admit(provider):
+        """Sleep the provider's latency; return an error response if this request should fail."""
+        stats[provider]["requests"] += 1
+        await asyncio.sleep(config.delay(config.latency[provider]))
+        if config.should_fail(provider):
+            stats[provider]["errors"] += 1
+            status = config.random.choice([429, 503])
+            return JSONResponse({"error": {"message": f"stub {provider} error"}}, status_code=status,
+                                headers={"Retry-After": "1"} if status == 429 else None)
+        return None
+
+    def completion_body(content, model, tools=None):
+        message = {"role": "assistant", "content": content}
+        if tools:
+            # Structured-output requests: answer with a call to the (only) offered function
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_stub_{time.time_ns()}", "type": "function",
+                "function": {"name": tools[0]["function"]["name"], "arguments": content},
+            }]}
+        return {
+            "id": f"chatcmpl-stub-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tools else "stop"}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": len(content.split()), "total_tokens": 100 + len(content.split())},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        content = canned_completion(_prompt_text(body))
+
+        if not body.get("stream"):
+            if error := await admit("openai"):
+                return error
+            return completion_body(content, model, body.get("tools"))
+
+        stats["openai"]["requests"] += 1
+        if config.should_fail("openai"):
+            stats["openai"]["errors"] += 1
+            await asyncio.sleep(config.delay(config.ttft))
+            return JSONResponse({"error": {"message": "stub openai error"}}, status_code=503)
+
+        async def events():
+            await asyncio.sleep(config.delay(config.ttft))
+            words = (content.split() * (config.tokens // max(len(content.split()), 1) + 1))[:config.tokens]
+            chunk_id = f"chatcmpl-stub-{time.time_ns()}"
+            for i, word in enumerate(words):
+                delta = {"role": "assistant", "content": word + " "} if i == 0 else {"content": word + " "}
+                chunk = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(config.token_delay)
+            final = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def openai_embeddings(request: Request):
+        body = await request.json()
+        if error := await admit("openai"):
+            return error
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions") or EMBEDDING_DIMENSIONS
+        return {
+            "object": "list",
+            "model": body.get("model", "stub"),
+            "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(str(text), dimensions)}
+                     for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": 10 * len(inputs), "total_tokens": 10 * len(inputs)},
+        }
+
+    @app.post("/describe_index_stats")
+    async def pinecone_stats():
+        return {"namespaces": {"": {"vectorCount": 1000}}, "dimension": EMBEDDING_DIMENSIONS,
+                "indexFullness": 0.0, "totalVectorCount": 1000}
+
+    @app.post("/query")
+    async def pinecone_query(request: Request):
+        body = await request.json()
+        if error := await admit("pinecone"):
+            return error
+        top_k = body.get("topK", 5)
+        return {
+            "namespace": body.get("namespace", ""),
+            "matches": [
+                {"id": f"stub-{i}", "score": 0.9 - i * 0.01,
+                 "metadata": {"text": CHAT_ANSWER, "title": f"Stub article {i}", "location": "Asia > Thailand > Bangkok"}}
+                for i in range(top_k)
+            ],
+        }
+
+    @app.post("/perplexity/chat/completions")
+    async def perplexity_chat(request: Request):
+        body = await request.json()
+        if error := await admit("perplexity"):
+            return error
+        return completion_body(canned_completion(_prompt_text(body)), body.get("model", "sonar"))
+
+    @app.get("/google/geocode/json")
+    async def google_geocode(address: str = ""):
+        if error := await admit("google"):
+            return error
+        lng, lat = fake_coordinates(address)
+        return {"status": "OK", "results": [{
+            "formatted_address": address,
+            "geometry": {"location": {"lat": lat, "lng": lng}, "location_type": "APPROXIMATE"},
+            "types": ["point_of_interest", "establishment"],
+        }]}
+
+    @app.get("/nominatim/search")
+    async def nominatim_search(q: str = ""):
+        if error := await admit("nominatim"):
+            return error
+        lng, lat = fake_coordinates(q)
+        return [{"lat": str(lat), "lon": str(lng), "display_name": q, "type": "attraction", "class": "tourism",
+                 "importance": 0.6}]
+
+    @app.get("/mapbox/{query}.json")
+    async def mapbox_geocode(query: str):
+        if error := await admit("mapbox"):
+            return error
+        lng, lat = fake_coordinates(query)
+        return {"type": "FeatureCollection", "features": [
+            {"place_type": ["poi"], "relevance": 0.95, "place_name": query, "center": [lng, lat]},
+        ]}
+
+    @app.get("/stats")
+    async def stub_stats():
+        return stats
+
+    return app
+
+
+def parse_provider_values(pairs) -> dict:
+    """["openai=0.8", "google=0.1"] -> {"openai": 0.8, "google": 0.1}"""
+    values = {}
+    for pair in pairs or []:
+        provider, _, value = pair.partition("=")
+        if provider not in PROVIDERS:
+            raise argparse.ArgumentTypeError(f"Unknown provider '{provider}', expected one of {PROVIDERS}")
+        values[provider] = float(value)
+    return values
+
+
+def add_stub_arguments(parser):
+    parser.add_argument("--latency", action="append", metavar="PROVIDER=SECONDS",
+                        help=f"Mean response latency per provider (defaults: {DEFAULT_LATENCY})")
+    parser.add_argument("--error-rate", action="append", metavar="PROVIDER=FRACTION",
+                        help="Fraction of requests answered with 429/503")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER, help="Latency jitter as +/- fraction")
+    parser.add_argument("--ttft", type=float, help="OpenAI streaming time to first token (default: openai latency)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between streamed tokens")
+    parser.add_argument("--tokens", type=int, default=120, help="Tokens per streamed answer")
+    parser.add_argument("--seed", type=int, help="Seed for jitter/error sampling")
+
+
+def config_from_args(args) -> StubConfig:
+    return StubConfig(parse_provider_values(args.latency), parse_provider_values(args.error_rate), args.jitter,
+                      args.ttft, args.token_delay, args.tokens, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local stubs for the API's upstream providers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
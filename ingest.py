@@ -1,12 +1,19 @@
 import os
 import glob
-from langchain_community.document_loaders import UnstructuredMarkdownLoader
+import json
+import hashlib
+import itertools
+import random
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
 import argparse
 import logging
+import sys
 from dotenv import load_dotenv
 
 # Load env vars
@@ -17,103 +24,559 @@ logging.basicConfig(level=logging.INFO)
 
 DATA_DIR = "../data"
 DB_DIR = "./vector_store"
+MANIFEST_PATH = os.path.join(DB_DIR, "ingest_manifest.json")
+# Collection name used by langchain's Chroma wrapper, so the store stays readable through it
+COLLECTION_NAME = "langchain"
 
-def load_documents(data_dir):
-    """Loads all markdown files from the data directory."""
-    documents = []
-    files = glob.glob(os.path.join(data_dir, "**/*.md"), recursive=True)
-    logging.info(f"Found {len(files)} markdown files.")
-    
-    for file_path in files:
+# Must match api/main.py: PINECONE_INDEX, text-embedding-3-large, text_key="text"
+PINECONE_INDEX = os.getenv("PINECONE_INDEX", "brokepacker-articles")
+PINECONE_TEXT_KEY = "text"
+EMBEDDING_MODELS = {
+    "chroma": "text-embedding-3-small",
+    "pinecone": "text-embedding-3-large",
+    "local": "text-embedding-3-large",
+}
+# Quantized index the API serves with VECTOR_BACKEND=local (see api/vector_index.py)
+LOCAL_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api", "data", "vector_index")
+PINECONE_UPSERT_BATCH_SIZE = 100  # vectors per upsert request
+PINECONE_UPSERT_CONCURRENCY = 8
+PINECONE_DELETE_BATCH_SIZE = 1000  # Pinecone's max ids per delete
+RETRY_ATTEMPTS = 5
+
+EMBED_BATCH_SIZE = 100
+EMBED_CONCURRENCY = 4
+# Files being loaded/split at once; bounds how far loading can run ahead of embedding
+MAX_INFLIGHT_FILES = 32
+MANIFEST_SAVE_EVERY = 50  # files
+
+# Near-duplicate detection: 64-bit SimHash over word 3-grams. Four 16-bit
+# bands guarantee (pigeonhole) that any pair within 3 differing bits shares a band.
+SIMHASH_SHINGLE_SIZE = 3
+SIMHASH_BANDS = 4
+DEDUP_MAX_DISTANCE = 3
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+HEADERS_TO_SPLIT_ON = [
+    ("#", "Header 1"),
+    ("##", "Header 2"),
+    ("###", "Header 3"),
+]
+
+
+def chunk_id(source, index):
+    """Deterministic chunk ID so re-ingesting a file overwrites its old chunks.
+
+    Derived from the path relative to DATA_DIR so IDs don't depend on where
+    the script is run from.
+    """
+    relative = os.path.relpath(source, DATA_DIR).replace(os.sep, "/")
+    return f"{hashlib.sha1(relative.encode('utf-8')).hexdigest()}-{index}"
+
+
+def iter_files(data_dir):
+    """Lazily yields markdown file paths under the data directory."""
+    return glob.iglob(os.path.join(data_dir, "**/*.md"), recursive=True)
+
+
+def load_document(file_path, content=None):
+    """Loads a single markdown file with location metadata derived from its path."""
+    if content is None:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+    # Extract metadata from path
+    # Path: ../data/Continent/Country/City/Title.md
+    parts = file_path.split(os.sep)
+    # Find index of 'data' to anchor
+    try:
+        data_idx = parts.index("data")
+        location_parts = parts[data_idx+1:-1]
+        location = " > ".join(location_parts)
+    except ValueError:
+        location = "Unknown"
+
+    return Document(
+        page_content=content,
+        metadata={
+            "source": file_path,
+            "location": location,
+            "title": os.path.splitext(os.path.basename(file_path))[0]
+        }
+    )
+
+
+def iter_documents(data_dir):
+    """Yields documents one file at a time."""
+    for file_path in iter_files(data_dir):
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            # Extract metadata from path
-            # Path: ../data/Continent/Country/City/Title.md
-            parts = file_path.split(os.sep)
-            # Find index of 'data' to anchor
-            try:
-                data_idx = parts.index("data")
-                location_parts = parts[data_idx+1:-1]
-                location = " > ".join(location_parts)
-            except ValueError:
-                location = "Unknown"
-
-            doc = Document(
-                page_content=content,
-                metadata={
-                    "source": file_path,
-                    "location": location,
-                    "title": os.path.splitext(os.path.basename(file_path))[0]
-                }
-            )
-            documents.append(doc)
+            yield load_document(file_path)
         except Exception as e:
             logging.error(f"Error loading {file_path}: {e}")
-            
-    return documents
 
-def split_documents(documents):
-    """Splits documents into chunks."""
-    
+
+def iter_splits(documents, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Yields chunks document by document, so only one document's splits are held at a time."""
+
     # 1. Split by Headers first to keep logical sections together
-    headers_to_split_on = [
-        ("#", "Header 1"),
-        ("##", "Header 2"),
-        ("###", "Header 3"),
-    ]
-    markdown_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers_to_split_on)
-    
-    all_splits = []
-    for doc in documents:
-        splits = markdown_splitter.split_text(doc.page_content)
-        for split in splits:
-            # Merge metadata
-            split.metadata.update(doc.metadata)
-            all_splits.append(split)
-            
+    markdown_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=HEADERS_TO_SPLIT_ON)
+
     # 2. Further split large chunks if necessary
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
     )
-    final_splits = text_splitter.split_documents(all_splits)
-    
-    logging.info(f"Split {len(documents)} documents into {len(final_splits)} chunks.")
+
+    for doc in documents:
+        for split in markdown_splitter.split_text(doc.page_content):
+            # Merge metadata
+            split.metadata.update(doc.metadata)
+            yield from text_splitter.split_documents([split])
+
+
+def split_documents(documents, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Splits documents into chunks."""
+    final_splits = list(iter_splits(documents, chunk_size, chunk_overlap))
+    logging.debug(f"Split {len(documents)} documents into {len(final_splits)} chunks.")
     return final_splits
 
-def create_vector_store(splits):
-    """Creates and saves the vector store."""
-    if not splits:
-        logging.warning("No splits to ingest.")
-        return
 
-    # Using OpenAI Embeddings (requires OPENAI_API_KEY env var)
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    
-    vectorstore = Chroma.from_documents(
-        documents=splits,
-        embedding=embeddings,
-        persist_directory=DB_DIR
-    )
-    logging.info(f"Vector store created at {DB_DIR}")
+def simhash(text):
+    """64-bit SimHash of a chunk's word shingles; near-identical text gives nearby hashes."""
+    tokens = re.findall(r"\w+", text.casefold())
+    shingles = {" ".join(tokens[i:i + SIMHASH_SHINGLE_SIZE])
+                for i in range(max(1, len(tokens) - SIMHASH_SHINGLE_SIZE + 1))}
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), "little")
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+class NearDuplicateIndex:
+    """Banded SimHash index: finds a kept chunk within `max_distance` bits of a new one."""
+
+    def __init__(self, max_distance=DEDUP_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.bands = [{} for _ in range(SIMHASH_BANDS)]
+        self.hashes = {}  # chunk_id -> simhash
+
+    @staticmethod
+    def _band_keys(h):
+        width = 64 // SIMHASH_BANDS
+        return [(h >> (width * b)) & ((1 << width) - 1) for b in range(SIMHASH_BANDS)]
+
+    def find(self, h):
+        for band, key in zip(self.bands, self._band_keys(h)):
+            for cid in band.get(key, ()):
+                if bin(h ^ self.hashes[cid]).count("1") <= self.max_distance:
+                    return cid
+        return None
+
+    def add(self, cid, h):
+        self.hashes[cid] = h
+        for band, key in zip(self.bands, self._band_keys(h)):
+            band.setdefault(key, []).append(cid)
+
+    def discard(self, cid):
+        h = self.hashes.pop(cid, None)
+        if h is None:
+            return
+        for band, key in zip(self.bands, self._band_keys(h)):
+            band[key].remove(cid)
+
+
+def process_file(task):
+    """Hash, and if changed load + split, one file. Runs in a worker process.
+
+    Returns (file_path, sha256, splits or None if unchanged, simhashes, error).
+    """
+    file_path, previous_digest, dedup = task
+    try:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest == previous_digest:
+            return file_path, digest, None, None, None
+        doc = load_document(file_path, raw.decode('utf-8'))
+        splits = list(iter_splits([doc]))
+        simhashes = [simhash(split.page_content) for split in splits] if dedup else None
+        return file_path, digest, splits, simhashes, None
+    except Exception as e:
+        return file_path, None, [], None, str(e)
+
+
+def bounded_map(executor, fn, items, window):
+    """Like executor.map, but lazy: at most `window` tasks are in flight and
+    results are yielded in order, so a slow consumer applies backpressure."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def drop_near_duplicates(file_path, file_splits, simhashes, old_ids, deduper):
+    """Filters a file's chunks against everything kept so far.
+
+    Returns (kept (chunk_id, split) pairs, {kept chunk_id: simhash},
+    {dropped chunk index: chunk_id it duplicates}).
+    """
+    # The file's previous version is being replaced - don't match against it
+    for cid in old_ids:
+        deduper.discard(cid)
+
+    kept, kept_hashes, duplicates = [], {}, {}
+    for i, (split, h) in enumerate(zip(file_splits, simhashes)):
+        cid = chunk_id(file_path, i)
+        original = deduper.find(h)
+        if original:
+            duplicates[str(i)] = original
+            continue
+        deduper.add(cid, h)
+        kept.append((cid, split))
+        kept_hashes[cid] = h
+    return kept, kept_hashes, duplicates
+
+
+def iter_batches(file_results, manifest, batch_size, deduper=None):
+    """Groups chunks across files into embedding batches.
+
+    Yields (ids, splits, completed) where `completed` lists the manifest
+    entries of files whose last chunk is in this batch and can be committed
+    once the batch is upserted. With a `deduper`, near-duplicate chunks are
+    dropped and recorded in their file's entry instead of being embedded.
+    """
+    ids, splits, completed = [], [], []
+    for file_path, digest, file_splits, simhashes, error in file_results:
+        if error:
+            logging.error(f"Error loading {file_path}: {error}")
+            continue
+        if file_splits is None:
+            continue  # unchanged
+
+        old_ids = manifest.get(file_path, {}).get("chunk_ids", [])
+        entry = {"path": file_path, "sha256": digest}
+        if deduper is not None and simhashes is not None:
+            kept, entry["simhashes"], entry["duplicates"] = drop_near_duplicates(
+                file_path, file_splits, simhashes, old_ids, deduper)
+        else:
+            kept = [(chunk_id(file_path, i), split) for i, split in enumerate(file_splits)]
+        entry["chunk_ids"] = [cid for cid, _ in kept]
+        # Old chunks beyond the new count (or now dropped as duplicates) aren't overwritten by the upsert
+        entry["stale_ids"] = sorted(set(old_ids) - set(entry["chunk_ids"]))
+
+        if not kept:
+            completed.append(entry)
+        for i, (cid, split) in enumerate(kept):
+            ids.append(cid)
+            splits.append(split)
+            if i == len(kept) - 1:
+                completed.append(entry)
+            if len(ids) >= batch_size:
+                yield ids, splits, completed
+                ids, splits, completed = [], [], []
+    if ids or completed:
+        yield ids, splits, completed
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Reads the manifest of previously ingested files: source -> {sha256, chunk_ids}."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def with_retry(fn, *args, attempts=RETRY_ATTEMPTS, **kwargs):
+    """Calls fn, retrying with jittered exponential backoff on any exception."""
+    for attempt in range(attempts):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = random.uniform(0, min(30, 2 ** attempt))
+            logging.warning(f"{getattr(fn, '__name__', fn)} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+class ChromaSink:
+    """Local Chroma store - the default target and a stand-in for Pinecone."""
+
+    name = "chroma"
+
+    def __init__(self):
+        import chromadb
+        client = chromadb.PersistentClient(path=DB_DIR)
+        self.collection = client.get_or_create_collection(COLLECTION_NAME)
+        self.manifest_path = MANIFEST_PATH
+
+    def upsert(self, ids, vectors, texts, metadatas):
+        self.collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def delete_all(self):
+        self.delete(self.collection.get(include=[])["ids"])
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class PineconeSink:
+    """Writes to the production Pinecone index the API reads from.
+
+    Each embedding batch is split into upsert requests sent in parallel,
+    and every request is retried with backoff.
+    """
+
+    name = "pinecone"
+
+    def __init__(self, index_name=PINECONE_INDEX, namespace="", upsert_concurrency=PINECONE_UPSERT_CONCURRENCY):
+        from pinecone import Pinecone
+        self.index = Pinecone(api_key=os.environ["PINECONE_API_KEY"]).Index(index_name)
+        self.namespace = namespace
+        self.pool = ThreadPoolExecutor(max_workers=upsert_concurrency)
+        self.manifest_path = os.path.join(DB_DIR, f"ingest_manifest.pinecone.{index_name}.{namespace or 'default'}.json")
+
+    def upsert(self, ids, vectors, texts, metadatas):
+        records = [
+            {"id": cid, "values": vector, "metadata": {**metadata, PINECONE_TEXT_KEY: text}}
+            for cid, vector, text, metadata in zip(ids, vectors, texts, metadatas)
+        ]
+        requests = [records[i:i + PINECONE_UPSERT_BATCH_SIZE] for i in range(0, len(records), PINECONE_UPSERT_BATCH_SIZE)]
+        futures = [self.pool.submit(with_retry, self.index.upsert, vectors=r, namespace=self.namespace) for r in requests]
+        for future in futures:
+            future.result()
+
+    def delete(self, ids):
+        for i in range(0, len(ids), PINECONE_DELETE_BATCH_SIZE):
+            with_retry(self.index.delete, ids=ids[i:i + PINECONE_DELETE_BATCH_SIZE], namespace=self.namespace)
+
+    def delete_all(self):
+        try:
+            self.index.delete(delete_all=True, namespace=self.namespace)
+        except Exception as e:
+            # Deleting a namespace that doesn't exist yet is not an error for us
+            logging.warning(f"Could not clear namespace '{self.namespace}': {e}")
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class LocalSink:
+    """Writes the API's local vector index, optionally float16/int8 quantized.
+
+    The whole index lives in memory during the run (int8 at 1024 dims is
+    ~1KB per chunk). Upserts are buffered and written out on flush(), which
+    ingest() calls before each manifest save so the two never disagree.
+    """
+
+    name = "local"
+
+    def __init__(self, path=LOCAL_INDEX_DIR, dtype="float32", model=EMBEDDING_MODELS["local"], fresh=False):
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api"))
+        from vector_index import LocalVectorIndex
+        self._new_index = lambda: LocalVectorIndex(dtype, model)
+        self.path = path
+        self.index = self._new_index()
+        if not fresh and os.path.exists(os.path.join(path, "meta.json")):
+            self.index = LocalVectorIndex.load(path, mmap=False)
+            if self.index.dtype != dtype or self.index.model != model:
+                raise ValueError(f"{path} holds {self.index.dtype} {self.index.model} vectors; "
+                                 f"rebuild with --full to switch to {dtype} {model}")
+        self.pending = {}
+        self.manifest_path = os.path.join(path, "ingest_manifest.json")
+
+    def upsert(self, ids, vectors, texts, metadatas):
+        for cid, vector, text, metadata in zip(ids, vectors, texts, metadatas):
+            self.pending[cid] = (vector, text, metadata)
+
+    def delete(self, ids):
+        for cid in ids:
+            self.pending.pop(cid, None)
+        self.index.delete(ids)
+
+    def delete_all(self):
+        self.pending.clear()
+        self.index = self._new_index()
+
+    def flush(self):
+        if self.pending:
+            ids = list(self.pending)
+            vectors, texts, metadatas = zip(*self.pending.values())
+            if self.index.dimensions and len(vectors[0]) != self.index.dimensions:
+                raise ValueError(f"{self.path} holds {self.index.dimensions}-dim vectors, got {len(vectors[0])}; "
+                                 f"rebuild with --full to change --embedding-dimensions")
+            self.index.upsert(ids, vectors, texts, metadatas)
+            self.pending.clear()
+        self.index.save(self.path)
+
+    def close(self):
+        self.flush()
+        logging.info(f"Local index: {len(self.index)} vectors, {self.index.dtype}, "
+                     f"{self.index.dimensions} dims, {self.index.nbytes / 1e6:.1f} MB")
+
+
+def ingest(files, sink, workers=None, batch_size=EMBED_BATCH_SIZE, concurrency=EMBED_CONCURRENCY, full=False,
+           prune=True, max_inflight_files=MAX_INFLIGHT_FILES, embedding_model=None, dedup_distance=DEDUP_MAX_DISTANCE,
+           embedding_dimensions=None):
+    """Streams `files` through load -> header split -> recursive split -> batch embed -> upsert.
+
+    Every stage hands off through a bounded window, so peak memory depends on
+    the window sizes rather than on corpus size, and embedding starts as soon
+    as the first files are split. Only new or modified files (by content hash)
+    are re-chunked and re-embedded; when `prune` is set, chunks from files no
+    longer present are removed.
+
+    Near-duplicate chunks (boilerplate such as affiliate blocks and author
+    bios) within `dedup_distance` SimHash bits of an already-kept chunk are
+    dropped; pass dedup_distance=None to disable. Each file's manifest entry
+    maps dropped chunk indexes to the chunk they duplicate. Incremental runs
+    don't revisit those links when the kept original changes, so run --full
+    periodically.
+
+    `embedding_dimensions` shortens text-embedding-3 vectors (e.g. 1024 or 512);
+    the reading side must use the same value.
+    """
+    manifest = {} if full else load_manifest(sink.manifest_path)
+    if full:
+        sink.delete_all()
+
+    # Only paths are materialized (not content) so deletions are known before streaming
+    files = list(files)
+    seen = set(files)
+    deleted = [path for path in manifest if path not in seen] if prune else []
+
+    deduper = None
+    if dedup_distance is not None:
+        deduper = NearDuplicateIndex(dedup_distance)
+        for path, entry in manifest.items():
+            if path not in deleted:
+                for cid, h in entry.get("simhashes", {}).items():
+                    deduper.add(cid, h)
+
+    def tasks():
+        for file_path in files:
+            yield file_path, manifest.get(file_path, {}).get("sha256"), deduper is not None
+
+    embeddings = OpenAIEmbeddings(model=embedding_model or EMBEDDING_MODELS[sink.name], dimensions=embedding_dimensions)
+
+    def embed_batch(batch):
+        ids, splits, completed = batch
+        vectors = with_retry(embeddings.embed_documents, [s.page_content for s in splits]) if splits else []
+        return ids, splits, vectors, completed
+
+    total_chunks = 0
+    total_files = 0
+    total_duplicates = 0
+    with ProcessPoolExecutor(max_workers=workers) as process_pool, \
+            ThreadPoolExecutor(max_workers=concurrency) as embed_pool:
+        file_results = bounded_map(process_pool, process_file, tasks(), max_inflight_files)
+        batches = iter_batches(file_results, manifest, batch_size, deduper)
+        for ids, splits, vectors, completed in bounded_map(embed_pool, embed_batch, batches, concurrency):
+            if ids:
+                sink.upsert(ids, vectors, [s.page_content for s in splits], [s.metadata for s in splits])
+                total_chunks += len(ids)
+            for entry in completed:
+                if entry["stale_ids"]:
+                    sink.delete(entry["stale_ids"])
+                manifest[entry["path"]] = {k: v for k, v in entry.items() if k not in ("path", "stale_ids")}
+                total_duplicates += len(entry.get("duplicates", {}))
+                total_files += 1
+                # Persist progress periodically so an interrupted run resumes where it stopped
+                if total_files % MANIFEST_SAVE_EVERY == 0:
+                    sink.flush()
+                    save_manifest(manifest, sink.manifest_path)
+                    logging.info(f"Ingested {total_chunks} chunks from {total_files} changed files so far...")
+
+    stale_ids = [cid for path in deleted for cid in manifest[path].get("chunk_ids", [])]
+    if stale_ids:
+        sink.delete(stale_ids)
+    for path in deleted:
+        del manifest[path]
+
+    sink.flush()
+    save_manifest(manifest, sink.manifest_path)
+    logging.info(f"Ingested {total_chunks} chunks from {total_files} new/modified files "
+                 f"({len(seen)} scanned, {len(deleted)} deleted, {total_duplicates} near-duplicate chunks dropped) "
+                 f"into {sink.name}")
+
 
 def main():
     parser = argparse.ArgumentParser(description="Ingest content into Vector Store")
     parser.add_argument("--limit", type=int, help="Limit number of files for testing")
+    parser.add_argument("--workers", type=int, help="Processes for load/split (default: CPU count)")
+    parser.add_argument("--embed-batch-size", type=int, default=EMBED_BATCH_SIZE, help="Texts per embedding request")
+    parser.add_argument("--embed-concurrency", type=int, default=EMBED_CONCURRENCY, help="Embedding requests in flight")
+    parser.add_argument("--max-inflight-files", type=int, default=MAX_INFLIGHT_FILES,
+                        help="Files loaded/split ahead of embedding")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and rebuild the whole store")
+    parser.add_argument("--target", choices=["chroma", "pinecone", "local"], default="chroma",
+                        help="Local Chroma store, the API's Pinecone index, or the API's local quantized index")
+    parser.add_argument("--index", default=PINECONE_INDEX, help="Pinecone index name")
+    parser.add_argument("--namespace", default="", help="Pinecone namespace")
+    parser.add_argument("--upsert-concurrency", type=int, default=PINECONE_UPSERT_CONCURRENCY,
+                        help="Parallel Pinecone upsert requests")
+    parser.add_argument("--embedding-model", help="Override the target's default embedding model")
+    parser.add_argument("--embedding-dimensions", type=int,
+                        help="Shorten text-embedding-3 vectors (e.g. 1024, 512); set EMBEDDING_DIMENSIONS to match in the API")
+    parser.add_argument("--local-index", default=LOCAL_INDEX_DIR, help="Output directory for --target local")
+    parser.add_argument("--quantization", choices=["float32", "float16", "int8"], default="float32",
+                        help="Vector storage type for --target local")
+    parser.add_argument("--dedup-distance", type=int, default=DEDUP_MAX_DISTANCE,
+                        help="Max SimHash bit distance treated as a near-duplicate chunk")
+    parser.add_argument("--no-dedup", action="store_true", help="Keep near-duplicate chunks")
     args = parser.parse_args()
-    
+
     if not os.environ.get("OPENAI_API_KEY"):
         logging.error("OPENAI_API_KEY environment variable not set.")
         return
+    if args.target == "pinecone" and not os.environ.get("PINECONE_API_KEY"):
+        logging.error("PINECONE_API_KEY environment variable not set.")
+        return
 
-    docs = load_documents(DATA_DIR)
+    files = iter_files(DATA_DIR)
     if args.limit:
-        docs = docs[:args.limit]
-        
-    splits = split_documents(docs)
-    create_vector_store(splits)
+        files = itertools.islice(files, args.limit)
+
+    if args.target == "pinecone":
+        sink = PineconeSink(args.index, args.namespace, args.upsert_concurrency)
+    elif args.target == "local":
+        sink = LocalSink(args.local_index, args.quantization, args.embedding_model or EMBEDDING_MODELS["local"],
+                         fresh=args.full)
+    else:
+        sink = ChromaSink()
+
+    # A --limit run only sees part of the corpus, so it must not prune the rest
+    try:
+        ingest(files, sink, args.workers, args.embed_batch_size, args.embed_concurrency, args.full,
+               prune=not args.limit, max_inflight_files=args.max_inflight_files,
+               embedding_model=args.embedding_model,
+               dedup_distance=None if args.no_dedup else args.dedup_distance,
+               embedding_dimensions=args.embedding_dimensions)
+    finally:
+        sink.close()
 
 if __name__ == "__main__":
     main()